@@ -0,0 +1,290 @@
+"""
+Congestion-aware adaptive bitrate/resolution controller for the RPi sender
+Samples RTCP receiver reports from the RTCPeerConnection stats, and steps
+the video track along VIDEO_LADDER (resolution, frame rate, bitrate) with
+hysteresis. Every sample and decision is logged as a structured JSON event
+so a session can be replayed through decide() offline.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from importlib import metadata
+
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+# aiortc releases known to keep each sender's encoder in the private
+# RTCRtpSender.__encoder with a settable target_bitrate: [first, last)
+PRIVATE_ENCODER_VERSIONS = ((1, 0), (2, 0))
+
+# Seconds between checks for a sender's encoder, which aiortc builds on the first frame
+ENCODER_POLL_INTERVAL = 0.1
+
+_private_encoder_supported = None
+
+
+def private_encoder_supported():
+    """Whether this aiortc's private encoder attribute is one set_sender_bitrate knows"""
+    global _private_encoder_supported
+    if _private_encoder_supported is None:
+        try:
+            version = metadata.version('aiortc')
+            release = tuple(int(part) for part in version.split('.')[:2])
+        except (metadata.PackageNotFoundError, ValueError):
+            version, release = 'unknown', None
+        first, last = PRIVATE_ENCODER_VERSIONS
+        _private_encoder_supported = release is not None and first <= release < last
+        if not _private_encoder_supported:
+            logger.warning(f"aiortc {version} is outside the versions checked for per-sender "
+                           f"bitrate control; encoders keep aiortc's default bitrate and "
+                           f"only resolution and frame rate adapt")
+    return _private_encoder_supported
+
+
+def set_sender_bitrate(sender, bitrate):
+    """
+    Set the target bitrate of one sender's encoder, leaving every other
+    peer connection's encoder alone. aiortc keeps the encoder private and
+    creates it on the first frame: returns False while it does not exist
+    yet, True once set (or when this aiortc cannot be driven at all).
+    """
+    if not private_encoder_supported():
+        return True
+    encoder = getattr(sender, '_RTCRtpSender__encoder', None)
+    if encoder is None:
+        return False
+    if hasattr(encoder, 'target_bitrate'):
+        encoder.target_bitrate = bitrate
+    return True
+
+
+async def apply_bitrate_when_ready(pc, bitrate, timeout=CONNECTION_TIMEOUT):
+    """Set bitrate on each video sender of pc as soon as its encoder exists"""
+    deadline = time.monotonic() + timeout
+    while True:
+        # The sender may carry a relayed copy of the track, not the track itself
+        pending = [sender for sender in pc.getSenders()
+                   if sender.track is not None and sender.track.kind == 'video'
+                   and not set_sender_bitrate(sender, bitrate)]
+        if not pending:
+            return True
+        if time.monotonic() >= deadline:
+            logger.warning(f"No encoder after {timeout}s; bitrate {bitrate} not applied")
+            return False
+        await asyncio.sleep(ENCODER_POLL_INTERVAL)
+
+
+class DecisionLog:
+    """
+    Appends JSON lines from a writer thread, so logging a sample on the
+    event loop is a queue put and never waits on the SD card
+    """
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='abr-log', daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        self._queue.put(line)
+
+    def _run(self):
+        try:
+            with open(self.path, 'a') as log_file:
+                while True:
+                    line = self._queue.get()
+                    # Write out whatever queued meanwhile, then flush once
+                    while line is not None:
+                        log_file.write(line + '\n')
+                        try:
+                            line = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    log_file.flush()
+                    if line is None:
+                        return
+        except OSError as e:
+            logger.error(f"ABR decision log {self.path} failed: {e}")
+
+    def close(self):
+        """Flush what is queued and stop the writer"""
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+
+
+class AdaptiveBitrateController:
+    """
+    Ladder controller. decide() is a pure function of the sample sequence,
+    which is what makes logged sessions replayable.
+    """
+    def __init__(self, track, pc=None, ladder=VIDEO_LADDER, start_level=None,
+                 log_path=ABR_LOG_FILE):
+        self.track = track
+        self.pc = pc
+        self.ladder = ladder
+        self.level = len(ladder) - 1 if start_level is None else start_level
+        self.log_path = log_path
+        self._bad_samples = 0
+        self._good_samples = 0
+        self._last_counters = None
+        self._task = None
+        self._bitrate_task = None
+        self._log_file = None
+        self.switches = 0
+
+    @property
+    def profile(self):
+        return self.ladder[self.level]
+
+    def _log(self, event, **fields):
+        record = {'event': event, 'time': round(time.time(), 3), 'level': self.level}
+        record.update(fields)
+        line = json.dumps(record, sort_keys=True)
+        logger.info(f"ABR {line}")
+        if self.log_path:
+            if self._log_file is None:
+                self._log_file = DecisionLog(self.log_path)
+            self._log_file.write(line)
+
+    async def sample(self):
+        """
+        Build one congestion sample from getStats():
+        loss over the interval and round-trip time from the receiver reports
+        """
+        report = await self.pc.getStats()
+        lost = sent = 0
+        rtt = None
+        for stats in report.values():
+            if stats.type == 'remote-inbound-rtp' and stats.kind == 'video':
+                lost += stats.packetsLost or 0
+                if stats.roundTripTime is not None:
+                    rtt = stats.roundTripTime if rtt is None else max(rtt, stats.roundTripTime)
+            elif stats.type == 'outbound-rtp' and stats.kind == 'video':
+                sent += stats.packetsSent or 0
+
+        if self._last_counters is None:
+            self._last_counters = (lost, sent)
+            return None
+
+        lost_delta = max(0, lost - self._last_counters[0])
+        sent_delta = max(0, sent - self._last_counters[1])
+        self._last_counters = (lost, sent)
+        if sent_delta == 0:
+            return None
+        return {'loss': round(lost_delta / (sent_delta + lost_delta), 4), 'rtt': rtt}
+
+    def decide(self, sample):
+        """
+        Return the new ladder level for a sample.
+        Step down after ABR_DOWN_SAMPLES bad samples in a row, up after
+        ABR_UP_SAMPLES good ones; anything in between resets both counters.
+        """
+        loss = sample['loss']
+        rtt = sample.get('rtt')
+        bad = loss >= ABR_LOSS_DOWN or (rtt is not None and rtt >= ABR_RTT_DOWN)
+        good = loss <= ABR_LOSS_UP and (rtt is None or rtt < ABR_RTT_UP)
+
+        if bad:
+            self._bad_samples += 1
+            self._good_samples = 0
+            if self._bad_samples >= ABR_DOWN_SAMPLES and self.level > 0:
+                self._bad_samples = 0
+                return self.level - 1
+        elif good:
+            self._good_samples += 1
+            self._bad_samples = 0
+            if self._good_samples >= ABR_UP_SAMPLES and self.level < len(self.ladder) - 1:
+                self._good_samples = 0
+                return self.level + 1
+        else:
+            self._bad_samples = 0
+            self._good_samples = 0
+        return self.level
+
+    def _apply_profile(self):
+        self.track.apply_profile(self.profile)
+        if self.pc is not None:
+            if self._bitrate_task is not None:
+                self._bitrate_task.cancel()
+            self._bitrate_task = asyncio.create_task(
+                apply_bitrate_when_ready(self.pc, self.profile['bitrate']))
+
+    def attach(self, pc):
+        """Follow a new peer connection (after a reconnect), keeping the current level"""
+        self.pc = pc
+        self._last_counters = None
+        self._bad_samples = 0
+        self._good_samples = 0
+        self._apply_profile()
+
+    def apply(self, level, sample=None):
+        old = self.level
+        self.level = level
+        self.switches += 1
+        self._log('switch', previous=old, profile=self.profile, sample=sample)
+        self._apply_profile()
+
+    async def step(self):
+        sample = await self.sample()
+        if sample is None:
+            return
+        self._log('sample', **sample)
+        level = self.decide(sample)
+        if level != self.level:
+            self.apply(level, sample)
+
+    async def run(self, interval=ABR_INTERVAL):
+        self._log('start', profile=self.profile)
+        self._apply_profile()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.step()
+            except Exception as e:
+                logger.error(f"ABR step failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._bitrate_task is not None:
+            self._bitrate_task.cancel()
+            self._bitrate_task = None
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    def stats(self):
+        return {'level': self.level, 'profile': self.profile, 'switches': self.switches}
+
+
+def replay_decisions(log_path, ladder=VIDEO_LADDER):
+    """
+    Re-run the logged samples of a session through decide() and return
+    (logged switch levels, replayed switch levels) for comparison
+    """
+    logged, replayed = [], []
+    controller = None
+    with open(log_path) as log_file:
+        for line in log_file:
+            record = json.loads(line)
+            if record['event'] == 'start':
+                controller = AdaptiveBitrateController(None, ladder=ladder,
+                                                       start_level=record['level'], log_path=None)
+            elif record['event'] == 'sample' and controller is not None:
+                level = controller.decide({'loss': record['loss'], 'rtt': record.get('rtt')})
+                if level != controller.level:
+                    controller.level = level
+                    replayed.append(level)
+            elif record['event'] == 'switch':
+                logged.append(record['level'])
+    return logged, replayed
@@ -0,0 +1,134 @@
+"""
+Camera capture worker for the Raspberry Pi sender
+Runs the blocking cv2.VideoCapture.read() on its own thread and keeps only
+the newest frame in a preallocated double buffer, so the asyncio loop never
+waits on the camera
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+
+class CameraCapture:
+    """
+    Background capture into two preallocated buffers.
+    The worker fills the back buffer and swaps it to the front under a lock;
+    readers hold the same lock while they use the front buffer.
+    """
+    def __init__(self, camera_id=0, width=VIDEO_WIDTH, height=VIDEO_HEIGHT, fps=VIDEO_FPS):
+        self.camera = cv2.VideoCapture(camera_id)
+        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.camera.set(cv2.CAP_PROP_FPS, fps)
+
+        if not self.camera.isOpened():
+            raise Exception("Could not open camera")
+
+        self.width = width
+        self.height = height
+        self._buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(2)]
+        self._front = 0
+        self._seq = 0
+        self._captured_at = None
+        self._lock = threading.Lock()
+        self._new_frame = threading.Event()
+        self._thread = None
+        self._running = False
+        self._requested_resolution = None
+
+        self.frames_captured = 0
+        self.read_failures = 0
+        self.capture_fps = 0.0
+
+        logger.info(f"Camera initialized: {width}x{height}@{fps}fps")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.camera.release()
+
+    def request_resolution(self, width, height):
+        """Change capture size; applied by the worker before its next read"""
+        if (width, height) != (self.width, self.height):
+            self._requested_resolution = (width, height)
+
+    def _apply_resolution(self):
+        width, height = self._requested_resolution
+        self._requested_resolution = None
+        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.width, self.height = width, height
+        logger.info(f"Camera resolution changed to {width}x{height}")
+
+    def _run(self):
+        last = None
+        while self._running:
+            if self._requested_resolution is not None:
+                self._apply_resolution()
+            back = 1 - self._front
+            ret, frame = self.camera.read(self._buffers[back])
+            if not ret:
+                self.read_failures += 1
+                logger.error("Failed to read frame from camera")
+                time.sleep(0.05)
+                continue
+
+            # The driver may hand back a different size than requested (or
+            # than the buffer, after a resolution change)
+            if frame is not self._buffers[back]:
+                self._buffers[back] = frame
+
+            now = time.monotonic()
+            with self._lock:
+                self._front = back
+                self._seq += 1
+                self._captured_at = now
+            self._new_frame.set()
+
+            self.frames_captured += 1
+            if last is not None:
+                fps = 1.0 / max(now - last, 1e-6)
+                self.capture_fps += 0.1 * (fps - self.capture_fps)
+            last = now
+
+    def wait_first_frame(self, timeout=None):
+        """Block until the first frame has been captured"""
+        return self._new_frame.wait(timeout)
+
+    @contextmanager
+    def latest(self):
+        """
+        Yield (seq, captured_at, frame) for the newest frame without copying.
+        The frame is only valid inside the with-block; keep it short, the
+        worker cannot publish the next frame until it exits.
+        """
+        with self._lock:
+            if self._seq == 0:
+                yield 0, None, None
+            else:
+                yield self._seq, self._captured_at, self._buffers[self._front]
+
+    def stats(self):
+        return {
+            'frames_captured': self.frames_captured,
+            'capture_fps': round(self.capture_fps, 1),
+            'read_failures': self.read_failures
+        }
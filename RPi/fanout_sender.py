@@ -0,0 +1,134 @@
+"""
+Multi-viewer fan-out for the Raspberry Pi sender
+One video source is captured once and relayed (MediaRelay) to a peer
+connection per viewer session. Viewers ask for a session in the room and
+each session negotiates in its own signaling room. Session requests are
+deleted once handled; requests older than the sender are ignored, so a
+restart does not answer viewers that are long gone.
+
+With VIDEO_SOURCE_MODE 'h264_passthrough' the relay forwards encoded
+packets, so the camera is also encoded only once; with 'camera', aiortc
+encodes once per viewer.
+"""
+
+import asyncio
+import logging
+import time
+
+from aiortc.contrib.media import MediaRelay
+
+from async_signaling import AsyncSignaling
+from rpi_webrtc_sender import RPiWebRTCSender, create_video_track, start_source_tasks
+from signaling_backend import create_signaling, session_room
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+
+class FanoutSender:
+    """
+    Serves up to max_viewers sessions of room_id from one video track.
+    Each session is an RPiWebRTCSender on the shared track, so it has the
+    same reconnect behaviour; a session that gives up frees its slot.
+    """
+    def __init__(self, room_id, firebase_config_path=None, signaling=None,
+                 track_factory=create_video_track, max_viewers=FANOUT_MAX_VIEWERS,
+                 device_id=RPI_DEVICE_ID):
+        self.room_id = room_id
+        self.device_id = device_id
+        self.signaling = signaling or AsyncSignaling(
+            lambda: create_signaling(SIGNALING_BACKEND, firebase_config_path))
+        self.track_factory = track_factory
+        self.max_viewers = max_viewers
+        self.relay = MediaRelay()
+        self.video_track = None
+        self.sessions = {}
+        self._source_tasks = []
+        self.rejected = 0
+        self.served = 0
+        self.stale = 0
+        self.started_at = None
+        self._running = False
+
+    async def start(self):
+        """Open the video source and serve viewer sessions until stopped"""
+        self._running = True
+        self.started_at = time.time()
+        await self.signaling.connect()
+        if self.video_track is None:
+            self.video_track = self.track_factory()
+            self._source_tasks = start_source_tasks(self.video_track, self.relay)
+        await self.signaling.create_room(self.room_id)
+        await self.signaling.listen_for_sessions(self.room_id, self.on_session)
+        logger.info(f"Fan-out sender waiting for viewers in room: {self.room_id}")
+
+        last_report = time.monotonic()
+        while self._running:
+            await asyncio.sleep(1)
+            if time.monotonic() - last_report >= STATS_INTERVAL:
+                logger.info(f"Fan-out stats: {self.stats()}")
+                last_report = time.monotonic()
+
+    def on_session(self, session):
+        """A viewer asked for a session (runs on the event loop)"""
+        session_id = session['session']
+        if session_id in self.sessions or not self._running:
+            return
+        # Handled either way: do not deliver it again (e.g. after a restart)
+        asyncio.ensure_future(self.signaling.delete_session(self.room_id, session_id))
+        timestamp = session.get('timestamp')
+        if timestamp is not None and timestamp < self.started_at:
+            self.stale += 1
+            logger.info(f"Ignoring viewer session {session_id} from before the sender started")
+            return
+        if len(self.sessions) >= self.max_viewers:
+            self.rejected += 1
+            logger.warning(f"Rejecting viewer session {session_id}: "
+                           f"{self.max_viewers} viewers already connected")
+            return
+
+        sender = RPiWebRTCSender(session_room(self.room_id, session_id),
+                                 signaling=self.signaling,
+                                 video_track=self.video_track,
+                                 relay=self.relay,
+                                 abr_enabled=False,  # one source, many links
+                                 answer_timeout=CONNECTION_TIMEOUT,
+                                 device_id=self.device_id)
+        task = asyncio.create_task(sender.start())
+        self.sessions[session_id] = (sender, task)
+        self.served += 1
+        task.add_done_callback(lambda _: asyncio.ensure_future(self.end_session(session_id)))
+        logger.info(f"Viewer session {session_id} started ({len(self.sessions)}/{self.max_viewers})")
+
+    async def end_session(self, session_id):
+        sender, task = self.sessions.pop(session_id, (None, None))
+        if sender is None:
+            return
+        task.cancel()
+        await sender.stop()
+        logger.info(f"Viewer session {session_id} ended ({len(self.sessions)}/{self.max_viewers})")
+
+    def stats(self):
+        stats = {
+            'viewers': len(self.sessions),
+            'max_viewers': self.max_viewers,
+            'served': self.served,
+            'rejected': self.rejected,
+            'stale': self.stale,
+            'sessions': {session_id: sender.stats()
+                         for session_id, (sender, _) in self.sessions.items()}
+        }
+        if self.video_track is not None and hasattr(self.video_track, 'stats'):
+            stats['video'] = self.video_track.stats()
+        return stats
+
+    async def stop(self):
+        self._running = False
+        for session_id in list(self.sessions):
+            await self.end_session(session_id)
+        for task in self._source_tasks:
+            task.cancel()
+        if self.video_track is not None:
+            self.video_track.stop()
+        await self.signaling.cleanup_room(self.room_id)
+        logger.info("Fan-out sender stopped")
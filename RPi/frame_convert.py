@@ -0,0 +1,123 @@
+"""
+Captured-frame to VideoFrame conversion for the Raspberry Pi sender
+Replaces the BGR->RGB cvtColor + rgb24 VideoFrame path (which the encoder
+then converted again to YUV) with a single conversion into reused buffers:
+
+    'bgr24'    BGR is handed to PyAV as-is, the encoder converts once
+    'yuv420p'  one SIMD cv2 BGR->I420 conversion into a preallocated buffer;
+               the encoder consumes yuv420p directly, no second conversion
+"""
+
+import logging
+import sys
+
+import cv2
+import numpy as np
+from av import VideoFrame
+
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+
+class FrameConverter:
+    """
+    Convert BGR captures into a small pool of reused VideoFrames.
+    A pooled frame is only refilled once nothing but the pool references
+    it: MediaRelay queues every frame to each subscriber, and a slow
+    encoder may still hold an old one, so a fixed rotation could overwrite
+    a frame some consumer has not encoded yet. When every pooled frame is
+    still held, the pool grows, up to max_pool_size, and after that frames
+    are allocated unpooled.
+    """
+    def __init__(self, pixel_format=VIDEO_PIXEL_FORMAT, pool_size=FRAME_POOL_SIZE,
+                 max_pool_size=FRAME_POOL_MAX):
+        if pixel_format not in ('bgr24', 'yuv420p'):
+            raise ValueError(f"unsupported pixel format {pixel_format}")
+        self.pixel_format = pixel_format
+        self.pool_size = pool_size
+        self.max_pool_size = max(pool_size, max_pool_size)
+        self._shape = None
+        self._pool = []
+        self._next = 0
+        self._i420 = None
+        self.pooled_frames = 0
+        self.fallback_frames = 0
+        self.busy_frames = 0
+
+    def _allocate(self, height, width):
+        """(Re)build buffers for a capture size"""
+        self._shape = (height, width)
+        self._pool = [VideoFrame(width, height, self.pixel_format) for _ in range(self.pool_size)]
+        self._next = 0
+        if self.pixel_format == 'yuv420p':
+            self._i420 = np.empty((height * 3 // 2, width), dtype=np.uint8)
+        logger.info(f"Frame pool: {self.pool_size}x {width}x{height} {self.pixel_format}")
+
+    def _planes(self, frame):
+        """Contiguous source views matching the planes of the target format"""
+        height, width = self._shape
+        if self.pixel_format == 'bgr24':
+            return [frame.reshape(-1)]
+
+        cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, dst=self._i420)
+        flat = self._i420.reshape(-1)
+        luma = width * height
+        chroma = luma // 4
+        return [flat[:luma], flat[luma:luma + chroma], flat[luma + chroma:]]
+
+    def _free_slot(self):
+        """Index of a pooled frame that no consumer holds any more, or None"""
+        for offset in range(len(self._pool)):
+            index = (self._next + offset) % len(self._pool)
+            # The pool's reference plus getrefcount's own argument
+            if sys.getrefcount(self._pool[index]) <= 2:
+                return index
+        if len(self._pool) < self.max_pool_size:
+            height, width = self._shape
+            self._pool.append(VideoFrame(width, height, self.pixel_format))
+            logger.info(f"Frame pool grown to {len(self._pool)}: every frame still in use")
+            return len(self._pool) - 1
+        return None
+
+    def convert(self, frame):
+        """Return a VideoFrame for a BGR ndarray; it is not reused while referenced"""
+        if frame.shape[:2] != self._shape:
+            self._allocate(*frame.shape[:2])
+
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        sources = self._planes(frame)
+
+        index = self._free_slot()
+        if index is None:
+            self.busy_frames += 1
+            return self._unpooled(frame)
+
+        video_frame = self._pool[index]
+        planes = video_frame.planes
+        # Row padding in the AVFrame means the plane cannot be filled in one copy
+        if all(plane.buffer_size == source.size for plane, source in zip(planes, sources)):
+            self._next = (index + 1) % len(self._pool)
+            for plane, source in zip(planes, sources):
+                plane.update(source)
+            self.pooled_frames += 1
+            return video_frame
+
+        self.fallback_frames += 1
+        return self._unpooled(frame)
+
+    def _unpooled(self, frame):
+        """A newly allocated VideoFrame (after _planes() filled the I420 buffer)"""
+        if self.pixel_format == 'bgr24':
+            return VideoFrame.from_ndarray(frame, format='bgr24')
+        return VideoFrame.from_ndarray(self._i420, format='yuv420p')
+
+    def stats(self):
+        return {
+            'pixel_format': self.pixel_format,
+            'pool_size': len(self._pool),
+            'pooled_frames': self.pooled_frames,
+            'fallback_frames': self.fallback_frames,
+            'busy_frames': self.busy_frames
+        }
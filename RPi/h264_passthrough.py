@@ -0,0 +1,240 @@
+"""
+Encoded-passthrough H.264 video track for the Raspberry Pi sender
+An external encoder process (ffmpeg; h264_v4l2m2m uses the Pi's hardware
+encoder, libx264 is the software stand-in) captures and encodes the camera.
+Its Annex B output is split into access units and handed to aiortc as
+av.Packet objects, which aiortc packetizes without re-encoding.
+"""
+
+import asyncio
+import fractions
+import logging
+import subprocess
+import threading
+import time
+
+import av
+from aiortc import MediaStreamTrack, RTCRtpSender
+
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+H264_CLOCK_RATE = 90000
+H264_TIME_BASE = fractions.Fraction(1, H264_CLOCK_RATE)
+
+START_CODE = b'\x00\x00\x00\x01'
+SHORT_START_CODE = b'\x00\x00\x01'
+NAL_AUD = 9
+NAL_IDR = 5
+
+
+def encoder_command(source_args, width=VIDEO_WIDTH, height=VIDEO_HEIGHT, fps=VIDEO_FPS,
+                    bitrate=VIDEO_BITRATE, keyframe_interval=KEYFRAME_INTERVAL,
+                    encoder=H264_ENCODER):
+    """ffmpeg command line producing low-latency Annex B H.264 on stdout"""
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin']
+    command += source_args
+    command += [
+        '-an',
+        '-vf', f'scale={width}:{height}',
+        '-r', str(fps),
+        '-pix_fmt', 'yuv420p',
+        '-c:v', encoder,
+        '-b:v', str(bitrate),
+        '-maxrate', str(bitrate),
+        '-bufsize', str(bitrate // 2),
+        '-g', str(keyframe_interval),
+        '-bf', '0'
+    ]
+    if encoder == 'libx264':
+        command += ['-preset', 'ultrafast', '-tune', 'zerolatency',
+                    '-profile:v', 'baseline', '-x264-params', 'repeat-headers=1']
+    # Access unit delimiters make splitting the stream into frames trivial
+    command += ['-bsf:v', 'h264_metadata=aud=insert', '-f', 'h264', '-']
+    return command
+
+
+def camera_source_args(device=VIDEO_DEVICE, width=VIDEO_WIDTH, height=VIDEO_HEIGHT, fps=VIDEO_FPS):
+    """ffmpeg input options for a V4L2 camera"""
+    return ['-f', 'v4l2', '-framerate', str(fps), '-video_size', f'{width}x{height}', '-i', device]
+
+
+def split_access_units(buffer):
+    """
+    Split Annex B data at access unit delimiters.
+    Returns (complete access units, remaining bytes).
+    """
+    units = []
+    start = buffer.find(START_CODE + bytes([NAL_AUD]))
+    if start < 0:
+        return units, buffer
+    while True:
+        end = buffer.find(START_CODE + bytes([NAL_AUD]), start + 5)
+        if end < 0:
+            return units, buffer[start:]
+        units.append(buffer[start:end])
+        start = end
+
+
+def is_keyframe(access_unit):
+    """True if the access unit contains an IDR slice"""
+    # The 3-byte start code also matches the tail of every 4-byte one
+    index = access_unit.find(SHORT_START_CODE)
+    while 0 <= index < len(access_unit) - 3:
+        if access_unit[index + 3] & 0x1F == NAL_IDR:
+            return True
+        index = access_unit.find(SHORT_START_CODE, index + 3)
+    return False
+
+
+class H264EncoderProcess:
+    """
+    Run the encoder subprocess and deliver access units to an asyncio queue
+    """
+    def __init__(self, command, queue_size=ENCODED_QUEUE_SIZE):
+        self.command = command
+        self.queue_size = queue_size
+        self.process = None
+        self.queue = None
+        self._loop = None
+        self._thread = None
+        self._waiting_for_keyframe = False
+        self.access_units = 0
+        self.dropped_units = 0
+        self.bytes_received = 0
+
+    def start(self, loop):
+        self._loop = loop
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, bufsize=0)
+        self._thread = threading.Thread(target=self._read, name="h264-reader", daemon=True)
+        self._thread.start()
+        logger.info(f"H.264 encoder started: {' '.join(self.command)}")
+
+    def _read(self):
+        buffer = b''
+        stdout = self.process.stdout
+        while True:
+            chunk = stdout.read(65536)
+            if not chunk:
+                break
+            self.bytes_received += len(chunk)
+            units, buffer = split_access_units(buffer + chunk)
+            for unit in units:
+                self._loop.call_soon_threadsafe(self._deliver, unit, time.monotonic())
+        logger.warning("H.264 encoder output ended")
+
+    def _deliver(self, unit, received_at):
+        """Runs on the event loop. A consumer that falls behind skips to the next keyframe."""
+        self.access_units += 1
+        if self.queue.qsize() >= self.queue_size:
+            # Dropping a P-frame corrupts every frame until the next IDR,
+            # so flush and wait for one instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped_units += 1
+            self._waiting_for_keyframe = True
+
+        if self._waiting_for_keyframe:
+            if not is_keyframe(unit):
+                self.dropped_units += 1
+                return
+            self._waiting_for_keyframe = False
+        self.queue.put_nowait((unit, received_at))
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def restart(self, command):
+        """Replace the encoder process; the stream resumes at its first keyframe"""
+        self.stop()
+        self.command = command
+        self._waiting_for_keyframe = True
+        if self._loop is not None:
+            self.start(self._loop)
+
+    def stats(self):
+        return {
+            'access_units': self.access_units,
+            'dropped_units': self.dropped_units,
+            'bytes_received': self.bytes_received
+        }
+
+
+class H264PassthroughTrack(MediaStreamTrack):
+    """
+    Video track that returns pre-encoded H.264 access units as av.Packet,
+    so aiortc sends them without decoding or re-encoding
+    """
+    kind = "video"
+
+    def __init__(self, source_args=None, encoder=H264_ENCODER):
+        super().__init__()
+        self.source_args = source_args
+        self.encoder_name = encoder
+        self.profile = {'width': VIDEO_WIDTH, 'height': VIDEO_HEIGHT,
+                        'fps': VIDEO_FPS, 'bitrate': VIDEO_BITRATE}
+        self.encoder = H264EncoderProcess(self._command())
+        self._started_at = None
+        self.frames_sent = 0
+        self.first_frame_at = None
+
+    def _command(self):
+        profile = self.profile
+        source_args = self.source_args or camera_source_args(
+            width=profile['width'], height=profile['height'], fps=profile['fps'])
+        return encoder_command(source_args, width=profile['width'], height=profile['height'],
+                               fps=profile['fps'], bitrate=profile['bitrate'],
+                               encoder=self.encoder_name)
+
+    def apply_profile(self, profile):
+        """Restart the encoder with a new resolution/frame rate/bitrate"""
+        if profile == self.profile:
+            return
+        self.profile = dict(profile)
+        self.encoder.restart(self._command())
+
+    async def recv(self):
+        if self.encoder.process is None:
+            self.encoder.start(asyncio.get_running_loop())
+
+        unit, received_at = await self.encoder.queue.get()
+        if self._started_at is None:
+            self._started_at = received_at
+
+        packet = av.Packet(unit)
+        packet.pts = int((received_at - self._started_at) * H264_CLOCK_RATE)
+        packet.time_base = H264_TIME_BASE
+        self.frames_sent += 1
+        if self.first_frame_at is None:
+            self.first_frame_at = time.monotonic()
+        return packet
+
+    def stop(self):
+        super().stop()
+        self.encoder.stop()
+
+    def stats(self):
+        stats = self.encoder.stats()
+        stats['frames_sent'] = self.frames_sent
+        return stats
+
+
+def prefer_h264(pc, track):
+    """Restrict the track's transceiver to H.264 so packets can pass through"""
+    codecs = [codec for codec in RTCRtpSender.getCapabilities("video").codecs
+              if codec.mimeType in ("video/H264", "video/rtx")]
+    for transceiver in pc.getTransceivers():
+        if transceiver.sender.track is track:
+            transceiver.setCodecPreferences(codecs)
@@ -0,0 +1,123 @@
+"""
+WebRTC relay for the dashboard server host
+Receives the Raspberry Pi's stream once, as the only viewer of ROOM_ID,
+and fans it out to dashboards in RELAY_ROOM_ID, so the Pi uplink carries
+a single stream however many dashboards watch. aiortc decodes what it
+receives, so the relay re-encodes once per dashboard on the server host.
+
+Run on the dashboard host: python RPi/relay_server.py
+"""
+
+import asyncio
+import logging
+
+from aiortc import MediaStreamTrack, RTCPeerConnection, RTCSessionDescription
+from aiortc.mediastreams import MediaStreamError
+
+from async_signaling import AsyncSignaling
+from fanout_sender import FanoutSender
+from rpi_webrtc_sender import rtc_configuration
+from signaling_backend import create_signaling
+from webrtc_config import *
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class UpstreamTrack(MediaStreamTrack):
+    """
+    Video from the Pi, surviving its reconnects: every new upstream peer
+    connection replaces the remote track this one reads from
+    """
+    kind = "video"
+
+    def __init__(self):
+        super().__init__()
+        self._remote = None
+        self._changed = asyncio.Event()
+        self.frames = 0
+        self.upstream_changes = 0
+
+    def set_remote(self, track):
+        self._remote = track
+        self.upstream_changes += 1
+        self._changed.set()
+
+    async def recv(self):
+        while True:
+            if self._remote is None:
+                await self._changed.wait()
+            remote = self._remote
+            self._changed.clear()
+            try:
+                frame = await remote.recv()
+                self.frames += 1
+                return frame
+            except MediaStreamError:
+                # The upstream connection went away; wait for the next one
+                if self._remote is remote:
+                    await self._changed.wait()
+
+    def stats(self):
+        return {'frames_relayed': self.frames, 'upstream_changes': self.upstream_changes}
+
+
+class RelayServer:
+    """Upstream viewer of the Pi's room plus a fan-out sender for dashboards"""
+    def __init__(self, upstream_room=ROOM_ID, downstream_room=RELAY_ROOM_ID, signaling=None,
+                 max_viewers=FANOUT_MAX_VIEWERS, firebase_config_path=FIREBASE_CREDENTIALS_PATH):
+        self.upstream_room = upstream_room
+        self.signaling = signaling or AsyncSignaling(
+            lambda: create_signaling(SIGNALING_BACKEND, firebase_config_path))
+        self.upstream = UpstreamTrack()
+        self.pc = None
+        self.fanout = FanoutSender(downstream_room, signaling=self.signaling,
+                                   track_factory=lambda: self.upstream,
+                                   max_viewers=max_viewers, device_id=RELAY_DEVICE_ID)
+
+    async def start(self):
+        await self.signaling.connect()
+        await self.signaling.listen_for_offer(self.upstream_room, self.on_offer)
+        logger.info(f"Relay waiting for the Pi in room: {self.upstream_room}")
+        await self.fanout.start()
+
+    async def on_offer(self, offer):
+        """Answer every new offer from the Pi (first connect and reconnects)"""
+        if self.pc is not None:
+            await self.pc.close()
+        pc = self.pc = RTCPeerConnection(configuration=rtc_configuration())
+
+        @pc.on("track")
+        def on_track(track):
+            if track.kind == "video":
+                logger.info("Upstream video track received")
+                self.upstream.set_remote(track)
+
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=offer['sdp'], type=offer['type']))
+        await pc.setLocalDescription(await pc.createAnswer())
+        await self.signaling.send_answer(self.upstream_room, pc.localDescription.sdp, RELAY_DEVICE_ID)
+        logger.info("Answered the Pi's offer")
+
+    def stats(self):
+        stats = self.fanout.stats()
+        stats['upstream_state'] = self.pc.connectionState if self.pc else None
+        return stats
+
+    async def stop(self):
+        await self.fanout.stop()
+        if self.pc is not None:
+            await self.pc.close()
+
+
+async def main():
+    relay = RelayServer()
+    try:
+        await relay.start()
+    except KeyboardInterrupt:
+        logger.info("Stopping relay...")
+    finally:
+        await relay.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
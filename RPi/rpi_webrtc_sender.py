@@ -6,12 +6,26 @@ Captures video from camera and streams via WebRTC
 import asyncio
 import cv2
 import logging
-from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
-from aiortc.contrib.media import MediaPlayer
+from aiortc import (MediaStreamTrack, RTCConfiguration, RTCIceServer, RTCPeerConnection,
+                    RTCSessionDescription, VideoStreamTrack)
+from aiortc.contrib.media import MediaPlayer, MediaRelay
+from aiortc.mediastreams import VIDEO_CLOCK_RATE, VIDEO_TIME_BASE, MediaStreamError
+from aiortc.sdp import candidate_from_sdp
 from av import VideoFrame
+import json
 import numpy as np
-from firebase_signaling import FirebaseSignaling
+import random
+import urllib.request
+from async_signaling import AsyncSignaling
+from signaling_backend import create_signaling
 from webrtc_config import *
+from adaptive_bitrate import AdaptiveBitrateController, apply_bitrate_when_ready
+from camera_capture import CameraCapture
+from frame_convert import FrameConverter
+from h264_passthrough import H264PassthroughTrack, prefer_h264
+from latency_probe import LatencyProbe, wall_time
+from metrics import Histogram
+from recorder import RingRecorder
 import time
 
 logging.basicConfig(level=logging.INFO)
@@ -19,149 +33,443 @@ logger = logging.getLogger(__name__)
 
 class CameraVideoTrack(VideoStreamTrack):
     """
-    Video track that reads from Raspberry Pi camera
+    Video track that reads from Raspberry Pi camera.
+    Capture runs on a worker thread; recv() only picks up the newest frame.
     """
     def __init__(self, camera_id=0):
         super().__init__()
-        self.camera = cv2.VideoCapture(camera_id)
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, VIDEO_WIDTH)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, VIDEO_HEIGHT)
-        self.camera.set(cv2.CAP_PROP_FPS, VIDEO_FPS)
-        
-        if not self.camera.isOpened():
-            raise Exception("Could not open camera")
+        self.capture = CameraCapture(camera_id)
+        self.capture.start()
+        self.converter = FrameConverter()
+        self.fps = VIDEO_FPS
+        self._last_seq = 0
+        self.frames_sent = 0
+        self.first_frame_at = None
+        self.stale_frames = 0
+        self.recv_block = Histogram()
+        # Instrumentation mode: stamp frames, forward stage times to the dashboard
+        self.probe = LatencyProbe('webrtc', forward=True) if LATENCY_PROBE else None
+    
+    async def next_timestamp(self):
+        """
+        Same pacing as VideoStreamTrack.next_timestamp, at self.fps
+        instead of a fixed 30 fps
+        """
+        if self.readyState != "live":
+            raise MediaStreamError
         
-        logger.info(f"Camera initialized: {VIDEO_WIDTH}x{VIDEO_HEIGHT}@{VIDEO_FPS}fps")
+        if hasattr(self, "_timestamp"):
+            self._timestamp += int(VIDEO_CLOCK_RATE / self.fps)
+            wait = self._start + (self._timestamp / VIDEO_CLOCK_RATE) - time.time()
+            await asyncio.sleep(wait)
+        else:
+            self._start = time.time()
+            self._timestamp = 0
+        return self._timestamp, VIDEO_TIME_BASE
+    
+    def apply_profile(self, profile):
+        """Switch capture resolution and frame rate (bitrate is set on the encoder)"""
+        self.capture.request_resolution(profile['width'], profile['height'])
+        self.fps = profile['fps']
     
     async def recv(self):
         """
-        Read frame from camera and return as VideoFrame
+        Return the newest captured frame as VideoFrame
         """
         pts, time_base = await self.next_timestamp()
         
-        # Read frame from camera
-        ret, frame = self.camera.read()
-        
-        if not ret:
-            logger.error("Failed to read frame from camera")
-            return None
+        # Wait for the first frame without blocking the loop
+        while self._last_seq == 0 and not self.capture.wait_first_frame(0):
+            await asyncio.sleep(0.01)
         
-        # Convert BGR to RGB (OpenCV uses BGR, WebRTC uses RGB)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        start = time.monotonic()
+        with self.capture.latest() as (seq, captured_at, frame):
+            # Same frame as last time: the camera is slower than the track
+            stale = seq == self._last_seq
+            if stale:
+                self.stale_frames += 1
+            self._last_seq = seq
+            
+            code = None
+            if self.probe and not stale:
+                # capture: how long the frame waited for this recv()
+                code = self.probe.stamp(frame, wall_time(captured_at))
+                self.probe.mark(code, 'capture', start - captured_at)
+            
+            # Copy into a pooled VideoFrame in the encoder's format
+            # (no BGR->RGB pass, no per-frame allocation)
+            video_frame = self.converter.convert(frame)
+            if code is not None:
+                self.probe.mark(code, 'convert', time.monotonic() - start)
         
-        # Create VideoFrame
-        video_frame = VideoFrame.from_ndarray(frame_rgb, format="rgb24")
         video_frame.pts = pts
         video_frame.time_base = time_base
         
+        self.frames_sent += 1
+        if self.first_frame_at is None:
+            self.first_frame_at = time.monotonic()
+        self.recv_block.observe(time.monotonic() - start)
         return video_frame
     
-    def __del__(self):
-        if hasattr(self, 'camera'):
-            self.camera.release()
+    def stop(self):
+        super().stop()
+        self.capture.stop()
+    
+    def stats(self):
+        stats = self.capture.stats()
+        stats.update(self.converter.stats())
+        stats.update({
+            'frames_sent': self.frames_sent,
+            'stale_frames': self.stale_frames,
+            'recv_block_ms': self.recv_block.snapshot()
+        })
+        return stats
+
+
+class EncodeTimingTrack(MediaStreamTrack):
+    """
+    Pass-through in front of one peer connection's sender, for the latency
+    probe. aiortc's sender loop is recv -> encode -> packetize/send -> recv,
+    so the time until the next recv() is the previous frame's encode time.
+    """
+    kind = "video"
+    
+    def __init__(self, source, probe):
+        super().__init__()
+        self.source = source
+        self.probe = probe
+        self._pending = None
+    
+    async def recv(self):
+        if self._pending is not None:
+            code, returned_at = self._pending
+            self.probe.frame_ready(code, encode=time.monotonic() - returned_at)
+        frame = await self.source.recv()
+        code = self.probe.last_code
+        self._pending = (code, time.monotonic()) if code is not None else None
+        return frame
+    
+    def stop(self):
+        super().stop()
+        self.source.stop()
+
+
+def post_json(url, data, timeout=2):
+    request = urllib.request.Request(url, data=json.dumps(data).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)
+
+
+async def forward_latency(probe, url=LATENCY_REPORT_URL, interval=LATENCY_REPORT_INTERVAL):
+    """Post the track's per-frame stage times to the dashboard's latency probe"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        frames = probe.drain()
+        if not frames:
+            continue
+        try:
+            await loop.run_in_executor(None, post_json, url, {'path': probe.path, 'frames': frames})
+        except Exception as e:
+            logger.warning(f"Latency report to {url} failed: {e}")
+
+
+async def record_track(track, recorder, fps=RECORD_FPS):
+    """
+    Record a relay subscription of the video source into a ring file, JPEG
+    encoded at up to fps frames per second off the event loop
+    """
+    loop = asyncio.get_running_loop()
+    interval = 1.0 / fps
+    next_at = 0.0
+    try:
+        while True:
+            frame = await track.recv()
+            now = time.monotonic()
+            if now < next_at:
+                continue
+            next_at = now + interval
+            image = frame.to_ndarray(format='bgr24')
+            await loop.run_in_executor(None, recorder.record_image, image, time.time())
+    finally:
+        track.stop()
+        recorder.close()
+
+
+def start_source_tasks(track, relay):
+    """Background tasks that live as long as a video source: latency forwarding, recording"""
+    tasks = []
+    probe = getattr(track, 'probe', None)
+    if probe is not None:
+        tasks.append(asyncio.create_task(forward_latency(probe)))
+    if RECORD_ENABLED:
+        if isinstance(track, H264PassthroughTrack):
+            logger.warning("Recording needs decoded frames; not available in h264_passthrough mode")
+        else:
+            tasks.append(asyncio.create_task(
+                record_track(relay.subscribe(track, buffered=False), RingRecorder(RECORD_PATH))))
+    return tasks
+
+
+def create_video_track(mode=VIDEO_SOURCE_MODE):
+    """
+    Build the video track for VIDEO_SOURCE_MODE:
+    'camera' encodes raw frames in aiortc, 'h264_passthrough' sends the
+    output of an external H.264 encoder as-is
+    """
+    if mode == 'h264_passthrough':
+        if LATENCY_PROBE:
+            logger.warning("Latency probe needs raw frames; not available in h264_passthrough mode")
+        return H264PassthroughTrack()
+    return CameraVideoTrack()
+
+
+def rtc_configuration(config=WEBRTC_CONFIG):
+    """aiortc wants an RTCConfiguration, not the browser-style dict"""
+    return RTCConfiguration(iceServers=[RTCIceServer(**server) for server in config['iceServers']])
+
+
+async def monitor_loop_stalls(histogram, interval=0.05):
+    """
+    Measure how late the event loop wakes a sleeping task; anything above
+    zero is time the loop spent blocked in some callback
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, loop.time() - start - interval))
+
+
+def reconnect_backoff(attempt, base=RECONNECT_BACKOFF_BASE, cap=RECONNECT_DELAY):
+    """
+    Delay before reconnect attempt n (from 0): exponential, capped at cap,
+    with jitter over the upper half so senders do not retry in lockstep
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
 
 
 class RPiWebRTCSender:
-    def __init__(self, room_id, firebase_config_path=None):
+    """
+    States: idle -> connecting -> connected <-> recovering -> failed.
+    The video source, signaling client and room listeners live for the
+    whole session; a failed connection is replaced by a new
+    RTCPeerConnection fed from the same source through a MediaRelay.
+    """
+    def __init__(self, room_id, firebase_config_path=None, signaling=None,
+                 track_factory=create_video_track, video_track=None, relay=None,
+                 abr_enabled=ABR_ENABLED, answer_timeout=None, device_id=RPI_DEVICE_ID):
+        """
+        signaling: an AsyncSignaling; defaults to SIGNALING_BACKEND
+        track_factory: builds the video source once per session
+        video_track/relay: a source shared with other senders (fan-out);
+        it is neither created nor stopped here
+        answer_timeout: how long to wait for the first answer (None: forever)
+        """
         self.room_id = room_id
-        self.device_id = RPI_DEVICE_ID
+        self.device_id = device_id
         self.pc = None
-        self.signaling = FirebaseSignaling(firebase_config_path)
-        self.video_track = None
+        self.signaling = signaling or AsyncSignaling(
+            lambda: create_signaling(SIGNALING_BACKEND, firebase_config_path))
+        self.track_factory = track_factory
+        self.video_track = video_track
+        self._owns_track = video_track is None
+        self.relay = relay or MediaRelay()
+        self.abr_enabled = abr_enabled
+        self.answer_timeout = answer_timeout
+        self.peer_stats = {}
+        self.state = 'idle'
         self.connected = False
+        self.loop_stall = Histogram()
+        self.recovery_time = Histogram()
+        self._monitor_task = None
+        self._recovery_task = None
+        self._source_tasks = []
+        self._bitrate_task = None
+        self._answer = None
+        self._failed_at = None
+        self.abr = None
+        self.started_at = None
+        self.time_to_first_frame = None
+        self.reconnects = 0
+        self.reconnect_attempts = 0
         
     async def start(self):
         """
         Start WebRTC connection and send video
         """
         try:
-            # Create peer connection
-            self.pc = RTCPeerConnection(configuration=WEBRTC_CONFIG)
-            
-            # Create video track from camera
-            self.video_track = CameraVideoTrack()
-            self.pc.addTrack(self.video_track)
-            
-            logger.info("Video track added to peer connection")
-            
-            # Set up event handlers
-            @self.pc.on("connectionstatechange")
-            async def on_connectionstatechange():
-                logger.info(f"Connection state: {self.pc.connectionState}")
-                if self.pc.connectionState == "connected":
-                    self.connected = True
-                    logger.info("✅ WebRTC connection established!")
-                elif self.pc.connectionState == "failed":
-                    self.connected = False
-                    logger.error("❌ WebRTC connection failed")
-                    await self.reconnect()
-            
-            @self.pc.on("icecandidate")
-            async def on_icecandidate(candidate):
-                if candidate:
-                    logger.info(f"New ICE candidate: {candidate}")
-                    self.signaling.add_ice_candidate(
-                        self.room_id,
-                        {
-                            'candidate': candidate.candidate,
-                            'sdpMLineIndex': candidate.sdpMLineIndex,
-                            'sdpMid': candidate.sdpMid
-                        },
-                        self.device_id
-                    )
-            
-            # Create room
-            self.signaling.create_room(self.room_id)
-            
-            # Create and send offer
-            offer = await self.pc.createOffer()
-            await self.pc.setLocalDescription(offer)
+            self.started_at = time.monotonic()
+            self.time_to_first_frame = None
+            self.state = 'connecting'
+            await self.signaling.connect()
             
-            self.signaling.send_offer(
-                self.room_id,
-                {
-                    'type': self.pc.localDescription.type,
-                    'sdp': self.pc.localDescription.sdp
-                },
-                self.device_id
-            )
-            
-            logger.info("Offer sent, waiting for answer...")
-            
-            # Listen for answer
-            answer_received = asyncio.Event()
-            
-            def on_answer(answer_data):
-                asyncio.create_task(self.handle_answer(answer_data, answer_received))
-            
-            self.signaling.listen_for_answer(self.room_id, on_answer)
+            # Create video track from camera; it stays open across reconnects
+            if self._owns_track:
+                self.video_track = self.track_factory()
+                logger.info("Video source started")
+                self._source_tasks = start_source_tasks(self.video_track, self.relay)
             
-            # Listen for ICE candidates
-            def on_ice_candidate(candidate_data):
-                asyncio.create_task(self.handle_ice_candidate(candidate_data))
-            
-            self.signaling.listen_for_ice_candidates(
+            # Create room and listen for the dashboard's answers/candidates
+            # once; every renegotiation goes through the same listeners
+            await self.signaling.create_room(self.room_id)
+            await self.signaling.listen_for_answer(self.room_id, self.handle_answer)
+            await self.signaling.listen_for_ice_candidates(
                 self.room_id,
                 self.device_id,
-                on_ice_candidate
+                self.handle_ice_candidate
             )
             
             # Wait for connection
             logger.info("Waiting for dashboard to connect...")
-            await answer_received.wait()
+            if not await self.negotiate(answer_timeout=self.answer_timeout):
+                raise ConnectionError("WebRTC connection failed")
+            
+            # Keep running, logging pipeline stats periodically
+            if self._monitor_task is None:
+                self._monitor_task = asyncio.create_task(monitor_loop_stalls(self.loop_stall))
             
-            # Keep running
-            while self.connected:
+            last_report = time.monotonic()
+            while self.state in ('connected', 'recovering'):
+                first_frame_at = getattr(self.video_track, 'first_frame_at', None)
+                if self.time_to_first_frame is None and first_frame_at:
+                    self.time_to_first_frame = max(0.0, first_frame_at - self.started_at)
+                    logger.info(f"Time to first frame: {self.time_to_first_frame:.3f}s")
                 await asyncio.sleep(1)
+                if time.monotonic() - last_report >= STATS_INTERVAL:
+                    await self.poll_peer_stats()
+                    logger.info(f"Sender stats ({self.room_id}): {self.stats()}")
+                    last_report = time.monotonic()
             
         except Exception as e:
             logger.error(f"Error in sender: {e}")
             raise
     
-    async def handle_answer(self, answer_data, event):
+    async def negotiate(self, answer_timeout=CONNECTION_TIMEOUT):
+        """
+        Offer a new peer connection for the running video source and wait
+        until it connects. Returns False if it fails; raises
+        asyncio.TimeoutError if the answer or the connection takes too long.
+        """
+        if self.pc:
+            await self.pc.close()
+        pc = self.pc = RTCPeerConnection(configuration=rtc_configuration())
+        
+        track = self.relay.subscribe(self.video_track, buffered=False)
+        probe = getattr(self.video_track, 'probe', None)
+        if probe is not None:
+            track = EncodeTimingTrack(track, probe)
+        pc.addTrack(track)
+        if isinstance(self.video_track, H264PassthroughTrack):
+            prefer_h264(pc, track)
+        
+        loop = asyncio.get_running_loop()
+        connected = loop.create_future()
+        
+        # Set up event handlers
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            if pc is not self.pc:
+                return
+            logger.info(f"Connection state: {pc.connectionState}")
+            if pc.connectionState == "connected":
+                if not connected.done():
+                    connected.set_result(True)
+                self.on_connected()
+            elif pc.connectionState == "failed":
+                if not connected.done():
+                    connected.set_result(False)
+                self.on_failed()
+        
+        @pc.on("icecandidate")
+        async def on_icecandidate(candidate):
+            if candidate:
+                logger.info(f"New ICE candidate: {candidate}")
+                await self.signaling.add_ice_candidate(
+                    self.room_id,
+                    {
+                        'candidate': candidate.candidate,
+                        'sdpMLineIndex': candidate.sdpMLineIndex,
+                        'sdpMid': candidate.sdpMid
+                    },
+                    self.device_id
+                )
+        
+        # Create and send offer (a new version, so the dashboard renegotiates)
+        self._answer = loop.create_future()
+        offer = await pc.createOffer()
+        await pc.setLocalDescription(offer)
+        
+        await self.signaling.send_offer(
+            self.room_id,
+            pc.localDescription.sdp,
+            self.device_id
+        )
+        
+        logger.info("Offer sent, waiting for answer...")
+        await asyncio.wait_for(asyncio.shield(self._answer), answer_timeout)
+        return await asyncio.wait_for(connected, CONNECTION_TIMEOUT)
+    
+    def on_connected(self):
+        self.state = 'connected'
+        self.connected = True
+        logger.info("✅ WebRTC connection established!")
+        if not self.abr_enabled:
+            # Fixed VIDEO_BITRATE, set on this connection's encoder only
+            if self._bitrate_task is not None:
+                self._bitrate_task.cancel()
+            self._bitrate_task = asyncio.create_task(apply_bitrate_when_ready(self.pc, VIDEO_BITRATE))
+            return
+        if self.abr is None:
+            self.abr = AdaptiveBitrateController(self.video_track, self.pc)
+            self.abr.start()
+        else:
+            self.abr.attach(self.pc)
+    
+    def on_failed(self):
+        self.connected = False
+        logger.error("❌ WebRTC connection failed")
+        # aiortc implements no ICE restart, so recovery renegotiates a
+        # fresh peer connection instead (the expensive parts stay warm)
+        if self.state == 'connected':
+            self.state = 'recovering'
+            self._failed_at = time.monotonic()
+            self._recovery_task = asyncio.create_task(self.recover())
+    
+    async def recover(self):
+        """
+        Renegotiate with bounded exponential backoff, up to
+        MAX_RECONNECT_ATTEMPTS; the camera and signaling stay up meanwhile
+        """
+        for attempt in range(MAX_RECONNECT_ATTEMPTS):
+            delay = reconnect_backoff(attempt)
+            logger.info(f"Reconnect attempt {attempt + 1}/{MAX_RECONNECT_ATTEMPTS} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            self.reconnect_attempts += 1
+            try:
+                if await self.negotiate(answer_timeout=RECONNECT_ANSWER_TIMEOUT):
+                    recovery = time.monotonic() - self._failed_at
+                    self.recovery_time.observe(recovery)
+                    self.reconnects += 1
+                    logger.info(f"Reconnected in {recovery:.2f}s")
+                    return
+            except asyncio.TimeoutError:
+                logger.warning("Reconnect attempt timed out")
+            except Exception as e:
+                logger.error(f"Reconnect attempt failed: {e}")
+        
+        logger.error("❌ Max reconnection attempts reached")
+        self.state = 'failed'
+    
+    async def handle_answer(self, answer_data):
         """
         Handle received answer from dashboard
         """
+        if self._answer is None or self._answer.done():
+            # Not negotiating, or an answer to an earlier offer
+            return
         try:
             answer = RTCSessionDescription(
                 sdp=answer_data['sdp'],
@@ -169,7 +477,7 @@ class RPiWebRTCSender:
             )
             await self.pc.setRemoteDescription(answer)
             logger.info("Answer received and set as remote description")
-            event.set()
+            self._answer.set_result(True)
         except Exception as e:
             logger.error(f"Failed to handle answer: {e}")
     
@@ -178,39 +486,86 @@ class RPiWebRTCSender:
         Handle received ICE candidate
         """
         try:
-            from aiortc import RTCIceCandidate
-            
-            candidate = RTCIceCandidate(
-                candidate=candidate_data['candidate'],
-                sdpMLineIndex=candidate_data['sdpMLineIndex'],
-                sdpMid=candidate_data['sdpMid']
-            )
+            # Browsers send "candidate:<sdp attribute>"
+            sdp = candidate_data['candidate']
+            if sdp.startswith('candidate:'):
+                sdp = sdp.split(':', 1)[1]
+            candidate = candidate_from_sdp(sdp)
+            candidate.sdpMLineIndex = candidate_data['sdpMLineIndex']
+            candidate.sdpMid = candidate_data['sdpMid']
             await self.pc.addIceCandidate(candidate)
             logger.info("ICE candidate added")
         except Exception as e:
             logger.error(f"Failed to add ICE candidate: {e}")
     
-    async def reconnect(self):
+    async def poll_peer_stats(self):
+        """Refresh the RTCP view of this peer (sent, lost, round-trip time)"""
+        if self.pc is None or self.state != 'connected':
+            return
+        peer = {}
+        for report in (await self.pc.getStats()).values():
+            if report.type == 'outbound-rtp' and report.kind == 'video':
+                peer['bytes_sent'] = report.bytesSent
+                peer['packets_sent'] = report.packetsSent
+            elif report.type == 'remote-inbound-rtp' and report.kind == 'video':
+                peer['packets_lost'] = report.packetsLost
+                peer['rtt_ms'] = round(report.roundTripTime * 1000, 1) if report.roundTripTime else None
+        self.peer_stats = peer
+    
+    def stats(self):
         """
-        Attempt to reconnect
+        Capture/track/event-loop statistics
         """
-        logger.info("Attempting to reconnect...")
-        await asyncio.sleep(RECONNECT_DELAY)
-        await self.stop()
-        await self.start()
+        stats = {
+            'state': self.state,
+            'reconnects': self.reconnects,
+            'reconnect_attempts': self.reconnect_attempts,
+            'recovery_ms': self.recovery_time.snapshot(),
+            'loop_stall_ms': self.loop_stall.snapshot(),
+            'peer': self.peer_stats
+        }
+        if self.video_track and self._owns_track and hasattr(self.video_track, 'stats'):
+            stats['video'] = self.video_track.stats()
+        if self.abr:
+            stats['abr'] = self.abr.stats()
+        if self.time_to_first_frame is not None:
+            stats['time_to_first_frame'] = round(self.time_to_first_frame, 3)
+        stats['signaling'] = self.signaling.stats()
+        return stats
     
     async def stop(self):
         """
         Stop WebRTC connection and cleanup
         """
         try:
+            self.state = 'idle'
+            if self._monitor_task:
+                self._monitor_task.cancel()
+                self._monitor_task = None
+            
+            if self._recovery_task:
+                self._recovery_task.cancel()
+                self._recovery_task = None
+            
+            for task in self._source_tasks:
+                task.cancel()
+            self._source_tasks = []
+            
+            if self.abr:
+                self.abr.stop()
+                self.abr = None
+            
+            if self._bitrate_task:
+                self._bitrate_task.cancel()
+                self._bitrate_task = None
+            
             if self.pc:
                 await self.pc.close()
             
-            if self.video_track:
+            if self.video_track and self._owns_track:
                 self.video_track.stop()
             
-            self.signaling.cleanup_room(self.room_id)
+            await self.signaling.cleanup_room(self.room_id)
             logger.info("Sender stopped and cleaned up")
         except Exception as e:
             logger.error(f"Error stopping sender: {e}")
@@ -220,12 +575,16 @@ async def main():
     """
     Main entry point for Raspberry Pi sender
     """
-    room_id = "rpi_car_stream"
+    room_id = ROOM_ID
     
     # Path to your Firebase service account JSON
     firebase_config = "firebase_service_account.json"
     
-    sender = RPiWebRTCSender(room_id, firebase_config)
+    if FANOUT_ENABLED:
+        from fanout_sender import FanoutSender
+        sender = FanoutSender(room_id, firebase_config)
+    else:
+        sender = RPiWebRTCSender(room_id, firebase_config)
     
     try:
         logger.info(f"Starting RPi WebRTC sender for room: {room_id}")
@@ -1,61 +1,201 @@
 from flask import Flask, render_template, Response, jsonify, request
 from flask_socketio import SocketIO, emit
-import cv2
-import numpy as np
 from datetime import datetime
+import atexit
 import json
+import os
+import threading
+import time
+import control_log
+from components import Components
+from control_protocol import COMMAND_VECTORS, ControlDispatcher, decode_control, encode_ack, merge_control
+from frame_hub import PROBE_FOLDED_STAGES, FrameHub
+from gsm import GSMModem
+from hal import L298NMotorDriver, ServoDriver, create_backend
+from latency_probe import LatencyProbe, parse_frames, parse_reports
+from metrics import REGISTRY, render_histogram, timed
+from motor_control import MotorController
+from mjpeg_stream import BOUNDARY_TRAILER, MJPEGStream, encode_jpeg, find_tier
+from rate_limit import CommandRateLimiter
+from recorder import KIND_CONTROL, KIND_NAMES, KIND_TELEMETRY, FrameHubTap, RingReader, RingRecorder, decode_event
+from telemetry import TelemetryBroadcaster, TelemetryBus
+import config
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Global variables for car control
-current_speed = 0
-current_direction = "STOP"
+# Shared state for every control input path (socket, HTTP fallback)
+hardware = create_backend()
+motor_controller = MotorController(L298NMotorDriver(hardware))
+control_dispatcher = ControlDispatcher(motor_controller, ServoDriver(hardware))
+# MAX_COMMAND_RATE per client across its channels; over the limit only the
+# newest state of each channel is kept
+command_limiter = CommandRateLimiter(spawn=socketio.start_background_task,
+                                     sleep=socketio.sleep)
+
+# Hot-path metrics; /metrics serves these with everything else in REGISTRY
+HANDLER_SECONDS = REGISTRY.histogram('handler_seconds', 'HTTP route and socket event handler latency',
+                                     ('handler',))
+COMMANDS = REGISTRY.counter('control_commands_total', 'Control commands received', ('source', 'kind'))
+FRAMES_SERVED = REGISTRY.counter('mjpeg_frames_served_total', 'Frames written to /video_feed clients')
+BYTES_SERVED = REGISTRY.counter('mjpeg_bytes_served_total', 'Bytes written to /video_feed clients')
+HTTP_DRIVE_COMMANDS = COMMANDS.labels('http', 'drive')
+SOCKET_CONTROL_COMMANDS = COMMANDS.labels('socket', 'control')
+JOYSTICK_COMMANDS = COMMANDS.labels('socket', 'joystick')
+HTTP_SERVO_COMMANDS = COMMANDS.labels('http', 'servo')
+
+def handler_timed(name):
+    return timed(HANDLER_SECONDS.labels(name))
+
+# Slow or fallible dependencies (camera/OpenCV, signaling, GSM, recorder)
+# come up lazily and are reported by /ready; see create_app()
+components = Components()
 
 class VideoCamera:
     def __init__(self):
         # For testing, we'll generate a test pattern
         # Replace this with actual RPi camera when ready
-        self.frame_count = 0
+        from synthetic_video import TestPatternRenderer
+        self.renderer = TestPatternRenderer(config.VIDEO_WIDTH, config.VIDEO_HEIGHT,
+                                            config.TEST_VIDEO_FPS)
         
     def __del__(self):
         pass
     
+    @property
+    def frame_count(self):
+        return self.renderer.frame_count
+    
+    def read(self):
+        # Generate test video pattern (raw BGR, encoded by the frame hub)
+        return self.renderer.render()
+    
     def get_frame(self):
-        # Generate test video pattern
-        self.frame_count += 1
-        
-        # Create a test frame
-        frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        
-        # Add gradient background
-        for i in range(480):
-            frame[i, :] = [i//2, (i//3) % 255, 150]
-        
-        # Add moving circle
-        center_x = int(320 + 200 * np.sin(self.frame_count * 0.05))
-        center_y = int(240 + 100 * np.cos(self.frame_count * 0.05))
-        cv2.circle(frame, (center_x, center_y), 50, (0, 255, 255), -1)
-        
-        # Add timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cv2.putText(frame, f"Test Video Feed", (10, 30), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        cv2.putText(frame, timestamp, (10, 60), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-        cv2.putText(frame, f"Frame: {self.frame_count}", (10, 90), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-        
         # Encode frame
-        ret, jpeg = cv2.imencode('.jpg', frame)
+        import cv2
+        ret, jpeg = cv2.imencode('.jpg', self.read())
         return jpeg.tobytes()
 
-def gen(camera):
+# Glass-to-glass latency per video path; the MJPEG hub stamps its frames in
+# config.LATENCY_PROBE mode, the Pi's WebRTC sender posts its own
+latency_probes = {'mjpeg': LatencyProbe('mjpeg', folded=PROBE_FOLDED_STAGES),
+                  'webrtc': LatencyProbe('webrtc')}
+
+# One capture/encode pipeline shared by every /video_feed viewer; the camera
+# (and OpenCV with it) is built by warm-up or the first viewer
+camera = components.add('camera', VideoCamera)
+# Viewers run on eventlet green threads: waits must yield (socketio.sleep)
+frame_hub = FrameHub(camera.get, encode_jpeg, config.MJPEG_TIERS,
+                     probe=latency_probes['mjpeg'] if config.LATENCY_PROBE else None,
+                     sleep=socketio.sleep)
+
+def gen(subscriber, pinned=False):
+    frames = MJPEGStream(subscriber, pinned=pinned, sleep=socketio.sleep).frames()
+    try:
+        for chunk in frames:
+            BYTES_SERVED.inc(len(chunk))
+            if chunk is BOUNDARY_TRAILER:
+                FRAMES_SERVED.inc()
+            yield chunk
+    finally:
+        frames.close()
+
+REGISTRY.gauge('mjpeg_viewers', 'Connected /video_feed clients', lambda: frame_hub.viewer_count)
+
+# Session recording: /video_feed frames, control changes and periodic
+# status snapshots, interleaved in one ring file
+def start_recorder():
+    recorder = RingRecorder()
+    control_dispatcher.observers.append(recorder.on_control)
+    FrameHubTap(frame_hub, recorder).start()
+    threading.Thread(target=record_telemetry, args=(recorder,), daemon=True).start()
+    return recorder
+
+session_recorder = components.add('recorder', start_recorder, required=False,
+                                  enabled=config.RECORD_ENABLED)
+
+# Inbound control messages, logged before decoding so a replay feeds the
+# handlers exactly what they received (see control_log.py)
+control_logger = None
+if config.CONTROL_LOG_ENABLED:
+    control_logger = control_log.ControlLogWriter()
+    atexit.register(control_logger.close)
+
+# Status pushed to every dashboard: sources publish into the bus at their
+# own rates, the broadcaster sends what changed once per tick
+telemetry_bus = TelemetryBus()
+telemetry = TelemetryBroadcaster(telemetry_bus, socketio)
+
+def publish_control(dispatcher):
+    telemetry_bus.update({
+        'direction': dispatcher.direction,
+        'drive': [dispatcher.x, dispatcher.y],
+        'servos': list(dispatcher.servos),
+        'control_source': dispatcher.source
+    })
+
+control_dispatcher.observers.append(publish_control)
+
+def read_speed():
+    return {'speed': [round(motor_controller.left), round(motor_controller.right)]}
+
+def read_link():
+    limiter = command_limiter.stats()
+    return {'link': {
+        'clients': telemetry.client_count,
+        'viewers': frame_hub.viewer_count,
+        'commands': limiter['accepted'],
+        'dropped': limiter['dropped'],
+        'auto_stops': motor_controller.auto_stops
+    }}
+
+def read_battery():
+    # The battery monitor pulls BATTERY_PIN low below BATTERY_WARNING_LEVEL
+    return {'battery': {'low': not hardware.read(config.BATTERY_PIN),
+                        'warning_level': config.BATTERY_WARNING_LEVEL}}
+
+if config.ENABLE_BATTERY_MONITOR:
+    hardware.setup_input(config.BATTERY_PIN)
+
+# GSM modem: a worker thread owns the serial port, handlers only read its
+# cached status
+def start_gsm():
+    modem = GSMModem()
+    modem.listeners.append(lambda status: telemetry_bus.publish('gsm', {
+        'registered': status['registered'],
+        'registration': status['registration'],
+        'bars': status['bars'],
+        'dbm': status['dbm']
+    }))
+    modem.start()
+    return modem
+
+gsm_modem = components.add('gsm', start_gsm, required=False, enabled=config.GSM_ENABLED)
+
+def start_telemetry():
+    socketio.start_background_task(telemetry.run, socketio.sleep)
+    socketio.start_background_task(telemetry_bus.poll, read_speed,
+                                   config.TELEMETRY_SPEED_INTERVAL, socketio.sleep)
+    socketio.start_background_task(telemetry_bus.poll, read_link,
+                                   config.TELEMETRY_LINK_INTERVAL, socketio.sleep)
+    if config.ENABLE_BATTERY_MONITOR:
+        socketio.start_background_task(telemetry_bus.poll, read_battery,
+                                       config.BATTERY_POLL_INTERVAL, socketio.sleep)
+
+REGISTRY.gauge('telemetry_clients', 'Dashboards subscribed to telemetry', lambda: telemetry.client_count)
+REGISTRY.gauge('telemetry_batches', 'Telemetry batches broadcast', lambda: telemetry.batch)
+REGISTRY.gauge('telemetry_catchups', 'Telemetry catch-up deltas sent to lagging clients',
+               lambda: telemetry.catchups)
+
+def record_telemetry(recorder):
+    # Snapshot the bus, and only when something changed
+    recorded_seq = 0
     while True:
-        frame = camera.get_frame()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n\r\n')
+        time.sleep(config.RECORD_TELEMETRY_INTERVAL)
+        if telemetry_bus.seq != recorded_seq:
+            recorded_seq = telemetry_bus.seq
+            recorder.record_telemetry(telemetry_bus.snapshot())
 
 @app.route('/')
 def index():
@@ -63,41 +203,193 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(gen(VideoCamera()),
+    # ?tier=<name|index> pins the stream to one quality tier
+    tier = find_tier(config.MJPEG_TIERS, request.args.get('tier'))
+    pinned = tier is not None
+    if not pinned:
+        tier = config.MJPEG_DEFAULT_TIER
+    return Response(gen(frame_hub.subscribe(tier), pinned),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/video_feed/stats')
+def video_feed_stats():
+    return jsonify(frame_hub.stats())
+
+@app.route('/metrics/latency', methods=['GET', 'POST'])
+def latency_metrics():
+    """
+    GET: whether the probe is on, and per-stage percentiles (ms) per path.
+    POST: sender frames ({path, frames}) or displayed-frame reports from a
+    dashboard ({path, reports}); the reply carries the server clock so
+    dashboards can put their timestamps on it.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'expected a JSON object'}), 400
+        path = data.get('path')
+        probe = latency_probes.get(path) if isinstance(path, str) else None
+        if probe is None:
+            return jsonify({'error': 'unknown path'}), 400
+        # Validate everything first, so a bad record applies nothing
+        try:
+            frames = parse_frames(data.get('frames', []))
+            reports = parse_reports(data.get('reports', []))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        probe.add_frames(frames)
+        for code, received, displayed in reports:
+            probe.report(code, received, displayed)
+        return jsonify({'time': time.time() * 1000})
+    return jsonify({
+        'enabled': config.LATENCY_PROBE,
+        'time': time.time() * 1000,
+        'paths': {path: probe.snapshot() for path, probe in latency_probes.items()}
+    })
+
+def collect_latency():
+    lines = ['# HELP video_latency_seconds Glass-to-glass video latency per pipeline stage',
+             '# TYPE video_latency_seconds histogram']
+    for path, probe in latency_probes.items():
+        for stage, histogram in probe.histograms.items():
+            lines.extend(render_histogram('video_latency_seconds', histogram,
+                                          {'path': path, 'stage': stage}))
+    return lines
+
+REGISTRY.add_collector(collect_latency)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/recording')
+def recording():
+    """Recorder stats and the segment index of the ring file"""
+    recorder = session_recorder.peek()
+    if recorder is None:
+        return jsonify({'enabled': config.RECORD_ENABLED, 'component': session_recorder.status()})
+    reader = RingReader(config.RECORD_PATH)
+    try:
+        segments = [segment.to_dict() for segment in reader.segments()]
+    finally:
+        reader.close()
+    return jsonify({'enabled': True, 'stats': recorder.stats(), 'segments': segments})
+
+def open_recording():
+    """(RingReader, None), or (None, error response) when there is nothing to read"""
+    if not config.RECORD_ENABLED:
+        return None, (jsonify({'error': 'recording is disabled'}), 409)
+    if not os.path.exists(config.RECORD_PATH):
+        return None, (jsonify({'error': 'nothing recorded yet'}), 404)
+    return RingReader(config.RECORD_PATH), None
+
+@app.route('/recording/frame')
+def recording_frame():
+    """First recorded frame at or after ?t=<unix time>"""
+    reader, error = open_recording()
+    if error:
+        return error
+    try:
+        found = reader.frame_at(request.args.get('t', 0.0, type=float))
+    finally:
+        reader.close()
+    if found is None:
+        return jsonify({'error': 'no frame at or after that time'}), 404
+    response = Response(found[1], mimetype='image/jpeg')
+    response.headers['X-Frame-Time'] = repr(found[0])
+    return response
+
+@app.route('/recording/events')
+def recording_events():
+    """Control/telemetry events from ?t=<unix time>, at most ?limit="""
+    limit = request.args.get('limit', 100, type=int)
+    reader, error = open_recording()
+    if error:
+        return error
+    events = []
+    try:
+        for timestamp, kind, payload in reader.seek(request.args.get('t', 0.0, type=float),
+                                                     kinds=(KIND_CONTROL, KIND_TELEMETRY)):
+            events.append({'time': timestamp, 'kind': KIND_NAMES[kind],
+                           'data': decode_event(kind, payload)})
+            if len(events) >= limit:
+                break
+    finally:
+        reader.close()
+    return jsonify(events)
+
 @app.route('/control', methods=['POST'])
+@handler_timed('control')
 def control():
-    global current_direction, current_speed
-    data = request.json
+    if control_logger is not None:
+        control_logger.log_http(control_log.SOURCE_HTTP_CONTROL, request.remote_addr,
+                                request.get_data())
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('command', ''), str):
+        return jsonify({'status': 'error', 'error': 'expected {"command": "<name>"}'}), 400
     command = data.get('command', '')
     
-    # Process movement commands
-    if command in ['forward', 'backward', 'left', 'right', 'stop']:
-        current_direction = command.upper()
-        print(f"Car Command: {current_direction}")
-        # Here you would send commands to RPi GPIO/Motor driver
+    # HTTP fallback for the binary 'control' socket event
+    if command in COMMAND_VECTORS:
+        HTTP_DRIVE_COMMANDS.inc()
+        print(f"Car Command: {command.upper()}")
+        command_limiter.submit(request.remote_addr, 'drive',
+                               lambda c: control_dispatcher.command(c, source='http'),
+                               command)
         
     return jsonify({
         'status': 'success',
         'command': command,
-        'direction': current_direction
+        'direction': control_dispatcher.direction
     })
 
+@socketio.on('control')
+@handler_timed('socket_control')
+def handle_control(payload):
+    received_at = time.monotonic()
+    if control_logger is not None:
+        control_logger.log_control(request.sid, payload)
+    try:
+        message = decode_control(payload)
+    except ValueError as e:
+        print(f"Bad control message: {e}")
+        return
+    
+    SOCKET_CONTROL_COMMANDS.inc()
+    sid = request.sid
+    applied = command_limiter.submit(
+        sid, 'control',
+        lambda m: control_dispatcher.handle_message(sid, m, received_at),
+        message, merge=merge_control)
+    if applied:
+        emit('control_ack', encode_ack(message))
+
 @socketio.on('joystick_move')
+@handler_timed('joystick_move')
 def handle_joystick(data):
-    global current_speed, current_direction
+    if not isinstance(data, dict):
+        print(f"Bad joystick message: {data!r}")
+        return
     x = data.get('x', 0)
     y = data.get('y', 0)
+    JOYSTICK_COMMANDS.inc()
+    if control_logger is not None:
+        control_logger.log_joystick(request.sid, x, y)
+    # Reject before the rate limiter: a bad message must not cost a token
+    try:
+        x, y = control_dispatcher.validate_vector(x, y)
+    except ValueError as e:
+        print(f"Bad joystick message: {e}")
+        return
     
-    # Calculate speed and direction from joystick position
     # x: -100 (left) to 100 (right)
-    # y: -100 (forward) to 100 (backward)
+    # y: -100 (backward) to 100 (forward)
     
     print(f"Joystick: X={x}, Y={y}")
-    
-    # Here you would convert joystick values to motor commands
-    # and send to RPi
+    command_limiter.submit(request.sid, 'drive',
+                           lambda xy: control_dispatcher.drive(*xy, source='joystick_move'),
+                           (x, y))
     
     emit('joystick_response', {
         'x': x,
@@ -106,43 +398,187 @@ def handle_joystick(data):
     })
 
 @app.route('/servo_control', methods=['POST'])
+@handler_timed('servo_control')
 def servo_control():
-    data = request.json
+    if control_logger is not None:
+        control_logger.log_http(control_log.SOURCE_HTTP_SERVO, request.remote_addr,
+                                request.get_data())
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'error': 'expected a JSON object'}), 400
     servo_id = data.get('servo_id')
     angle = data.get('angle', 90)
     
-    # Ensure angle is within range
-    angle = max(0, min(180, angle))
+    try:
+        index, angle = control_dispatcher.validate_servo(servo_id, angle)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+    servo_id = index + 1
     
     print(f"Servo {servo_id}: {angle}°")
-    # Here you would send PWM signal to servo
-    # Example with RPi.GPIO:
-    # servo_pwm[servo_id].ChangeDutyCycle(angle_to_duty_cycle(angle))
+    HTTP_SERVO_COMMANDS.inc()
+    applied = command_limiter.submit(
+        request.remote_addr, f'servo{servo_id}',
+        lambda a: control_dispatcher.set_servo(servo_id, a, source='http'),
+        angle)
     
     return jsonify({
-        'status': 'success',
+        'status': 'success' if applied else 'queued',
         'servo_id': servo_id,
         'angle': angle
     })
 
+@app.route('/gsm')
+def gsm_status():
+    modem = gsm_modem.peek()
+    if modem is None:
+        return jsonify({'enabled': config.GSM_ENABLED, 'component': gsm_modem.status()})
+    return jsonify({'enabled': True, 'status': modem.status(), 'stats': modem.stats()})
+
+@app.route('/ready')
+def ready():
+    """Per-component startup state; 503 until every required component is up"""
+    status = components.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/control/stats')
+def control_stats():
+    stats = control_dispatcher.stats()
+    stats['rate_limit'] = command_limiter.stats()
+    stats['motors'] = motor_controller.stats()
+    stats['hardware'] = hardware.stats()
+    stats['telemetry'] = telemetry.stats()
+    return jsonify(stats)
+
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
+    telemetry.add_client(request.sid)
     emit('connection_response', {'status': 'connected'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    control_dispatcher.forget(request.sid)
+    command_limiter.forget(request.sid)
+    telemetry.remove_client(request.sid)
     print('Client disconnected')
 
+@socketio.on('telemetry_ack')
+def handle_telemetry_ack(data):
+    try:
+        batch, seq = data
+    except (TypeError, ValueError):
+        return
+    telemetry.ack(request.sid, batch, seq)
+
 from flask import jsonify, request
-from firebase_signalling import FirebaseSignaling
+from flask_socketio import join_room
+from signaling_backend import LocalSignaling, create_signaling, run_garbage_collector
 from webrtc_config import *
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Initialize Firebase signaling
-signaling = FirebaseSignaling('rpi-dashboard-webrtc-firebase-adminsdk-fbsvc-a1d73bace1.json')
+# In-memory signaling rooms, served to LAN clients on SIGNALING_NAMESPACE
+local_signaling = LocalSignaling()
+
+# Signaling backend for the HTTP routes, built by warm-up or first use; if
+# Firestore cannot start (e.g. no credentials file) the dashboard falls
+# back to its LAN signaling instead of failing
+def start_signaling():
+    if SIGNALING_BACKEND == 'local':
+        return local_signaling
+    return create_signaling(SIGNALING_BACKEND, FIREBASE_CREDENTIALS_PATH)
+
+signaling = components.add('signaling', start_signaling, fallback=lambda: local_signaling)
+
+def collect_signaling_garbage():
+    # Wait for warm-up rather than building the backend on the event loop
+    while signaling.peek() is None:
+        socketio.sleep(1.0)
+    run_garbage_collector(signaling.peek(), sleep=socketio.sleep)
+
+def relay_signaling_event(room_id, event, data):
+    socketio.emit(event, {'room': room_id, 'data': data}, to=room_id,
+                  namespace=SIGNALING_NAMESPACE)
+
+local_signaling.subscribe(relay_signaling_event)
+
+REGISTRY.gauge('signaling_reads', 'Signaling documents/events read by the dashboard',
+               lambda: getattr(signaling.peek(), 'reads', 0))
+REGISTRY.gauge('signaling_duplicates', 'Duplicate signaling deliveries dropped',
+               lambda: getattr(signaling.peek(), 'duplicates', 0))
+
+@socketio.on('join', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_join')
+def signaling_join(data):
+    """
+    Subscribe to a room's events and replay its current state
+    (ICE candidates only after the client's cursor)
+    """
+    room_id = data['room']
+    event = data.get('event')
+    join_room(room_id)
+    room = local_signaling.rooms.get(room_id)
+    if room is None:
+        return True
+    if event in ('offer', 'answer') and room[event]:
+        emit(event, {'room': room_id, 'data': room[event]})
+    elif event == 'ice_candidate':
+        for entry in local_signaling.entries_after(room_id, data.get('after', 0)):
+            if entry['from'] != data.get('device'):
+                emit(event, {'room': room_id, 'data': entry})
+    elif event == 'session':
+        for session in list(room['sessions']):
+            emit(event, {'room': room_id, 'data': session})
+    return True
+
+@socketio.on('create_room', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_create_room')
+def signaling_create_room(data):
+    return local_signaling.create_room(data['room'])
+
+@socketio.on('send_offer', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_send_offer')
+def signaling_send_offer(data):
+    return local_signaling.send_offer(data['room'], data['sdp'], data['from'])
+
+@socketio.on('send_answer', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_send_answer')
+def signaling_send_answer(data):
+    return local_signaling.send_answer(data['room'], data['sdp'], data['from'])
+
+@socketio.on('add_ice_candidates', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_add_ice_candidates')
+def signaling_add_ice_candidates(data):
+    return local_signaling.add_ice_candidates(data['room'], data['candidates'], data['from'])
+
+@socketio.on('join_session', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_join_session')
+def signaling_join_session(data):
+    return local_signaling.join_session(data['room'], data['session'], data['from'])
+
+@socketio.on('delete_session', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_delete_session')
+def signaling_delete_session(data):
+    return local_signaling.delete_session(data['room'], data['session'])
+
+@socketio.on('get_room', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_get_room')
+def signaling_get_room(data):
+    room = local_signaling.rooms.get(data['room'])
+    return dict(room, ice_candidates=list(room['ice_candidates']),
+                sessions=list(room['sessions'])) if room else None
+
+@socketio.on('get_ice_candidates', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_get_ice_candidates')
+def signaling_get_ice_candidates(data):
+    return local_signaling.entries_after(data['room'], data.get('after', 0))
+
+@socketio.on('cleanup_room', namespace=SIGNALING_NAMESPACE)
+@handler_timed('signaling_cleanup_room')
+def signaling_cleanup_room(data):
+    return local_signaling.cleanup_room(data['room'])
 
 def add_webrtc_routes(app):
     """
@@ -150,17 +586,19 @@ def add_webrtc_routes(app):
     """
     
     @app.route('/webrtc/config')
+    @handler_timed('webrtc_config')
     def webrtc_config():
         """
         Return WebRTC configuration for client
         """
         return jsonify({
             'iceServers': WEBRTC_CONFIG['iceServers'],
-            'roomId': 'rpi_car_stream',
+            'roomId': ROOM_ID,
             'deviceId': DASHBOARD_DEVICE_ID
         })
     
     @app.route('/webrtc/offer', methods=['POST'])
+    @handler_timed('webrtc_offer')
     def receive_offer():
         """
         Receive offer from client (not used, client gets from Firebase)
@@ -177,6 +615,7 @@ def add_webrtc_routes(app):
             return jsonify({'error': str(e)}), 500
     
     @app.route('/webrtc/answer', methods=['POST'])
+    @handler_timed('webrtc_answer')
     def send_answer():
         """
         Send answer to Firebase (backup route, client sends directly)
@@ -187,7 +626,7 @@ def add_webrtc_routes(app):
             answer = data.get('answer')
             device_id = data.get('deviceId', DASHBOARD_DEVICE_ID)
             
-            signaling.send_answer(room_id, answer, device_id)
+            signaling.get().send_answer(room_id, answer, device_id)
             
             return jsonify({'status': 'success'})
         except Exception as e:
@@ -195,6 +634,7 @@ def add_webrtc_routes(app):
             return jsonify({'error': str(e)}), 500
     
     @app.route('/webrtc/ice-candidate', methods=['POST'])
+    @handler_timed('webrtc_ice_candidate')
     def add_ice_candidate():
         """
         Add ICE candidate to Firebase (backup route)
@@ -205,7 +645,7 @@ def add_webrtc_routes(app):
             candidate = data.get('candidate')
             device_id = data.get('deviceId', DASHBOARD_DEVICE_ID)
             
-            signaling.add_ice_candidate(room_id, candidate, device_id)
+            signaling.get().add_ice_candidate(room_id, candidate, device_id)
             
             return jsonify({'status': 'success'})
         except Exception as e:
@@ -213,12 +653,13 @@ def add_webrtc_routes(app):
             return jsonify({'error': str(e)}), 500
     
     @app.route('/webrtc/status/<room_id>')
+    @handler_timed('webrtc_status')
     def get_room_status(room_id):
         """
         Get current room status
         """
         try:
-            status = signaling.get_room_status(room_id)
+            status = signaling.get().get_room_status(room_id)
             return jsonify({
                 'status': status,
                 'roomId': room_id
@@ -227,8 +668,19 @@ def add_webrtc_routes(app):
             logger.error(f"Error getting room status: {e}")
             return jsonify({'error': str(e)}), 500
 
+@app.route('/webrtc/gc', methods=['GET', 'POST'])
+@handler_timed('webrtc_gc')
+def signaling_gc():
+    """
+    Expire signaling rooms older than SIGNALING_ROOM_TTL.
+    GET reports what would be removed (dry run), POST removes it.
+    """
+    ttl = request.args.get('ttl', SIGNALING_ROOM_TTL, type=float)
+    return jsonify(signaling.get().collect_garbage(ttl, dry_run=request.method == 'GET'))
+
 # WebRTC Configuration Route
 @app.route('/webrtc/config')
+@handler_timed('webrtc_config')
 def webrtc_config():
     """Return WebRTC and Firebase configuration for client"""
     import os
@@ -242,9 +694,23 @@ def webrtc_config():
         'appId': os.getenv('FIREBASE_APP_ID', '1:123456789:web:abc123')
     }
     
+    # Never build or wait for the backend here (this runs on the event loop):
+    # until it is up, report its state and let the dashboard ask again
+    backend = signaling.peek()
+    if backend is None:
+        signaling.warm_in_background()
+        mode = signaling.state
+    elif SIGNALING_BACKEND == 'firebase' and backend is not local_signaling:
+        mode = 'firebase'
+    else:
+        mode = 'local'
     return jsonify({
         'firebase': firebase_web_config,
-        'roomId': 'rpi_car_stream',
+        'signaling': mode,
+        'signalingNamespace': SIGNALING_NAMESPACE,
+        # With a relay or a fan-out sender every dashboard joins its own session
+        'roomId': RELAY_ROOM_ID if RELAY_ENABLED else ROOM_ID,
+        'fanout': FANOUT_ENABLED or RELAY_ENABLED,
         'deviceId': 'dashboard_viewer',
         'iceServers': [
             {'urls': 'stun:stun.l.google.com:19302'},
@@ -253,6 +719,25 @@ def webrtc_config():
         ]
     })
 
-if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+_started = False
 
+def create_app(warm_up=True):
+    """
+    Start background work and return the Flask app (serve it with
+    socketio.run). Importing this module loads no camera, OpenCV, Firebase
+    or serial port; warm_up builds them in a background thread while the
+    server already answers, /ready reports each as it comes up.
+    """
+    global _started
+    if not _started:
+        _started = True
+        socketio.start_background_task(collect_signaling_garbage)
+        start_telemetry()
+        if warm_up:
+            components.start_warm_up()
+    return app
+
+if __name__ == '__main__':
+    create_app()
+    socketio.run(app, host=config.FLASK_HOST, port=config.FLASK_PORT, debug=config.FLASK_DEBUG,
+                 use_reloader=config.FLASK_RELOADER)
@@ -0,0 +1,162 @@
+"""
+Asyncio signaling client
+Same API as SignalingBackend, but every call is a coroutine: blocking
+Firestore SDK calls run in a bounded thread pool, trickled ICE candidates
+are collected for a short window and written in one batched commit, and
+listener callbacks are delivered on the event loop thread
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Histogram
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSignaling:
+    """
+    Asyncio wrapper around a blocking SignalingBackend.
+    The backend is created in the executor on connect(), so not even its
+    initialization blocks the loop.
+    """
+    def __init__(self, backend_factory, max_workers=SIGNALING_MAX_WORKERS,
+                 batch_window=ICE_BATCH_WINDOW):
+        self.backend_factory = backend_factory
+        self.backend = None
+        self.batch_window = batch_window
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='signaling')
+        self._loop = None
+        self._pending_ice = {}
+        self._flush_handle = None
+        self._flush_tasks = set()
+        self.round_trip = Histogram()
+        self.calls = 0
+        self.ice_batches = 0
+        self.ice_candidates = 0
+
+    async def connect(self):
+        self._loop = asyncio.get_running_loop()
+        if self.backend is None:
+            self.backend = await self._loop.run_in_executor(self._executor, self.backend_factory)
+        return self
+
+    async def _call(self, method, *args):
+        """Run a blocking backend method in the executor and time its round trip"""
+        if self.backend is None:
+            await self.connect()
+        start = time.monotonic()
+        try:
+            return await self._loop.run_in_executor(
+                self._executor, functools.partial(getattr(self.backend, method), *args))
+        finally:
+            self.calls += 1
+            self.round_trip.observe(time.monotonic() - start)
+
+    async def create_room(self, room_id):
+        return await self._call('create_room', room_id)
+
+    async def send_offer(self, room_id, offer_sdp, device_id):
+        return await self._call('send_offer', room_id, offer_sdp, device_id)
+
+    async def send_answer(self, room_id, answer_sdp, device_id):
+        return await self._call('send_answer', room_id, answer_sdp, device_id)
+
+    async def add_ice_candidate(self, room_id, candidate, device_id):
+        """
+        Queue a candidate; everything queued within batch_window is written
+        in a single batched commit
+        """
+        self._pending_ice.setdefault((room_id, device_id), []).append(candidate)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_window, self._schedule_flush)
+        return True
+
+    def _schedule_flush(self):
+        self._flush_handle = None
+        task = asyncio.ensure_future(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self):
+        """Write all queued ICE candidates now"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending_ice = self._pending_ice, {}
+        for (room_id, device_id), candidates in pending.items():
+            self.ice_batches += 1
+            self.ice_candidates += len(candidates)
+            await self._call('add_ice_candidates', room_id, candidates, device_id)
+
+    async def get_offer(self, room_id):
+        return await self._call('get_offer', room_id)
+
+    async def get_answer(self, room_id):
+        return await self._call('get_answer', room_id)
+
+    async def get_ice_candidates(self, room_id, device_id, incremental=True):
+        return await self._call('get_ice_candidates', room_id, device_id, incremental)
+
+    async def get_room_status(self, room_id):
+        return await self._call('get_room_status', room_id)
+
+    async def join_session(self, room_id, session_id, device_id):
+        return await self._call('join_session', room_id, session_id, device_id)
+
+    async def delete_session(self, room_id, session_id):
+        return await self._call('delete_session', room_id, session_id)
+
+    async def cleanup_room(self, room_id):
+        await self.flush()
+        return await self._call('cleanup_room', room_id)
+
+    def _on_loop(self, callback):
+        """
+        Wrap a listener callback so it runs on the event loop thread
+        (the SDK fires snapshot callbacks on its own threads).
+        Called from the listen_* coroutines, before _call() has connected.
+        """
+        loop = asyncio.get_running_loop()
+
+        def deliver(*args):
+            if asyncio.iscoroutinefunction(callback):
+                loop.call_soon_threadsafe(lambda: asyncio.ensure_future(callback(*args)))
+            else:
+                loop.call_soon_threadsafe(callback, *args)
+        return deliver
+
+    async def listen_for_offer(self, room_id, callback):
+        return await self._call('listen_for_offer', room_id, self._on_loop(callback))
+
+    async def listen_for_answer(self, room_id, callback):
+        return await self._call('listen_for_answer', room_id, self._on_loop(callback))
+
+    async def listen_for_ice_candidates(self, room_id, device_id, callback):
+        return await self._call('listen_for_ice_candidates', room_id, device_id,
+                                self._on_loop(callback))
+
+    async def listen_for_sessions(self, room_id, callback):
+        return await self._call('listen_for_sessions', room_id, self._on_loop(callback))
+
+    async def close(self):
+        await self.flush()
+        if hasattr(self.backend, 'close'):
+            await self._call('close')
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        stats = self.backend.stats() if self.backend is not None else {}
+        stats.update({
+            'calls': self.calls,
+            'ice_candidates': self.ice_candidates,
+            'ice_batches': self.ice_batches,
+            'round_trip_ms': self.round_trip.snapshot()
+        })
+        return stats
@@ -0,0 +1,61 @@
+"""
+End-to-end command path benchmark on the simulated HAL
+binary control message -> decode -> ControlDispatcher -> motor loop tick
+-> L298N/servo drivers -> SimulatedBackend write log
+
+Usage: python benchmarks/bench_command_path.py [messages]
+"""
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from control_protocol import FLAG_DRIVE, FLAG_SERVOS, ControlDispatcher, decode_control, encode_control
+from hal import L298NMotorDriver, ServoDriver, SimulatedBackend
+from metrics import Histogram
+from motor_control import MotorController
+
+
+def build_messages(count):
+    """A joystick sweep with a servo change every 10th message"""
+    messages = []
+    for seq in range(1, count + 1):
+        angle = seq * 0.01
+        x = int(100 * math.cos(angle))
+        y = int(100 * math.sin(angle))
+        servos = (seq % 181, 90, 180 - seq % 181)
+        flags = FLAG_DRIVE | (FLAG_SERVOS if seq % 10 == 0 else 0)
+        messages.append(encode_control(seq, seq, x, y, servos, flags))
+    return messages
+
+
+def run(count=200000):
+    backend = SimulatedBackend()
+    motors = MotorController(L298NMotorDriver(backend), autostart=False)
+    dispatcher = ControlDispatcher(motors, ServoDriver(backend))
+    messages = build_messages(count)
+    latency = Histogram((1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3))
+    backend.clear()
+
+    start = time.perf_counter()
+    for payload in messages:
+        received = time.perf_counter()
+        dispatcher.handle_message('bench', decode_control(payload))
+        motors.tick()
+        latency.observe(time.perf_counter() - received)
+    elapsed = time.perf_counter() - start
+
+    summary = latency.snapshot(scale=1e6)
+    print(f"messages:        {count}")
+    print(f"elapsed:         {elapsed:.3f} s")
+    print(f"throughput:      {count / elapsed:,.0f} msg/s")
+    print(f"actuator writes: {backend.writes} ({backend.writes / elapsed:,.0f} writes/s)")
+    print(f"latency (us):    p50<={summary['p50']} p99<={summary['p99']} max={summary['max']}")
+    return count / elapsed
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
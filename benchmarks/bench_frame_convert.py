@@ -0,0 +1,65 @@
+"""
+Per-frame CPU cost of the WebRTC sender's frame path
+Compares the original BGR->RGB + rgb24 path with the pooled bgr24 and
+yuv420p paths, each including the yuv420p conversion the encoder needs.
+
+Usage: python benchmarks/bench_frame_convert.py [frames]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'RPi'))
+
+import cv2
+import numpy as np
+from av import VideoFrame
+
+from frame_convert import FrameConverter
+from webrtc_config import VIDEO_HEIGHT, VIDEO_WIDTH
+
+
+def to_encoder_input(frame):
+    """What the encoder does before encoding: make sure the frame is yuv420p"""
+    if frame.format.name != 'yuv420p':
+        frame = frame.reformat(format='yuv420p')
+    return frame
+
+
+def legacy_path(bgr):
+    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    return to_encoder_input(VideoFrame.from_ndarray(rgb, format='rgb24'))
+
+
+def measure(name, convert, frames, count):
+    for bgr in frames[:10]:
+        convert(bgr)
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    for n in range(count):
+        convert(frames[n % len(frames)])
+    cpu = (time.process_time() - start_cpu) / count
+    wall = (time.perf_counter() - start) / count
+    print(f"{name:<10} cpu {cpu * 1000:7.3f} ms/frame   wall {wall * 1000:7.3f} ms/frame")
+    return cpu
+
+
+def run(count=500):
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (VIDEO_HEIGHT, VIDEO_WIDTH, 3), dtype=np.uint8) for _ in range(4)]
+
+    bgr24 = FrameConverter('bgr24')
+    yuv = FrameConverter('yuv420p')
+
+    baseline = measure('rgb24', legacy_path, frames, count)
+    for name, converter in (('bgr24', bgr24), ('yuv420p', yuv)):
+        cpu = measure(name, lambda f, c=converter: to_encoder_input(c.convert(f)), frames, count)
+        print(f"{'':<10} saves {(baseline - cpu) * 1000:.3f} ms CPU/frame "
+              f"({(1 - cpu / baseline) * 100:.0f}%)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,116 @@
+"""
+GSM worker: pipelined command throughput and handler latency on a slow modem
+
+Runs against gsm.FakeModem on a pty (no hardware needed):
+
+1. Commands/sec for pipeline depths 1..8 with a per-byte link latency and a
+   fixed per-command processing time in the modem.
+2. Handler latency while the modem takes seconds per command: what a Flask
+   handler costs reading GSMModem.status() with commands queued, against a
+   handler doing the naive blocking write-and-read on the port.
+
+Usage: python benchmarks/bench_gsm.py [commands] [link_latency_ms] [processing_ms]
+"""
+
+import os
+import select
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gsm import FakeModem, GSMModem, open_serial
+
+SLOW_PROCESSING = 1.5  # seconds per command for part 2
+
+
+def start(fake, depth, timeout=5.0):
+    fake.start()
+    modem = GSMModem(port=fake.device, timeout=timeout, pipeline_depth=depth, poll_interval=3600)
+    modem.start()
+    modem.command('AT')  # init commands done
+    return modem
+
+
+def throughput(commands, latency, processing, depth):
+    fake = FakeModem(latency=latency, processing=processing)
+    modem = start(fake, depth)
+    began = time.perf_counter()
+    pending = [modem.submit('AT+CSQ') for _ in range(commands)]
+    ok = sum(1 for command in pending if command.wait(30) and command.response.ok)
+    elapsed = time.perf_counter() - began
+    modem.stop()
+    return ok / elapsed, ok
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def worker_handler_latency(reads):
+    fake = FakeModem(processing=SLOW_PROCESSING)
+    modem = start(fake, depth=4, timeout=30.0)
+    for _ in range(4):
+        modem.submit('AT+CSQ')  # keep the modem busy for the whole run
+    samples = []
+    for _ in range(reads):
+        start_at = time.perf_counter()
+        status = modem.status()
+        samples.append(time.perf_counter() - start_at)
+        assert status['registered'] is not None
+    modem.stop()
+    return samples
+
+
+def naive_handler(port):
+    """What a handler would do without the worker: ask and block on the answer"""
+    port.write(b'AT+CSQ\r')
+    data = b''
+    while b'OK\r\n' not in data:
+        select.select([port.fileno()], [], [], 10)
+        data += port.read(4096)
+    return data
+
+
+def naive_handler_latency(calls):
+    fake = FakeModem(processing=SLOW_PROCESSING)
+    fake.echo = False
+    fake.start()
+    port = open_serial(fake.device, 9600)
+    samples = []
+    for _ in range(calls):
+        start_at = time.perf_counter()
+        naive_handler(port)
+        samples.append(time.perf_counter() - start_at)
+    port.close()
+    fake.stop()
+    return samples
+
+
+def main():
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5.0) / 1000
+    processing = (float(sys.argv[3]) if len(sys.argv) > 3 else 2.0) / 1000
+
+    print(f"{commands} x AT+CSQ, link latency {latency * 1000:.1f} ms each way, "
+          f"modem processing {processing * 1000:.1f} ms\n")
+    print(f"{'depth':>6}{'commands/s':>12}{'ok':>6}")
+    for depth in (1, 2, 4, 8):
+        rate, ok = throughput(commands, latency, processing, depth)
+        print(f"{depth:>6}{rate:>12.1f}{ok:>6}")
+
+    print(f"\nhandler latency while the modem takes {SLOW_PROCESSING:.1f} s per command")
+    samples = worker_handler_latency(100000)
+    print(f"  worker status():  p50 {percentile(samples, 0.5) * 1e6:8.2f} us   "
+          f"p99 {percentile(samples, 0.99) * 1e6:8.2f} us   max {max(samples) * 1e6:8.2f} us")
+
+    # Concurrent handlers queue behind each other on the port, so even
+    # one caller at a time shows the floor
+    samples = naive_handler_latency(3)
+    print(f"  blocking read:    p50 {percentile(samples, 0.5) * 1e3:8.1f} ms   "
+          f"max {max(samples) * 1e3:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+CPU per frame: aiortc software encoding (CameraVideoTrack path) versus
+H.264 passthrough from an external encoder process
+
+Both sides encode the same synthetic 'testsrc' pattern at the configured
+resolution/FPS/bitrate so no camera is needed. CPU includes the encoder
+subprocess for the passthrough path.
+
+Usage: python benchmarks/bench_h264_passthrough.py [frames] [encoder]
+"""
+
+import asyncio
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'RPi'))
+
+from aiortc.codecs.h264 import H264Encoder
+
+from frame_convert import FrameConverter
+from h264_passthrough import H264_TIME_BASE, H264PassthroughTrack
+from synthetic_video import TestPatternRenderer
+from webrtc_config import VIDEO_BITRATE, VIDEO_FPS, VIDEO_HEIGHT, VIDEO_WIDTH
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def bench_software(count):
+    """Raw frames -> FrameConverter -> aiortc H264Encoder, as CameraVideoTrack does"""
+    renderer = TestPatternRenderer(VIDEO_WIDTH, VIDEO_HEIGHT, target_fps=0)
+    converter = FrameConverter()
+    encoder = H264Encoder()
+    encoder.target_bitrate = VIDEO_BITRATE
+
+    start = cpu_seconds()
+    for n in range(count):
+        frame = converter.convert(renderer.render())
+        frame.pts = n * 90000 // VIDEO_FPS
+        frame.time_base = H264_TIME_BASE
+        encoder.encode(frame)
+    return (cpu_seconds() - start) / count
+
+
+async def bench_passthrough(count, encoder_name):
+    """External encoder -> access units -> av.Packet"""
+    source = ['-re', '-f', 'lavfi', '-i', f'testsrc=size={VIDEO_WIDTH}x{VIDEO_HEIGHT}:rate={VIDEO_FPS}']
+    track = H264PassthroughTrack(source_args=source, encoder=encoder_name)
+    packer = H264Encoder()
+
+    start = cpu_seconds()
+    for _ in range(count):
+        packet = await track.recv()
+        packer.pack(packet)
+    track.stop()
+    # Child CPU is only accounted once the process has been reaped
+    return (cpu_seconds() - start) / count
+
+
+def run(count=300, encoder_name='libx264'):
+    software = bench_software(count)
+    passthrough = asyncio.run(bench_passthrough(count, encoder_name))
+    print(f"frames:              {count} @ {VIDEO_WIDTH}x{VIDEO_HEIGHT}, {VIDEO_BITRATE // 1000} kbps")
+    print(f"aiortc software:     {software * 1000:.2f} ms CPU/frame")
+    print(f"passthrough ({encoder_name}): {passthrough * 1000:.2f} ms CPU/frame (incl. encoder process)")
+    print(f"saving:              {(1 - passthrough / software) * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        sys.argv[2] if len(sys.argv) > 2 else 'libx264')
@@ -0,0 +1,54 @@
+"""
+Latency probe code: survival through the MJPEG tiers, and its cost
+
+Stamps test-pattern frames, encodes them the way the frame hub does for
+each config.MJPEG_TIERS entry, decodes the JPEG and reads the code back
+(the same sampling the dashboard's latency_probe.js does). Reports the
+read-back success rate per tier and the per-frame cost of stamping.
+
+Usage: python benchmarks/bench_latency_probe.py [frames]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2
+import numpy as np
+
+import config
+from latency_probe import LatencyProbe, read_code
+from mjpeg_stream import encode_jpeg
+from synthetic_video import TestPatternRenderer
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    renderer = TestPatternRenderer(config.VIDEO_WIDTH, config.VIDEO_HEIGHT, target_fps=0)
+    probe = LatencyProbe('mjpeg')
+
+    stamp_time = 0.0
+    decoded = [0] * len(config.MJPEG_TIERS)
+    for n in range(frames):
+        frame = renderer.render()
+        start = time.perf_counter()
+        code = probe.stamp(frame, time.time() + n * 0.001)
+        stamp_time += time.perf_counter() - start
+        for index, tier in enumerate(config.MJPEG_TIERS):
+            jpeg = encode_jpeg(frame, tier)
+            image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+            if read_code(image) == code:
+                decoded[index] += 1
+
+    print(f"{frames} frames at {config.VIDEO_WIDTH}x{config.VIDEO_HEIGHT}, "
+          f"stamp {stamp_time / frames * 1e6:.1f} us/frame\n")
+    print(f"{'tier':<10}{'quality':>8}{'scale':>7}{'read back':>11}")
+    for tier, count in zip(config.MJPEG_TIERS, decoded):
+        print(f"{tier['name']:<10}{tier['quality']:>8}{tier['scale']:>7}{count / frames:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Cost of the /metrics instrumentation on the MJPEG path
+
+Per served frame the instrumented path does one encode-time observe and a
+frames-produced increment in the frame hub, and gen() wraps the stream's
+generator and counts bytes and frames. This measures that work on its own
+(many iterations, stable) and relative to what a frame already costs
+(test-pattern render + JPEG encode at the default tier + the three
+multipart chunks), and also runs the two paths A/B.
+
+Usage: python benchmarks/bench_metrics_overhead.py [frames]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+from metrics import MetricsRegistry
+from mjpeg_stream import BOUNDARY_HEADER, BOUNDARY_TRAILER, encode_jpeg
+from synthetic_video import TestPatternRenderer
+
+TIER = config.MJPEG_TIERS[config.MJPEG_DEFAULT_TIER]
+
+
+def chunks(frame):
+    yield BOUNDARY_HEADER
+    yield frame
+    yield BOUNDARY_TRAILER
+
+
+def build_metrics():
+    """The same families and children app.py and frame_hub.py use"""
+    registry = MetricsRegistry()
+    encode = registry.histogram('mjpeg_encode_seconds', '', ('tier',)).labels(TIER['name'])
+    produced = registry.counter('mjpeg_frames_produced_total', '')
+    served = registry.counter('mjpeg_frames_served_total', '')
+    sent = registry.counter('mjpeg_bytes_served_total', '')
+    return registry, encode, produced, served, sent
+
+
+def counted(stream, served, sent):
+    """gen() from app.py"""
+    try:
+        for chunk in stream:
+            sent.inc(len(chunk))
+            if chunk is BOUNDARY_TRAILER:
+                served.inc()
+            yield chunk
+    finally:
+        stream.close()
+
+
+def serve(renderer, frames, metrics=None):
+    start = time.perf_counter()
+    for _ in range(frames):
+        frame = renderer.render()
+        encode_start = time.monotonic()
+        jpeg = encode_jpeg(frame, TIER)
+        elapsed = time.monotonic() - encode_start
+        stream = chunks(jpeg)
+        if metrics:
+            _, encode, produced, served, sent = metrics
+            encode.observe(elapsed)
+            produced.inc()
+            stream = counted(stream, served, sent)
+        for chunk in stream:
+            pass
+    return (time.perf_counter() - start) / frames
+
+
+def instrumentation_only(iterations, metrics):
+    _, encode, produced, served, sent = metrics
+    frame = b'\xff' * 30000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode.observe(0.004)
+        produced.inc()
+        for chunk in counted(chunks(frame), served, sent):
+            pass
+    bare = time.perf_counter()
+    for _ in range(iterations):
+        for chunk in chunks(frame):
+            pass
+    end = time.perf_counter()
+    return ((bare - start) - (end - bare)) / iterations
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    renderer = TestPatternRenderer(config.VIDEO_WIDTH, config.VIDEO_HEIGHT, target_fps=0)
+    metrics = build_metrics()
+
+    serve(renderer, 20)  # warm up
+    # Interleave A/B rounds so clock/thermal drift hits both
+    plain, instrumented = [], []
+    for _ in range(5):
+        plain.append(serve(renderer, frames // 5))
+        instrumented.append(serve(renderer, frames // 5, metrics))
+    plain = min(plain)
+    instrumented = min(instrumented)
+    cost = instrumentation_only(200000, metrics)
+
+    print(f"{config.VIDEO_WIDTH}x{config.VIDEO_HEIGHT}, tier '{TIER['name']}', {frames} frames per path\n")
+    print(f"frame (render + encode + chunks): {plain * 1e6:9.1f} us")
+    print(f"instrumented frame:               {instrumented * 1e6:9.1f} us "
+          f"({(instrumented / plain - 1) * 100:+.2f}%, A/B)")
+    print(f"instrumentation alone:            {cost * 1e6:9.2f} us "
+          f"({cost / plain * 100:.3f}% of a frame)")
+    print(f"\n/metrics render: {len(metrics[0].render())} bytes")
+
+
+if __name__ == '__main__':
+    main()
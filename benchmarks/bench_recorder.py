@@ -0,0 +1,88 @@
+"""
+Ring recorder write throughput and seek cost
+
+Appends a drive session's worth of synthetic JPEG frames interleaved with
+control events (more than the ring holds, so segments get reused), then
+times seek() to random timestamps against a linear scan of every record.
+
+Usage: python benchmarks/bench_recorder.py [seconds_of_session] [ring_path]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recorder import KIND_FRAME, RingReader, RingRecorder
+
+FPS = 15
+FRAME_BYTES = 30000  # a 'medium' tier JPEG
+CONTROL_HZ = 50
+SEGMENTS = 32
+SEGMENT_SIZE = 8 * 1024 * 1024
+SEGMENT_SECONDS = 10
+
+
+def write_session(recorder, seconds, start):
+    frame = os.urandom(FRAME_BYTES)
+    records = 0
+    began = time.perf_counter()
+    steps = seconds * CONTROL_HZ
+    for step in range(steps):
+        timestamp = start + step / CONTROL_HZ
+        recorder.record_control(step % 200 - 100, 50, (90, 90, 90), timestamp)
+        records += 1
+        if step % (CONTROL_HZ // FPS) == 0:
+            recorder.record_frame(frame, timestamp)
+            records += 1
+    return records, time.perf_counter() - began
+
+
+def linear_seek(reader, timestamp):
+    """What finding a timestamp costs without the index: walk every segment"""
+    for segment in reader.segments():
+        for record in reader.records(segment):
+            if record[0] >= timestamp and record[1] == KIND_FRAME:
+                return record
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), 'bench.ring')
+    recorder = RingRecorder(path, SEGMENTS, SEGMENT_SIZE, SEGMENT_SECONDS)
+    start = 1_700_000_000.0
+
+    records, elapsed = write_session(recorder, seconds, start)
+    stats = recorder.stats()
+    print(f"session {seconds}s: {records} records, {stats['bytes_written'] / 1e6:.0f} MB "
+          f"into a {stats['capacity_bytes'] / 1e6:.0f} MB ring "
+          f"({stats['segments_rolled']} segments written)")
+    print(f"write: {records / elapsed:,.0f} records/s, "
+          f"{stats['bytes_written'] / elapsed / 1e6:,.0f} MB/s")
+
+    reader = RingReader(path)
+    segments = reader.segments()
+    first, last = segments[0].start, segments[-1].end
+    targets = [random.uniform(first, last) for _ in range(200)]
+
+    began = time.perf_counter()
+    for target in targets:
+        reader.frame_at(target)
+    indexed = (time.perf_counter() - began) / len(targets)
+
+    began = time.perf_counter()
+    for target in targets[:20]:
+        linear_seek(reader, target)
+    linear = (time.perf_counter() - began) / 20
+
+    print(f"seek to a frame: indexed {indexed * 1000:.3f} ms, "
+          f"linear scan {linear * 1000:.3f} ms ({linear / indexed:.0f}x)")
+    reader.close()
+    recorder.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Full RPiWebRTCSender <-> viewer handshake on one machine
+
+The sender runs unchanged except for a synthetic video track; the viewer
+is an aiortc peer doing what the dashboard does (answer the offer, play
+the first frame). Both negotiate through LocalSignaling, either in-process
+or through a running dashboard's Socket.IO server, so no camera, Firebase
+project or WAN is involved. Reports time from start to offer received,
+answer sent and first decoded frame, and how long video takes to resume
+after the connection is dropped once (sender reconnect path).
+
+Usage: python benchmarks/bench_signaling_handshake.py [runs] [dashboard_url]
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'RPi'))
+
+from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+
+from async_signaling import AsyncSignaling
+from rpi_webrtc_sender import RPiWebRTCSender
+from signaling_backend import LocalSignaling
+from webrtc_config import DASHBOARD_DEVICE_ID
+
+TIMEOUT = 30
+
+
+class SyntheticTrack(VideoStreamTrack):
+    """aiortc's blank test frames, with the attributes the sender reports"""
+    first_frame_at = None
+
+    async def recv(self):
+        frame = await super().recv()
+        if self.first_frame_at is None:
+            self.first_frame_at = time.monotonic()
+        return frame
+
+    def stats(self):
+        return {}
+
+
+class Viewer:
+    """
+    Answers every new offer with a fresh peer connection, like the
+    dashboard, and queues the arrival time of each connection's first frame
+    """
+    def __init__(self, signaling, room_id):
+        self.signaling = signaling
+        self.room_id = room_id
+        self.pc = None
+        self.marks = {}
+        self.first_frames = asyncio.Queue()
+
+    async def start(self):
+        await self.signaling.listen_for_offer(self.room_id, self.on_offer)
+
+    async def on_offer(self, offer):
+        self.marks.setdefault('offer', time.monotonic())
+        if self.pc is not None:
+            await self.pc.close()
+        pc = self.pc = RTCPeerConnection()
+
+        @pc.on("track")
+        def on_track(track):
+            async def read_first_frame():
+                await track.recv()
+                self.first_frames.put_nowait(time.monotonic())
+            asyncio.ensure_future(read_first_frame())
+
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=offer['sdp'], type=offer['type']))
+        await pc.setLocalDescription(await pc.createAnswer())
+        await self.signaling.send_answer(self.room_id, pc.localDescription.sdp, DASHBOARD_DEVICE_ID)
+        self.marks.setdefault('answer', time.monotonic())
+
+    async def close(self):
+        if self.pc is not None:
+            await self.pc.close()
+
+
+async def handshake(make_backend, room_id):
+    """Connect, then drop the viewer's connection once and time the recovery"""
+    viewer_signaling = await AsyncSignaling(make_backend).connect()
+    sender = RPiWebRTCSender(room_id, signaling=AsyncSignaling(make_backend),
+                             track_factory=SyntheticTrack)
+    viewer = Viewer(viewer_signaling, room_id)
+    await viewer.start()
+
+    start = time.monotonic()
+    sender_task = asyncio.create_task(sender.start())
+    try:
+        viewer.marks['frame'] = await asyncio.wait_for(viewer.first_frames.get(), TIMEOUT)
+        timings = {name: (mark - start) * 1000 for name, mark in viewer.marks.items()}
+
+        # Simulate a dead path: the viewer's side goes away and the sender
+        # detects the failure
+        failed_at = time.monotonic()
+        await viewer.pc.close()
+        sender.on_failed()
+        resumed_at = await asyncio.wait_for(viewer.first_frames.get(), TIMEOUT)
+        timings['recover'] = (resumed_at - failed_at) * 1000
+    finally:
+        sender_task.cancel()
+        await sender.stop()
+        await viewer.close()
+        await viewer_signaling.close()
+        await sender.signaling.close()
+    return timings
+
+
+async def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    if len(sys.argv) > 2:
+        from socketio_signaling import SocketIOSignaling
+        url = sys.argv[2]
+        make_backend = lambda: SocketIOSignaling(url)
+        label = f"Socket.IO ({url})"
+    else:
+        local = LocalSignaling()
+        make_backend = lambda: local
+        label = "in-process"
+
+    results = []
+    for run in range(runs):
+        timings = await handshake(make_backend, f'handshake_{os.getpid()}_{run}')
+        results.append(timings)
+        print(f"run {run + 1}: " + "  ".join(f"{name} {value:7.1f} ms"
+                                             for name, value in timings.items()))
+
+    print(f"\n{label} signaling, median of {runs} runs:")
+    for name in ('offer', 'answer', 'frame', 'recover'):
+        print(f"  {name:<8}{statistics.median(r[name] for r in results):8.1f} ms")
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Signaling reads and duplicate callbacks per session: full re-reads versus
+the incremental cursor/version feed
+
+Simulates one negotiation on LocalSignaling: the sender posts an offer and
+trickles candidates, the viewer answers and trickles its own, each side
+polls for remote candidates after every candidate it sends, and the viewer
+re-registers its listeners once mid-session (as after a socket reconnect).
+
+Usage: python benchmarks/bench_signaling_reads.py [candidates_per_side]
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from signaling_backend import LocalSignaling
+from webrtc_config import DASHBOARD_DEVICE_ID, RPI_DEVICE_ID
+
+
+def candidate(device_id, n):
+    return {'candidate': f'candidate:{n} 1 udp 2130706431 10.0.0.{n % 250} {5000 + n} typ host',
+            'sdpMLineIndex': 0, 'sdpMid': '0'}
+
+
+def session(count, incremental):
+    signaling = LocalSignaling()
+    room = 'bench'
+    delivered = {'offer': 0, 'candidates': 0}
+
+    def on_offer(offer):
+        delivered['offer'] += 1
+
+    def on_candidate(data):
+        delivered['candidates'] += 1
+
+    def listen():
+        if incremental:
+            signaling.listen_for_offer(room, on_offer)
+            signaling.listen_for_ice_candidates(room, DASHBOARD_DEVICE_ID, on_candidate)
+        else:
+            # What a listener without versions or cursors sees: the whole
+            # current state on every registration
+            signaling.reads += 1 + len(signaling.entries_after(room))
+            on_offer(signaling.rooms[room]['offer'])
+            for data in signaling.get_ice_candidates(room, DASHBOARD_DEVICE_ID, incremental=False):
+                on_candidate(data)
+
+    signaling.create_room(room)
+    signaling.send_offer(room, 'v=0', RPI_DEVICE_ID)
+    listen()
+    signaling.send_answer(room, 'v=0', DASHBOARD_DEVICE_ID)
+
+    polled = 0
+    for n in range(count):
+        signaling.add_ice_candidate(room, candidate(RPI_DEVICE_ID, n), RPI_DEVICE_ID)
+        signaling.add_ice_candidate(room, candidate(DASHBOARD_DEVICE_ID, n), DASHBOARD_DEVICE_ID)
+        polled += len(signaling.get_ice_candidates(room, RPI_DEVICE_ID, incremental=incremental))
+        if n == count // 2:
+            listen()
+
+    if not incremental:
+        # Without a listener the live candidates are only seen by re-listening
+        listen()
+    return signaling.reads, delivered, polled, signaling.duplicates
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{count} candidates per side\n")
+    print(f"{'mode':<14}{'reads':>8}{'offers':>8}{'remote cands':>14}{'polled':>8}{'dropped dups':>14}")
+    for incremental in (False, True):
+        reads, delivered, polled, duplicates = session(count, incremental)
+        mode = 'incremental' if incremental else 'full re-read'
+        print(f"{mode:<14}{reads:>8}{delivered['offer']:>8}{delivered['candidates']:>14}"
+              f"{polled:>8}{duplicates:>14}")
+    print("\nremote cands / polled: candidate callbacks on the viewer / candidates "
+          f"returned to the sender's polls (unique per side: {count})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Dashboard startup: import time and time to first request
+
+1. Imports app.py in fresh interpreters and reports the median import time,
+   the slowest modules (from -X importtime) and whether OpenCV, NumPy or
+   firebase_admin were loaded by the import.
+2. Starts `python app.py` and polls /ready: time until the server answers
+   at all (first request), and until every required component is up.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+HEAVY_MODULES = ('cv2', 'numpy', 'firebase_admin', 'serial')
+IMPORT_SCRIPT = (
+    "import sys, time; start = time.perf_counter(); import app; "
+    "print(time.perf_counter() - start); "
+    f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+)
+
+
+def import_time(runs):
+    samples = []
+    loaded = ''
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.split('\n')
+        samples.append(float(output[0]))
+        loaded = output[1]
+    return statistics.median(samples), loaded
+
+
+def slowest_imports(count=8):
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.split('|')]
+        # Top-level packages only, so nested imports are not counted twice
+        if not name.startswith(' ') and '.' not in name:
+            entries.append((int(cumulative_us), name))
+    return sorted(entries, reverse=True)[:count]
+
+
+def get_ready(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def time_to_first_request(timeout=60):
+    url = f'http://127.0.0.1:{config.FLASK_PORT}/ready'
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first = ready = None
+    status = {}
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                code, status = get_ready(url)
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+                continue
+            now = time.perf_counter() - started
+            first = first or now
+            if code == 200:
+                ready = now
+                break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    return first, ready, status
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    median, loaded = import_time(runs)
+    print(f"import app: {median * 1000:.0f} ms (median of {runs})")
+    print(f"heavy modules loaded by the import: {loaded or 'none'}")
+    print("slowest top-level imports:")
+    for cumulative_us, name in slowest_imports():
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    first, ready, status = time_to_first_request()
+    print(f"\npython app.py -> first /ready response: "
+          f"{first * 1000:.0f} ms" if first else "\nserver did not answer")
+    if ready:
+        print(f"all required components up: {ready * 1000:.0f} ms")
+    for name, component in status.get('components', {}).items():
+        seconds = component.get('seconds')
+        took = f"{seconds * 1000:.0f} ms" if seconds is not None else ''
+        print(f"  {name:<10} {component['state']:<9} {took:>8}  {component.get('error', '')}")
+
+
+if __name__ == '__main__':
+    main()
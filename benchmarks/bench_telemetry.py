@@ -0,0 +1,136 @@
+"""
+Telemetry push traffic: per-update emits vs batched deltas
+
+Simulates the dashboard's sources (speed at 5 Hz, link stats at 1 Hz,
+control changes while driving, battery every 5 s) for a number of
+clients, and counts the Socket.IO messages and JSON bytes two strategies
+put on the wire:
+
+    naive   every source sample emitted to every client as it happens
+    bus     TelemetryBus + TelemetryBroadcaster (one delta batch per tick,
+            to a room, so the packet is encoded once)
+
+Also reports packets encoded and what a slow client receives. Runs on a
+simulated clock; no server needed.
+
+Usage: python benchmarks/bench_telemetry.py [clients] [seconds]
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telemetry import TelemetryBroadcaster, TelemetryBus
+
+TICK = 0.05  # simulation step
+
+
+class CountingServer:
+    def __init__(self):
+        self.rooms = {}
+
+    def enter_room(self, sid, room, namespace=None):
+        self.rooms.setdefault(room, set()).add(sid)
+
+    def leave_room(self, sid, room, namespace=None):
+        self.rooms.get(room, set()).discard(sid)
+
+
+class CountingSocketIO:
+    """Counts what flask_socketio.SocketIO.emit would send"""
+    def __init__(self):
+        self.server = CountingServer()
+        self.encoded = 0
+        self.messages = 0
+        self.bytes = 0
+        self.inbox = {}
+
+    def emit(self, event, data, to=None, namespace=None):
+        size = len(json.dumps([event, data]))
+        self.encoded += 1
+        targets = self.server.rooms.get(to, {to}) if to in self.server.rooms else {to}
+        for sid in targets:
+            self.messages += 1
+            self.bytes += size
+            self.inbox.setdefault(sid, []).append(data)
+
+
+def sources(driving):
+    """(interval, read) per source; driving = fraction of time the joystick moves"""
+    state = {'x': 0, 'y': 0, 'clients': 0}
+
+    def control():
+        if random.random() < driving:
+            state['x'] = random.randint(-100, 100) // 10 * 10
+            state['y'] = random.randint(-100, 100) // 10 * 10
+        return {'drive': [state['x'], state['y']],
+                'direction': 'STOP' if state['x'] == state['y'] == 0 else 'FORWARD'}
+
+    def speed():
+        return {'speed': [state['y'] + state['x'], state['y'] - state['x']]}
+
+    def link():
+        return {'link': {'clients': state['clients'], 'viewers': 1}}
+
+    def battery():
+        return {'battery': {'low': False, 'warning_level': 20}}
+
+    return [(0.05, control), (0.2, speed), (1.0, link), (5.0, battery)], state
+
+
+def run(clients, seconds, driving, strategy, slow=0):
+    random.seed(1)
+    socketio = CountingSocketIO()
+    bus = TelemetryBus()
+    broadcaster = TelemetryBroadcaster(bus, socketio, interval=0.2, max_in_flight=5)
+    sids = [f'c{n}' for n in range(clients)]
+    for sid in sids:
+        broadcaster.add_client(sid)
+    feeds, state = sources(driving)
+    state['clients'] = clients
+
+    steps = int(seconds / TICK)
+    for step in range(steps):
+        now = step * TICK
+        for interval, read in feeds:
+            if abs(now / interval - round(now / interval)) < 1e-6:
+                values = read()
+                if strategy == 'naive':
+                    for sid in sids:
+                        socketio.emit('telemetry', values, to=sid)
+                else:
+                    bus.update(values)
+        if strategy == 'bus' and abs(now / 0.2 - round(now / 0.2)) < 1e-6:
+            broadcaster.tick()
+            # Fast clients ack everything; slow ones ack every 3 seconds
+            for index, sid in enumerate(sids):
+                if index < slow and step % 60:
+                    continue
+                for batch in socketio.inbox.pop(sid, []):
+                    broadcaster.ack(sid, batch['n'], batch['seq'])
+    return socketio, broadcaster
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    print(f"{clients} clients, {seconds} s simulated\n")
+    print(f"{'driving':>8} {'strategy':>9} {'messages/s':>11} {'KB/s':>8} {'encoded/s':>10}")
+    for driving in (0.0, 0.1, 0.5, 1.0):
+        for strategy in ('naive', 'bus'):
+            socketio, _ = run(clients, seconds, driving, strategy)
+            print(f"{driving:>8.0%} {strategy:>9} {socketio.messages / seconds:>11.1f} "
+                  f"{socketio.bytes / seconds / 1024:>8.2f} {socketio.encoded / seconds:>10.1f}")
+
+    socketio, broadcaster = run(clients, seconds, 1.0, 'bus', slow=clients // 4)
+    stats = broadcaster.stats()
+    print(f"\nwith {clients // 4} slow clients (ack every 3 s) while driving: "
+          f"{socketio.messages / seconds:.1f} messages/s, {stats['lagged']} times lagged, "
+          f"{stats['catchups'] - clients} catch-up deltas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Lazily started application components
+Each component (signaling backend, camera, GSM modem, ...) is built on
+first use, or by warm_up() in the background once the server is already
+answering requests. Build time, state and errors are kept for the /ready
+endpoint. A component with a fallback degrades instead of failing, and one
+without is retried on a later get() rather than taking the app down.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+STARTING = 'starting'
+READY = 'ready'
+DEGRADED = 'degraded'  # factory failed, running on the fallback
+FAILED = 'failed'
+DISABLED = 'disabled'
+
+
+class ComponentUnavailable(RuntimeError):
+    pass
+
+
+class Component:
+    """
+    factory: builds the value (called once, under a lock)
+    fallback: builds a stand-in when factory raises
+    required: /ready waits for it
+    retry_after: seconds before a failed build is attempted again
+    """
+    def __init__(self, name, factory, fallback=None, required=True, enabled=True,
+                 retry_after=30.0):
+        self.name = name
+        self.factory = factory
+        self.fallback = fallback
+        self.required = required and enabled
+        self.retry_after = retry_after
+        self.state = PENDING if enabled else DISABLED
+        self.error = None
+        self.seconds = None
+        self.ready_at = None
+        self._value = None
+        self._failed_at = None
+        self._warming = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The built value; builds it on first call. ComponentUnavailable if it cannot be built."""
+        value = self._value
+        if value is not None:
+            return value
+        if self.state == DISABLED:
+            raise ComponentUnavailable(f"{self.name} is disabled")
+        with self._lock:
+            if self._value is None:
+                if self.state == FAILED and time.monotonic() - self._failed_at < self.retry_after:
+                    raise ComponentUnavailable(f"{self.name} failed: {self.error}")
+                self._build()
+        return self._value
+
+    def peek(self):
+        """The value if already built, else None; never builds"""
+        return self._value
+
+    def _build(self):
+        self.state = STARTING
+        started = time.perf_counter()
+        try:
+            value = self.factory()
+            self.state = READY
+            self.error = None
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            if self.fallback is None:
+                self.state = FAILED
+                self._failed_at = time.monotonic()
+                self.seconds = time.perf_counter() - started
+                logger.error(f"Component {self.name} failed to start: {self.error}")
+                raise ComponentUnavailable(f"{self.name} failed: {self.error}") from e
+            logger.error(f"Component {self.name} failed to start, using fallback: {self.error}")
+            value = self.fallback()
+            self.state = DEGRADED
+        self.seconds = time.perf_counter() - started
+        self.ready_at = time.time()
+        self._value = value
+        logger.info(f"Component {self.name} {self.state} in {self.seconds * 1000:.0f} ms")
+
+    def warm(self):
+        """get() for background warm-up: failures are recorded, not raised"""
+        if self.state == DISABLED:
+            return
+        try:
+            self.get()
+        except ComponentUnavailable:
+            pass
+
+    def warm_in_background(self):
+        """
+        Start building on a real thread, unless built or already being built.
+        For request handlers on the event loop: get() there would block the
+        whole loop, either building or waiting for the warm-up thread's lock.
+        """
+        if self._value is not None or self._warming or self.state == DISABLED:
+            return
+        self._warming = True
+
+        def run():
+            try:
+                self.warm()
+            finally:
+                self._warming = False
+        threading.Thread(target=run, name=f'warm-{self.name}', daemon=True).start()
+
+    def status(self):
+        status = {'state': self.state, 'required': self.required}
+        if self.seconds is not None:
+            status['seconds'] = round(self.seconds, 4)
+        if self.error:
+            status['error'] = self.error
+        return status
+
+
+class Components:
+    """The app's components, in warm-up order"""
+    def __init__(self):
+        self._components = {}
+        self.created_at = time.monotonic()
+
+    def add(self, name, factory, **options):
+        component = self._components[name] = Component(name, factory, **options)
+        return component
+
+    def __getitem__(self, name):
+        return self._components[name]
+
+    def warm_up(self):
+        """Build every enabled component in turn (run in a background thread)"""
+        for component in self._components.values():
+            component.warm()
+
+    def start_warm_up(self):
+        thread = threading.Thread(target=self.warm_up, name='warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self):
+        return all(component.state in (READY, DEGRADED)
+                   for component in self._components.values() if component.required)
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'uptime': round(time.monotonic() - self.created_at, 3),
+            'components': {name: component.status()
+                           for name, component in self._components.items()}
+        }
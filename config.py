@@ -7,6 +7,7 @@ Modify these settings according to your hardware setup
 FLASK_HOST = '0.0.0.0'  # Allow external connections
 FLASK_PORT = 5000
 FLASK_DEBUG = True
+FLASK_RELOADER = False  # the reloader starts the app twice; enable for live code reload
 SECRET_KEY = 'change-this-to-a-random-secret-key'
 
 # Video Configuration
@@ -14,6 +15,42 @@ VIDEO_WIDTH = 640
 VIDEO_HEIGHT = 480
 VIDEO_FPS = 30
 USE_TEST_VIDEO = True  # Set to False when using actual RPi camera
+MJPEG_MIN_FPS = 5  # Lowest per-client rate the MJPEG stream backs off to
+# MJPEG quality ladder, best first. Clients start on MJPEG_DEFAULT_TIER and
+# move along it based on send throughput; /video_feed?tier=<name> pins a tier
+MJPEG_TIERS = [
+    {'name': 'high', 'quality': 85, 'scale': 1.0},
+    {'name': 'medium', 'quality': 70, 'scale': 0.75},
+    {'name': 'low', 'quality': 55, 'scale': 0.5},
+    {'name': 'minimal', 'quality': 40, 'scale': 0.25},
+]
+MJPEG_DEFAULT_TIER = 0
+MJPEG_POLL_INTERVAL = 0.005  # seconds between new-frame checks of a viewer (eventlet)
+TEST_VIDEO_FPS = VIDEO_FPS  # Synthetic source frame rate (0 = unthrottled, for benchmarks)
+# Instrumentation: stamp capture time into a corner of every MJPEG frame,
+# have dashboards read it back (also from the Pi's WebRTC frames, with
+# webrtc_config.LATENCY_PROBE) and collect per-stage latency at /metrics
+LATENCY_PROBE = False
+
+# Session recording: /video_feed frames, control changes and telemetry in a
+# preallocated, memory-mapped ring file (see recorder.py); disk use is
+# RECORD_SEGMENTS x RECORD_SEGMENT_SIZE whatever the session length
+RECORD_ENABLED = False
+RECORD_PATH = 'recordings/session.ring'
+RECORD_SEGMENTS = 32
+RECORD_SEGMENT_SIZE = 8 * 1024 * 1024  # bytes
+RECORD_SEGMENT_SECONDS = 10
+RECORD_TIER = 1  # MJPEG_TIERS index recorded
+RECORD_FPS = 15
+RECORD_JPEG_QUALITY = 70  # for sources that are not JPEG already (WebRTC track)
+RECORD_TELEMETRY_INTERVAL = 1.0  # seconds between status snapshots
+
+# Control log: every inbound control message with its monotonic arrival time,
+# for deterministic replay (python control_log.py replay <log>). Each run
+# writes a new control-<start time>.ctl in CONTROL_LOG_DIR.
+CONTROL_LOG_ENABLED = False
+CONTROL_LOG_DIR = 'recordings'
+CONTROL_LOG_FLUSH_INTERVAL = 1.0  # seconds
 
 # GPIO Pin Configuration (BCM Mode)
 # L298N Motor Driver Pins
@@ -25,15 +62,32 @@ MOTOR_RIGHT_FORWARD = 22
 MOTOR_RIGHT_BACKWARD = 23
 MOTOR_RIGHT_ENABLE = 24  # PWM pin for speed control
 
+MOTOR_PWM_FREQUENCY = 1000  # Hz on the ENABLE pins
+CONTROL_LOOP_HZ = 50  # Motor control loop rate
+
+# Servo Pins (BCM, hardware-PWM capable where possible)
+SERVO_PINS = [12, 13, 19]
+SERVO_PWM_FREQUENCY = 50  # Standard hobby servo frame rate
+SERVO_MIN_DUTY = 2.5  # Duty cycle (%) at 0 degrees
+SERVO_MAX_DUTY = 12.5  # Duty cycle (%) at 180 degrees
+
+# Hardware backend: 'gpio' drives real pins via RPi.GPIO, 'simulated'
+# records every write in memory (for development and benchmarks)
+HAL_BACKEND = 'simulated'
+HAL_SIM_LOG_SIZE = 65536  # Writes kept by the simulated backend
+
 # Motor Speed Settings (0-100)
 DEFAULT_SPEED = 70
 MAX_SPEED = 100
 MIN_SPEED = 30
 
 # GSM Module Configuration
-GSM_SERIAL_PORT = '/dev/ttyUSB0'
+GSM_ENABLED = False
+GSM_SERIAL_PORT = '/dev/ttyUSB0'  # 'simulated' for a fake modem on a pty
 GSM_BAUD_RATE = 9600
-GSM_TIMEOUT = 1
+GSM_TIMEOUT = 1  # seconds per AT command
+GSM_PIPELINE_DEPTH = 4  # commands written ahead of their responses (1 for strict modems)
+GSM_POLL_INTERVAL = 5.0  # seconds between signal/registration queries
 
 # Camera Configuration
 CAMERA_TYPE = 'picamera'  # Options: 'picamera', 'usb', 'test'
@@ -50,6 +104,8 @@ SOCKETIO_PING_INTERVAL = 25
 AUTO_STOP_TIMEOUT = 5  # Seconds of inactivity before auto-stop
 ENABLE_AUTO_STOP = True
 MAX_COMMAND_RATE = 50  # Maximum commands per second
+COMMAND_BURST = 10  # Commands a client may send back-to-back before the rate limit applies
+RATE_LIMIT_IDLE_TIMEOUT = 60  # seconds before an idle client's bucket is dropped
 
 # Joystick Configuration
 JOYSTICK_DEADZONE = 20  # Threshold for joystick movement (0-100)
@@ -59,6 +115,14 @@ JOYSTICK_SENSITIVITY = 1.0  # Multiplier for joystick input
 ENABLE_BATTERY_MONITOR = False  # Set to True if battery monitoring is available
 BATTERY_PIN = 4  # GPIO pin for battery voltage reading
 BATTERY_WARNING_LEVEL = 20  # Percentage
+BATTERY_POLL_INTERVAL = 5.0  # seconds; BATTERY_PIN reads low below BATTERY_WARNING_LEVEL
+
+# Telemetry push: sources publish into a bus at their own rates, every
+# TELEMETRY_INTERVAL the changed keys go to all dashboards in one batch
+TELEMETRY_INTERVAL = 0.2  # seconds between broadcast ticks
+TELEMETRY_MAX_IN_FLIGHT = 5  # unacknowledged batches before a client is caught up separately
+TELEMETRY_SPEED_INTERVAL = 0.2  # seconds between motor duty samples
+TELEMETRY_LINK_INTERVAL = 1.0  # seconds between link stats samples
 
 # Logging Configuration
 ENABLE_LOGGING = True
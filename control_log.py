@@ -0,0 +1,356 @@
+"""
+Binary control log and deterministic replay
+Every inbound control message (the binary 'control' event, joystick_move,
+/control, /servo_control) is appended with its monotonic arrival time and
+an anonymous client number. Replay re-injects the log into the same Flask
+and Socket.IO handlers through the test clients, one client per recorded
+client, at recorded speed (or a multiple), as fast as possible, or one
+message at a time. Replay bypasses the wall-clock rate limiter, so every
+message the handlers accept is applied, and reports how many were.
+Each app run logs to its own file; earlier logs are never overwritten.
+
+File layout (little-endian):
+
+    header  magic b'CTLLOG01' | wall-clock start float64
+    record  offset float64 (s since start, monotonic) | source uint8 |
+            client uint16 | length uint16 | payload
+
+    payloads: SOURCE_CONTROL  the binary control message as received
+              SOURCE_JOYSTICK x, y as float32
+              SOURCE_HTTP_*   the raw JSON request body
+
+Usage:
+    python control_log.py replay <log> [--speed 1|<factor>|max] [--step]
+    python control_log.py synth <log> [messages]
+"""
+
+import json
+import logging
+import math
+import os
+import struct
+import sys
+import threading
+import time
+
+import config
+from rate_limit import PassThroughLimiter
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CTLLOG01'
+FILE_HEADER = struct.Struct('<8sd')
+RECORD_HEADER = struct.Struct('<dBHH')
+JOYSTICK_STRUCT = struct.Struct('<ff')
+
+SOURCE_CONTROL = 1
+SOURCE_JOYSTICK = 2
+SOURCE_HTTP_CONTROL = 3
+SOURCE_HTTP_SERVO = 4
+SOURCE_NAMES = {SOURCE_CONTROL: 'control', SOURCE_JOYSTICK: 'joystick_move',
+                SOURCE_HTTP_CONTROL: '/control', SOURCE_HTTP_SERVO: '/servo_control'}
+
+
+def new_log_path(directory=config.CONTROL_LOG_DIR):
+    """control-<local start time>-<pid>.ctl, unique per run"""
+    return os.path.join(directory, time.strftime('control-%Y%m%d-%H%M%S') + f'-{os.getpid()}.ctl')
+
+
+class ControlLogWriter:
+    """
+    Appends records through a preallocated buffer that is written out when
+    full or every flush_interval seconds, so logging a message costs a
+    pack_into and a slice copy under a lock
+    """
+    def __init__(self, path=None, buffer_size=64 * 1024,
+                 flush_interval=config.CONTROL_LOG_FLUSH_INTERVAL):
+        """path: defaults to a new file per run in CONTROL_LOG_DIR; never overwritten"""
+        self.path = path or new_log_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'xb')
+        self.started = time.monotonic()
+        self.file.write(FILE_HEADER.pack(MAGIC, time.time()))
+        self.buffer = bytearray(buffer_size)
+        self.used = 0
+        self.flush_interval = flush_interval
+        self._flushed_at = self.started
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def client_number(self, key):
+        """Stable small number per client (sid / address); addresses are not logged"""
+        number = self._clients.get(key)
+        if number is None:
+            number = self._clients.setdefault(key, len(self._clients) + 1)
+        return number
+
+    def log(self, source, client, payload):
+        if not isinstance(payload, (bytes, bytearray)) or len(payload) > 0xFFFF:
+            logger.debug(f"Not logging {SOURCE_NAMES.get(source)} payload of type {type(payload).__name__}")
+            return
+        now = time.monotonic()
+        size = RECORD_HEADER.size + len(payload)
+        with self._lock:
+            if self.used + size > len(self.buffer):
+                self._flush()
+            if size > len(self.buffer):
+                self.file.write(RECORD_HEADER.pack(now - self.started, source,
+                                                   self.client_number(client), len(payload)))
+                self.file.write(payload)
+            else:
+                RECORD_HEADER.pack_into(self.buffer, self.used, now - self.started, source,
+                                        self.client_number(client), len(payload))
+                self.buffer[self.used + RECORD_HEADER.size:self.used + size] = payload
+                self.used += size
+            self.records += 1
+            if now - self._flushed_at >= self.flush_interval:
+                self._flush()
+                self._flushed_at = now
+
+    def log_control(self, client, payload):
+        self.log(SOURCE_CONTROL, client, payload)
+
+    def log_joystick(self, client, x, y):
+        try:
+            payload = JOYSTICK_STRUCT.pack(float(x), float(y))
+        except (TypeError, ValueError):
+            return
+        self.log(SOURCE_JOYSTICK, client, payload)
+
+    def log_http(self, source, client, body):
+        self.log(source, client, body)
+
+    def _flush(self):
+        if self.used:
+            self.file.write(memoryview(self.buffer)[:self.used])
+            self.used = 0
+        self.file.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self.file.close()
+
+    def stats(self):
+        return {'path': self.path, 'records': self.records, 'clients': len(self._clients)}
+
+
+class ControlLogRecord:
+    __slots__ = ('offset', 'source', 'client', 'payload')
+
+    def __init__(self, offset, source, client, payload):
+        self.offset = offset
+        self.source = source
+        self.client = client
+        self.payload = payload
+
+    def decode(self):
+        """Payload as the handler receives it"""
+        if self.source == SOURCE_JOYSTICK:
+            x, y = JOYSTICK_STRUCT.unpack(self.payload)
+            return {'x': x, 'y': y}
+        if self.source in (SOURCE_HTTP_CONTROL, SOURCE_HTTP_SERVO):
+            return json.loads(self.payload)
+        return self.payload
+
+
+def read_log(path):
+    """(wall-clock start, [ControlLogRecord]) of a control log"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, started = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a control log")
+    records = []
+    offset = FILE_HEADER.size
+    # A log cut short by a crash ends in a partial record; stop before it
+    while offset + RECORD_HEADER.size <= len(data):
+        at, source, client, length = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > len(data):
+            break
+        records.append(ControlLogRecord(at, source, client, data[start:start + length]))
+        offset = start + length
+    return started, records
+
+
+class ControlReplayer:
+    """
+    Feeds log records to the app's handlers. sinks maps a source to a
+    callable(client, decoded payload); make_sinks() builds them from the
+    Flask and Socket.IO test clients.
+    """
+    def __init__(self, records, sinks, speed=1.0, sleep=time.sleep):
+        """speed: 1.0 = as recorded, 2.0 = twice as fast, None = as fast as possible"""
+        self.records = records
+        self.sinks = sinks
+        self.speed = speed
+        self.sleep = sleep
+        self.position = 0
+        self.injected = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.max_lag = 0.0
+
+    def _inject(self, record):
+        try:
+            self.sinks[record.source](record.client, record.decode())
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Replay of {SOURCE_NAMES.get(record.source)} failed: {e}")
+        self.injected += 1
+
+    def step(self):
+        """Inject the next record regardless of timing; None at the end of the log"""
+        if self.position >= len(self.records):
+            return None
+        record = self.records[self.position]
+        self.position += 1
+        start = time.perf_counter()
+        self._inject(record)
+        self.elapsed += time.perf_counter() - start
+        return record
+
+    def run(self):
+        """Inject the rest of the log, paced by the recorded offsets unless speed is None"""
+        if self.position >= len(self.records):
+            return self.report()
+        base = self.records[self.position].offset
+        start = time.perf_counter()
+        for record in self.records[self.position:]:
+            if self.speed:
+                due = start + (record.offset - base) / self.speed
+                now = time.perf_counter()
+                if due > now:
+                    self.sleep(due - now)
+                else:
+                    self.max_lag = max(self.max_lag, now - due)
+            self._inject(record)
+            self.position += 1
+        self.elapsed += time.perf_counter() - start
+        return self.report()
+
+    def report(self):
+        return {
+            'messages': self.injected,
+            'errors': self.errors,
+            'seconds': round(self.elapsed, 3),
+            'messages_per_sec': round(self.injected / self.elapsed, 1) if self.elapsed else 0.0,
+            'max_lag_ms': round(self.max_lag * 1000, 2)
+        }
+
+
+def make_sinks(app, socketio):
+    """
+    Handlers reached through the test clients, so replay goes through the
+    same routes, validation and dispatcher as live traffic
+    """
+    http = app.test_client()
+    sockets = {}
+
+    def socket_for(client):
+        if client not in sockets:
+            sockets[client] = socketio.test_client(app)
+        return sockets[client]
+
+    def environ(client):
+        # One address per recorded client, as the live requests had
+        return {'REMOTE_ADDR': f'127.0.{client // 256}.{client % 256}'}
+
+    return {
+        SOURCE_CONTROL: lambda client, payload: socket_for(client).emit('control', payload),
+        SOURCE_JOYSTICK: lambda client, data: socket_for(client).emit('joystick_move', data),
+        SOURCE_HTTP_CONTROL: lambda client, data: http.post(
+            '/control', json=data, environ_base=environ(client)),
+        SOURCE_HTTP_SERVO: lambda client, data: http.post(
+            '/servo_control', json=data, environ_base=environ(client)),
+    }, sockets
+
+
+def synthesize(path, count):
+    """A joystick sweep on the binary control event with a servo change every 10th message"""
+    from control_protocol import FLAG_DRIVE, FLAG_SERVOS, encode_control
+    with open(path, 'wb') as f:
+        f.write(FILE_HEADER.pack(MAGIC, time.time()))
+        for seq in range(1, count + 1):
+            angle = seq * 0.01
+            flags = FLAG_DRIVE | (FLAG_SERVOS if seq % 10 == 0 else 0)
+            payload = encode_control(
+                seq, seq * 20.0, int(100 * math.cos(angle)), int(100 * math.sin(angle)),
+                (seq % 181, 90, 180 - seq % 181), flags)
+            # Space the messages 20 ms apart (a 50 Hz joystick), not at write speed
+            f.write(RECORD_HEADER.pack((seq - 1) * 0.02, SOURCE_CONTROL, 1, len(payload)))
+            f.write(payload)
+
+
+def parse_speed(argv):
+    """--speed value: 1.0 by default, None for max; ValueError if missing or invalid"""
+    if '--speed' not in argv:
+        return 1.0
+    index = argv.index('--speed') + 1
+    if index >= len(argv):
+        raise ValueError("--speed needs a value")
+    if argv[index] == 'max':
+        return None
+    speed = float(argv[index])
+    if not speed > 0:
+        raise ValueError("--speed must be positive")
+    return speed
+
+
+def main(argv):
+    usage = __doc__.split('Usage:')[1]
+    if len(argv) < 3 or argv[1] not in ('replay', 'synth'):
+        print(usage)
+        return 2
+    if argv[1] == 'synth':
+        synthesize(argv[2], int(argv[3]) if len(argv) > 3 else 10000)
+        return 0
+
+    try:
+        speed = parse_speed(argv)
+    except ValueError as e:
+        print(f"{e}\n{usage}")
+        return 2
+    _, records = read_log(argv[2])
+
+    # Import late: app wires the hardware backend and the handlers. The
+    # replay must not be logged again.
+    config.CONTROL_LOG_ENABLED = False
+    import app as dashboard
+    # The live limiter drops by wall-clock time, which a replay faster than
+    # recorded (or stepped) does not keep; apply every message instead
+    limiter = dashboard.command_limiter = PassThroughLimiter()
+    sinks, sockets = make_sinks(dashboard.app, dashboard.socketio)
+    replayer = ControlReplayer(records, sinks, speed=speed)
+
+    if '--step' in argv:
+        while True:
+            record = replayer.step()
+            if record is None:
+                break
+            print(f"{record.offset:10.3f}s  client {record.client:<3} "
+                  f"{SOURCE_NAMES.get(record.source)}: {record.decode()!r}")
+            input("Enter for the next message...")
+        report = replayer.report()
+    else:
+        report = replayer.run()
+
+    for client in sockets.values():
+        client.disconnect()
+    report['applied'] = limiter.applied
+    report['applied_per_sec'] = (round(limiter.applied / report['seconds'], 1)
+                                 if report['seconds'] else 0.0)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,226 @@
+"""
+Binary car-control protocol
+Every control input (D-pad, joystick, servo sliders) is sent over the
+Socket.IO 'control' event as one packed little-endian message:
+
+    version  uint8    PROTOCOL_VERSION
+    seq      uint32   per-client sequence number (wraps)
+    ts       float64  client timestamp in ms, echoed back in the ack
+    x, y     int8     drive vector, -100..100 (+y = forward)
+    servos   3x uint8 servo angles, 0..180
+    flags    uint8    FLAG_DRIVE / FLAG_SERVOS: which fields to apply
+
+The HTTP /control and /servo_control routes and the joystick_move event
+feed the same ControlDispatcher and stay available as a fallback.
+"""
+
+import logging
+import math
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+CONTROL_STRUCT = struct.Struct('<BIdbb3BB')
+ACK_STRUCT = struct.Struct('<Id')
+
+FLAG_DRIVE = 0x01
+FLAG_SERVOS = 0x02
+
+SERVO_COUNT = 3
+SERVO_CENTER = 90
+
+# D-pad commands as drive vectors
+COMMAND_VECTORS = {
+    'forward': (0, 100),
+    'backward': (0, -100),
+    'left': (-100, 0),
+    'right': (100, 0),
+    'stop': (0, 0)
+}
+
+ControlMessage = namedtuple('ControlMessage', 'seq timestamp x y servos flags')
+
+
+def decode_control(payload):
+    """Unpack a binary control message, raising ValueError if it is malformed"""
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        raise ValueError("control payload must be binary")
+    if len(payload) != CONTROL_STRUCT.size:
+        raise ValueError(f"control payload must be {CONTROL_STRUCT.size} bytes, got {len(payload)}")
+
+    version, seq, timestamp, x, y, s1, s2, s3, flags = CONTROL_STRUCT.unpack(payload)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"unsupported control protocol version {version}")
+    return ControlMessage(seq, timestamp, x, y, (s1, s2, s3), flags)
+
+
+def encode_control(seq, timestamp, x, y, servos, flags):
+    """Pack a control message (used by tools and replay)"""
+    return CONTROL_STRUCT.pack(PROTOCOL_VERSION, seq & 0xFFFFFFFF, timestamp,
+                               x, y, *servos, flags)
+
+
+def encode_ack(message):
+    """Ack carrying the sequence number and the client's own timestamp for RTT"""
+    return ACK_STRUCT.pack(message.seq, message.timestamp)
+
+
+def merge_control(older, newer):
+    """
+    Combine a superseded message into a newer one. Messages carry the full
+    client state, so only the flags of the older one need to be kept.
+    """
+    return newer._replace(flags=newer.flags | older.flags)
+
+
+def direction_from_vector(x, y, threshold=config.JOYSTICK_DEADZONE):
+    """Map a drive vector to the dashboard's direction names"""
+    if abs(x) < threshold and abs(y) < threshold:
+        return 'STOP'
+    if abs(y) >= abs(x):
+        return 'FORWARD' if y > 0 else 'BACKWARD'
+    return 'RIGHT' if x > 0 else 'LEFT'
+
+
+def _seq_newer(seq, last):
+    """Serial-number comparison so the uint32 sequence may wrap"""
+    return 0 < ((seq - last) & 0xFFFFFFFF) < 0x80000000
+
+
+class ControlDispatcher:
+    """
+    Single entry point for every control input.
+    Holds the latest drive/servo state and applies it to the actuators.
+    Drive vectors are handed to the motor control loop, which owns the motors;
+    servo angles are written straight to the servo driver.
+    """
+    def __init__(self, motor_controller=None, servo_driver=None):
+        self.motor_controller = motor_controller
+        self.servo_driver = servo_driver
+        self._lock = threading.Lock()
+        self.x = 0
+        self.y = 0
+        self.direction = 'STOP'
+        self.servos = [SERVO_CENTER] * SERVO_COUNT
+        self.source = None
+        self._last_seq = {}
+        self.messages = 0
+        self.stale_messages = 0
+        self.handler_time = 0.0
+        self.max_handler_time = 0.0
+        # Called with the dispatcher after every drive/servo change (recorder, telemetry)
+        self.observers = []
+
+    @staticmethod
+    def validate_vector(x, y):
+        """Return (x, y) as ints clamped to -100..100; ValueError for non-numeric input"""
+        try:
+            fx, fy = float(x), float(y)
+        except (TypeError, ValueError):
+            raise ValueError(f"bad drive vector ({x!r}, {y!r})") from None
+        if not (math.isfinite(fx) and math.isfinite(fy)):
+            raise ValueError(f"bad drive vector ({x!r}, {y!r})")
+        return max(-100, min(100, int(fx))), max(-100, min(100, int(fy)))
+
+    def drive(self, x, y, source='socket'):
+        """Apply a drive vector (-100..100 each, +y = forward)"""
+        x, y = self.validate_vector(x, y)
+        with self._lock:
+            self.x = x
+            self.y = y
+            self.direction = direction_from_vector(x, y)
+            self.source = source
+        logger.debug(f"Drive ({source}): X={x}, Y={y} -> {self.direction}")
+        if self.motor_controller is not None:
+            self.motor_controller.set_target(x, y)
+        for observer in self.observers:
+            observer(self)
+
+    def command(self, command, source='http'):
+        """Apply a named D-pad command; returns False for unknown commands"""
+        vector = COMMAND_VECTORS.get(command)
+        if vector is None:
+            return False
+        self.drive(*vector, source=source)
+        return True
+
+    @staticmethod
+    def validate_servo(servo_id, angle):
+        """
+        Return (servo index, angle rounded and clamped to 0..180); ValueError
+        for unknown servos, fractional ids and non-numeric angles
+        """
+        try:
+            number = float(servo_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"unknown servo {servo_id!r}") from None
+        if not number.is_integer() or not 1 <= number <= SERVO_COUNT:
+            raise ValueError(f"unknown servo {servo_id!r}")
+        try:
+            value = float(angle)
+        except (TypeError, ValueError):
+            raise ValueError(f"bad servo angle {angle!r}") from None
+        if not math.isfinite(value):
+            raise ValueError(f"bad servo angle {angle!r}")
+        return int(number) - 1, max(0, min(180, round(value)))
+
+    def set_servo(self, servo_id, angle, source='socket'):
+        """Set one servo (1-based id) to an angle clamped to 0..180"""
+        index, angle = self.validate_servo(servo_id, angle)
+        with self._lock:
+            self.servos[index] = angle
+            self.source = source
+        logger.debug(f"Servo {servo_id} ({source}): {angle}°")
+        if self.servo_driver is not None:
+            self.servo_driver.set_angle(index, angle)
+        for observer in self.observers:
+            observer(self)
+        return angle
+
+    def handle_message(self, client_id, message, received_at=None):
+        """
+        Apply a decoded ControlMessage from one client.
+        Returns False when the message is older than one already applied.
+        """
+        if received_at is None:
+            received_at = time.monotonic()
+
+        last = self._last_seq.get(client_id)
+        if last is not None and not _seq_newer(message.seq, last):
+            self.stale_messages += 1
+            return False
+        self._last_seq[client_id] = message.seq
+
+        if message.flags & FLAG_DRIVE:
+            self.drive(message.x, message.y, source=client_id)
+        if message.flags & FLAG_SERVOS:
+            for index, angle in enumerate(message.servos):
+                if angle != self.servos[index]:
+                    self.set_servo(index + 1, angle, source=client_id)
+
+        elapsed = time.monotonic() - received_at
+        self.messages += 1
+        self.handler_time += 0.1 * (elapsed - self.handler_time)
+        self.max_handler_time = max(self.max_handler_time, elapsed)
+        return True
+
+    def forget(self, client_id):
+        """Drop per-client state when a client disconnects"""
+        self._last_seq.pop(client_id, None)
+
+    def stats(self):
+        return {
+            'direction': self.direction,
+            'drive': {'x': self.x, 'y': self.y},
+            'servos': list(self.servos),
+            'messages': self.messages,
+            'stale_messages': self.stale_messages,
+            'handler_us': round(self.handler_time * 1e6, 1),
+            'max_handler_us': round(self.max_handler_time * 1e6, 1)
+        }
@@ -7,17 +7,36 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 import json
 import logging
-from datetime import datetime
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from metrics import REGISTRY, timed
+from signaling_backend import SignalingBackend, description_version, normalize_candidate
 from webrtc_config import *
 
 logger = logging.getLogger(__name__)
 
-class FirebaseSignaling:
+FIRESTORE_SECONDS = REGISTRY.histogram(
+    'signaling_firestore_seconds', 'Firestore round trip per signaling operation', ('operation',))
+
+
+# Subcollection -> collect_garbage report field (documents directly in
+# the signaling collection are rooms)
+GARBAGE_KINDS = {'ice_candidates': 'candidates', 'sessions': 'sessions'}
+
+
+def firestore_operation(method):
+    """Time a FirebaseSignaling method into FIRESTORE_SECONDS under its name"""
+    return timed(FIRESTORE_SECONDS.labels(method.__name__))(method)
+
+
+class FirebaseSignaling(SignalingBackend):
     def __init__(self, config_path=None):
         """
         Initialize Firebase connection
         config_path: Path to Firebase service account JSON file
         """
+        super().__init__()
         try:
             if config_path:
                 cred = credentials.Certificate(config_path)
@@ -35,6 +54,7 @@ class FirebaseSignaling:
             logger.error(f"Firebase initialization failed: {e}")
             raise
     
+    @firestore_operation
     def create_room(self, room_id):
         """Create a new signaling room"""
         try:
@@ -51,6 +71,7 @@ class FirebaseSignaling:
             logger.error(f"Failed to create room: {e}")
             return False
     
+    @firestore_operation
     def send_offer(self, room_id, offer_sdp, device_id):
         """Send WebRTC offer (from RPi camera)"""
         try:
@@ -60,6 +81,7 @@ class FirebaseSignaling:
                     'sdp': offer_sdp,
                     'type': 'offer',
                     'from': device_id,
+                    'version': description_version(),
                     'timestamp': firestore.SERVER_TIMESTAMP
                 },
                 'status': 'offer_sent'
@@ -70,6 +92,7 @@ class FirebaseSignaling:
             logger.error(f"Failed to send offer: {e}")
             return False
     
+    @firestore_operation
     def send_answer(self, room_id, answer_sdp, device_id):
         """Send WebRTC answer (from dashboard)"""
         try:
@@ -79,6 +102,7 @@ class FirebaseSignaling:
                     'sdp': answer_sdp,
                     'type': 'answer',
                     'from': device_id,
+                    'version': description_version(),
                     'timestamp': firestore.SERVER_TIMESTAMP
                 },
                 'status': 'answer_sent'
@@ -89,6 +113,7 @@ class FirebaseSignaling:
             logger.error(f"Failed to send answer: {e}")
             return False
     
+    @firestore_operation
     def add_ice_candidate(self, room_id, candidate, device_id):
         """Add ICE candidate"""
         try:
@@ -104,11 +129,32 @@ class FirebaseSignaling:
             logger.error(f"Failed to add ICE candidate: {e}")
             return False
     
+    @firestore_operation
+    def add_ice_candidates(self, room_id, candidates, device_id):
+        """Add several ICE candidates in one batched commit"""
+        try:
+            ice_ref = self.signaling_ref.document(room_id).collection('ice_candidates')
+            batch = self.db.batch()
+            for candidate in candidates:
+                batch.set(ice_ref.document(), {
+                    'candidate': candidate,
+                    'from': device_id,
+                    'timestamp': firestore.SERVER_TIMESTAMP
+                })
+            batch.commit()
+            logger.info(f"{len(candidates)} ICE candidates added to room: {room_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to add ICE candidates: {e}")
+            return False
+    
+    @firestore_operation
     def get_offer(self, room_id):
         """Get offer from room"""
         try:
             room_ref = self.signaling_ref.document(room_id)
             doc = room_ref.get()
+            self.reads += 1
             if doc.exists:
                 data = doc.to_dict()
                 return data.get('offer')
@@ -117,11 +163,13 @@ class FirebaseSignaling:
             logger.error(f"Failed to get offer: {e}")
             return None
     
+    @firestore_operation
     def get_answer(self, room_id):
         """Get answer from room"""
         try:
             room_ref = self.signaling_ref.document(room_id)
             doc = room_ref.get()
+            self.reads += 1
             if doc.exists:
                 data = doc.to_dict()
                 return data.get('answer')
@@ -130,98 +178,241 @@ class FirebaseSignaling:
             logger.error(f"Failed to get answer: {e}")
             return None
     
-    def get_ice_candidates(self, room_id, device_id):
+    @firestore_operation
+    def get_ice_candidates(self, room_id, device_id, incremental=True):
         """Get ICE candidates for specific device"""
         try:
             ice_ref = self.signaling_ref.document(room_id).collection('ice_candidates')
             candidates = []
             
-            # Get candidates not from this device
-            docs = ice_ref.where('from', '!=', device_id).stream()
+            # Resume after the last document this device consumed; the
+            # 'from' filter is applied here because Firestore cannot combine
+            # it with the timestamp ordering the cursor needs
+            key = (room_id, device_id)
+            query = ice_ref.order_by('timestamp')
+            cursor = self._ice_cursors.get(key) if incremental else None
+            if cursor is not None:
+                query = query.start_after(cursor)
             
-            for doc in docs:
+            for doc in query.stream():
+                self.reads += 1
+                cursor = doc
                 data = doc.to_dict()
-                candidates.append(data['candidate'])
+                if data.get('from') != device_id:
+                    candidates.append(normalize_candidate(data))
             
+            if incremental and cursor is not None:
+                self._ice_cursors[key] = cursor
             return candidates
         except Exception as e:
             logger.error(f"Failed to get ICE candidates: {e}")
             return []
     
-    def listen_for_offer(self, room_id, callback):
-        """Listen for offer changes (for dashboard)"""
+    def _listen_for_description(self, room_id, kind, callback):
+        """
+        Watch the room document for an offer/answer. The snapshot fires on
+        every change to the room, so each version is only delivered once.
+        """
         try:
             room_ref = self.signaling_ref.document(room_id)
             
             def on_snapshot(doc_snapshot, changes, read_time):
                 for doc in doc_snapshot:
-                    data = doc.to_dict()
-                    if data.get('offer'):
-                        callback(data['offer'])
+                    self.reads += 1
+                    data = doc.to_dict() or {}
+                    if data.get(kind):
+                        self._deliver_description(room_id, kind, data[kind], callback)
             
             # Watch for changes
             room_ref.on_snapshot(on_snapshot)
-            logger.info(f"Listening for offer on room: {room_id}")
+            logger.info(f"Listening for {kind} on room: {room_id}")
         except Exception as e:
-            logger.error(f"Failed to listen for offer: {e}")
+            logger.error(f"Failed to listen for {kind}: {e}")
+    
+    def listen_for_offer(self, room_id, callback):
+        """Listen for offer changes (for dashboard)"""
+        self._listen_for_description(room_id, 'offer', callback)
     
     def listen_for_answer(self, room_id, callback):
         """Listen for answer changes (for RPi)"""
-        try:
-            room_ref = self.signaling_ref.document(room_id)
-            
-            def on_snapshot(doc_snapshot, changes, read_time):
-                for doc in doc_snapshot:
-                    data = doc.to_dict()
-                    if data.get('answer'):
-                        callback(data['answer'])
-            
-            # Watch for changes
-            room_ref.on_snapshot(on_snapshot)
-            logger.info(f"Listening for answer on room: {room_id}")
-        except Exception as e:
-            logger.error(f"Failed to listen for answer: {e}")
+        self._listen_for_description(room_id, 'answer', callback)
     
     def listen_for_ice_candidates(self, room_id, device_id, callback):
         """Listen for new ICE candidates"""
         try:
             ice_ref = self.signaling_ref.document(room_id).collection('ice_candidates')
+            key = (room_id, device_id)
+            seen = set()
+            
+            # A listener registered again (e.g. after a reconnect) starts
+            # from the cursor instead of replaying the whole subcollection
+            query = ice_ref.order_by('timestamp')
+            if self._ice_cursors.get(key) is not None:
+                query = query.start_after(self._ice_cursors[key])
             
             def on_snapshot(col_snapshot, changes, read_time):
                 for change in changes:
                     if change.type.name == 'ADDED':
+                        self.reads += 1
+                        if change.document.id in seen:
+                            self.duplicates += 1
+                            continue
+                        seen.add(change.document.id)
+                        self._ice_cursors[key] = change.document
                         data = change.document.to_dict()
                         if data.get('from') != device_id:
-                            callback(data['candidate'])
+                            callback(normalize_candidate(data))
             
             # Watch for new candidates
-            ice_ref.on_snapshot(on_snapshot)
+            query.on_snapshot(on_snapshot)
             logger.info(f"Listening for ICE candidates on room: {room_id}")
         except Exception as e:
             logger.error(f"Failed to listen for ICE candidates: {e}")
     
+    @firestore_operation
+    def join_session(self, room_id, session_id, device_id):
+        """Request a viewer session from a fan-out sender"""
+        try:
+            sessions_ref = self.signaling_ref.document(room_id).collection('sessions')
+            sessions_ref.document(session_id).set({
+                'session': session_id,
+                'from': device_id,
+                'timestamp': firestore.SERVER_TIMESTAMP
+            })
+            logger.info(f"Session {session_id} requested in room: {room_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to join session: {e}")
+            return False
+    
+    def listen_for_sessions(self, room_id, callback):
+        """Listen for viewer sessions (for a fan-out sender)"""
+        try:
+            sessions_ref = self.signaling_ref.document(room_id).collection('sessions')
+            
+            def on_snapshot(col_snapshot, changes, read_time):
+                for change in changes:
+                    if change.type.name == 'ADDED':
+                        self.reads += 1
+                        session = change.document.to_dict()
+                        # Server timestamp (a datetime) as unix time
+                        timestamp = session.get('timestamp')
+                        session['timestamp'] = timestamp.timestamp() if timestamp else None
+                        callback(session)
+            
+            sessions_ref.on_snapshot(on_snapshot)
+            logger.info(f"Listening for sessions on room: {room_id}")
+        except Exception as e:
+            logger.error(f"Failed to listen for sessions: {e}")
+    
+    @firestore_operation
+    def delete_session(self, room_id, session_id):
+        """Delete a handled session request so it is not delivered again"""
+        try:
+            self.signaling_ref.document(room_id).collection('sessions').document(session_id).delete()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete session: {e}")
+            return False
+    
+    def _delete_in_batches(self, refs):
+        """Delete documents with batched writes of at most FIRESTORE_BATCH_LIMIT"""
+        batches = 0
+        for start in range(0, len(refs), FIRESTORE_BATCH_LIMIT):
+            batch = self.db.batch()
+            for ref in refs[start:start + FIRESTORE_BATCH_LIMIT]:
+                batch.delete(ref)
+            batch.commit()
+            batches += 1
+        return batches
+    
+    def _room_refs(self, room_ref):
+        """References to a room's subcollections and the room itself (listing costs no reads)"""
+        refs = list(room_ref.collection('ice_candidates').list_documents())
+        refs.extend(room_ref.collection('sessions').list_documents())
+        refs.append(room_ref)
+        return refs
+    
+    @firestore_operation
     def cleanup_room(self, room_id):
         """Delete room and all its data"""
         try:
-            # Delete ICE candidates
-            ice_ref = self.signaling_ref.document(room_id).collection('ice_candidates')
-            docs = ice_ref.stream()
-            for doc in docs:
-                doc.reference.delete()
-            
-            # Delete room
-            self.signaling_ref.document(room_id).delete()
+            # ICE candidates and the room go out in as few batches as possible
+            refs = self._room_refs(self.signaling_ref.document(room_id))
+            self._delete_in_batches(refs)
+            self._forget_room(room_id)
             logger.info(f"Room cleaned up: {room_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to cleanup room: {e}")
             return False
     
+    @firestore_operation
+    def collect_garbage(self, ttl=SIGNALING_ROOM_TTL, dry_run=False):
+        """
+        Delete rooms created more than ttl seconds ago (with their ICE
+        candidates and sessions) and stale candidates of rooms that are
+        still around. A dry run only reports what would be removed and an
+        estimate of how long it would take, from the round trips of its
+        own queries.
+        
+        Stale candidates are queried room by room: a range filter on one
+        collection is served by Firestore's automatic single-field index,
+        while a collection_group query would need an index that has to be
+        created by hand.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+        start = time.monotonic()
+        queries = 0
+        refs = {}
+        counts = {'rooms': 0, 'candidates': 0, 'sessions': 0}
+        
+        def add(ref):
+            if ref.path not in refs:
+                refs[ref.path] = ref
+                counts[GARBAGE_KINDS.get(ref.parent.id, 'rooms')] += 1
+        
+        expired = set()
+        for doc in self.signaling_ref.where('created_at', '<', cutoff).stream():
+            self.reads += 1
+            expired.add(doc.id)
+            for ref in self._room_refs(doc.reference):
+                add(ref)
+            queries += 1
+        queries += 1
+        
+        for room_ref in self.signaling_ref.list_documents():
+            if room_ref.id in expired:
+                continue
+            stale = room_ref.collection('ice_candidates').where('timestamp', '<', cutoff)
+            for doc in stale.select([]).stream():
+                self.reads += 1
+                add(doc.reference)
+            queries += 1
+        queries += 1
+        
+        round_trip = (time.monotonic() - start) / queries
+        batches = math.ceil(len(refs) / FIRESTORE_BATCH_LIMIT)
+        report = {
+            'dry_run': dry_run,
+            **counts,
+            'batches': batches,
+            'estimated_seconds': round(batches * round_trip, 3)
+        }
+        
+        if not dry_run and refs:
+            start = time.monotonic()
+            self._delete_in_batches(list(refs.values()))
+            report['seconds'] = round(time.monotonic() - start, 3)
+        return report
+    
+    @firestore_operation
     def get_room_status(self, room_id):
         """Get current room status"""
         try:
             room_ref = self.signaling_ref.document(room_id)
             doc = room_ref.get()
+            self.reads += 1
             if doc.exists:
                 data = doc.to_dict()
                 return data.get('status', 'unknown')
@@ -0,0 +1,255 @@
+"""
+Shared Frame Hub for the MJPEG video feed
+One producer thread captures each frame once, encodes it once per quality
+tier that has viewers, and every /video_feed client reads the newest JPEG
+of its tier from a shared ring buffer
+"""
+
+import itertools
+import logging
+import threading
+import time
+
+import config
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ENCODE_SECONDS = REGISTRY.histogram('mjpeg_encode_seconds', 'JPEG encode time per frame', ('tier',))
+FRAMES_PRODUCED = REGISTRY.counter('mjpeg_frames_produced_total', 'Frames captured by the frame hub')
+
+# Smoothing factor for encode time / frame size averages
+EWMA_ALPHA = 0.1
+
+# Latency probe stages the MJPEG path has no separate step for: scaling and
+# JPEG encoding are one call per tier, and an <img> cannot tell receiving
+# from decoding
+PROBE_FOLDED_STAGES = {'convert': 'encode', 'decode': 'network'}
+
+
+class FrameSubscriber:
+    """
+    Read handle for one /video_feed client
+    """
+    def __init__(self, hub, client_id, tier=0, internal=False):
+        self.hub = hub
+        self.client_id = client_id
+        self.tier = tier
+        self.internal = internal
+        self.last_seq = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.stream = None
+        self.connected_at = time.time()
+
+    def next_frame(self, timeout=1.0):
+        """
+        Return the newest frame of this subscriber's tier (no copy), or None on timeout.
+        Frames published since the last call are skipped and counted as dropped.
+        """
+        seq, frame = self.hub.wait_for_frame(self.last_seq, self.tier, timeout)
+        if frame is None:
+            return None
+
+        if self.last_seq and seq > self.last_seq + 1:
+            self.frames_dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.frames_sent += 1
+        return frame
+
+    def set_tier(self, tier):
+        """Switch tier; the producer starts encoding it from the next frame"""
+        self.tier = max(0, min(tier, len(self.hub.tiers) - 1))
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def stats(self):
+        stats = {
+            'client_id': self.client_id,
+            'tier': self.hub.tiers[self.tier]['name'],
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'connected_for': round(time.time() - self.connected_at, 1)
+        }
+        if self.stream is not None:
+            stats.update(self.stream.stats())
+        return stats
+
+
+class FrameHub:
+    """
+    Single-producer, multi-consumer frame buffer.
+    The producer thread only runs while at least one viewer is subscribed,
+    and only encodes the tiers those viewers are currently using.
+    """
+    def __init__(self, camera_factory, encoder, tiers, ring_size=4, probe=None, sleep=None,
+                 poll_interval=config.MJPEG_POLL_INTERVAL):
+        """
+        probe: a LatencyProbe that stamps and times every frame (instrumentation mode)
+        sleep: cooperative sleep (socketio.sleep) for viewers on green threads.
+               Waiting on the Condition would block the whole event loop, so
+               frame waits poll every poll_interval with it instead.
+        """
+        self.camera_factory = camera_factory
+        self.encoder = encoder
+        self.tiers = tiers
+        self.ring_size = ring_size
+        self._rings = [[None] * ring_size for _ in tiers]
+        self._tier_seq = [0] * len(tiers)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._subscribers = {}
+        self._viewers = 0
+        self._ids = itertools.count(1)
+        self._thread = None
+        self.frames_produced = 0
+        self.encode_time = [0.0] * len(tiers)
+        self.frame_size = [0.0] * len(tiers)
+        self.probe = probe
+        self.sleep = sleep
+        self.poll_interval = poll_interval
+        self._encode_seconds = [ENCODE_SECONDS.labels(tier['name']) for tier in tiers]
+
+    def subscribe(self, tier=0, internal=False):
+        """
+        Register a new viewer and start the producer if needed.
+        internal: a consumer inside the app (the recorder), which keeps the
+        producer running but is not counted as a viewer
+        """
+        with self._cond:
+            subscriber = FrameSubscriber(self, next(self._ids), internal=internal)
+            subscriber.set_tier(tier)
+            # Start from the current frame so the first read does not count drops
+            subscriber.last_seq = self._seq
+            self._subscribers[subscriber.client_id] = subscriber
+            if not internal:
+                self._viewers += 1
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+        logger.info(f"Video viewer {subscriber.client_id} joined ({self.viewer_count} watching)")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._cond:
+            if self._subscribers.pop(subscriber.client_id, None) and not subscriber.internal:
+                self._viewers -= 1
+            self._cond.notify_all()
+        logger.info(f"Video viewer {subscriber.client_id} left ({self.viewer_count} watching)")
+
+    @property
+    def viewer_count(self):
+        """Connected /video_feed clients (internal subscribers excluded)"""
+        return self._viewers
+
+    def active_tiers(self):
+        """Tiers with at least one viewer"""
+        return {s.tier for s in list(self._subscribers.values())}
+
+    def publish(self, encoded):
+        """
+        Store one captured frame, encoded per tier ({tier: jpeg}), in the rings
+        and wake every waiting viewer
+        """
+        with self._cond:
+            self._seq += 1
+            for tier, frame in encoded.items():
+                self._rings[tier][self._seq % self.ring_size] = (self._seq, frame)
+                self._tier_seq[tier] = self._seq
+            self.frames_produced += 1
+            FRAMES_PRODUCED.inc()
+            self._cond.notify_all()
+
+    def latest(self, tier=0):
+        """Return (seq, frame) for the newest frame of a tier, or (0, None)"""
+        entry = self._rings[tier][self._tier_seq[tier] % self.ring_size]
+        return entry if entry else (0, None)
+
+    def wait_for_frame(self, last_seq, tier=0, timeout=1.0):
+        """Block until a frame newer than last_seq exists for a tier and return the newest one"""
+        if self.sleep is not None:
+            deadline = time.monotonic() + timeout
+            while self._tier_seq[tier] <= last_seq and time.monotonic() < deadline:
+                self.sleep(self.poll_interval)
+        with self._cond:
+            if self.sleep is None and self._tier_seq[tier] <= last_seq:
+                self._cond.wait_for(lambda: self._tier_seq[tier] > last_seq, timeout)
+            if self._tier_seq[tier] <= last_seq:
+                return last_seq, None
+            return self.latest(tier)
+
+    def _encode(self, frame, tiers):
+        encoded = {}
+        for tier in tiers:
+            start = time.monotonic()
+            jpeg = self.encoder(frame, self.tiers[tier])
+            elapsed = time.monotonic() - start
+            if jpeg is None:
+                continue
+            self._encode_seconds[tier].observe(elapsed)
+            self.encode_time[tier] += EWMA_ALPHA * (elapsed - self.encode_time[tier])
+            self.frame_size[tier] += EWMA_ALPHA * (len(jpeg) - self.frame_size[tier])
+            encoded[tier] = jpeg
+        return encoded
+
+    def _run(self):
+        """Producer loop: capture once, encode once per active tier"""
+        try:
+            camera = self.camera_factory()
+        except Exception as e:
+            # Let the next subscriber try again
+            logger.error(f"Camera unavailable: {e}")
+            with self._cond:
+                self._thread = None
+            return
+        logger.info("Frame hub producer started")
+        try:
+            while True:
+                with self._cond:
+                    if not self._subscribers:
+                        self._thread = None
+                        break
+
+                try:
+                    frame = camera.read()
+                    read_at = time.monotonic()
+                    if self.probe:
+                        code = self.probe.stamp(frame, time.time())
+                        start = time.monotonic()
+                        # capture: the frame's age when encoding began, as the
+                        # WebRTC track marks it (reads hand back a fresh frame)
+                        self.probe.mark(code, 'capture', start - read_at)
+                    encoded = self._encode(frame, self.active_tiers())
+                except Exception as e:
+                    logger.error(f"Frame capture failed: {e}")
+                    # The producer is a real thread, never a request's green thread
+                    time.sleep(0.1)
+                    continue
+
+                if encoded:
+                    if self.probe:
+                        # Tiers are encoded one after another and published
+                        # together, so the frame's encode time covers all of them
+                        self.probe.frame_ready(code, encode=time.monotonic() - start)
+                    self.publish(encoded)
+        finally:
+            del camera
+            logger.info("Frame hub producer stopped (no viewers)")
+
+    def stats(self):
+        with self._cond:
+            subscribers = [s for s in self._subscribers.values() if not s.internal]
+        return {
+            'viewers': len(subscribers),
+            'frames_produced': self.frames_produced,
+            'tiers': [{
+                'name': tier['name'],
+                'viewers': sum(1 for s in subscribers if s.tier == index),
+                'encode_ms': round(self.encode_time[index] * 1000, 2),
+                'frame_kb': round(self.frame_size[index] / 1024, 1)
+            } for index, tier in enumerate(self.tiers)],
+            'clients': [s.stats() for s in subscribers]
+        }
@@ -0,0 +1,490 @@
+"""
+GSM modem worker
+One thread owns the serial port: commands are queued by callers, written
+up to GSM_PIPELINE_DEPTH ahead of their responses and matched to final
+result codes in order. Lines nobody asked for are unsolicited result codes
+(URCs) and update the cached signal/registration state, which handlers
+read without touching the port.
+
+GSM_SERIAL_PORT = 'simulated' runs against FakeModem on a pty instead of
+real hardware (for development and benchmarks).
+"""
+
+import heapq
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+FINAL_OK = ('OK',)
+FINAL_ERROR = ('ERROR', 'NO CARRIER', 'BUSY', 'NO ANSWER', 'NO DIALTONE')
+FINAL_ERROR_PREFIXES = ('+CME ERROR:', '+CMS ERROR:')
+# Bare-word URCs; '+XXX:' lines are URCs when the command in flight did not ask for them
+URC_WORDS = ('RING', 'RDY', 'Call Ready', 'SMS Ready', 'NORMAL POWER DOWN', 'UNDER-VOLTAGE WARNNING')
+
+INIT_COMMANDS = ('ATE0', 'AT+CMEE=1', 'AT+CREG=1', 'AT+CMGF=1')
+STATUS_COMMAND = 'AT+CSQ;+CREG?'  # one round trip for both
+
+REGISTRATION = {0: 'not registered', 1: 'home', 2: 'searching', 3: 'denied',
+                4: 'unknown', 5: 'roaming'}
+
+
+def is_final(line):
+    return line in FINAL_OK or line in FINAL_ERROR or line.startswith(FINAL_ERROR_PREFIXES)
+
+
+def response_prefixes(command):
+    """'AT+CSQ;+CREG?' -> {'+CSQ', '+CREG'}: the information lines it will get back"""
+    prefixes = set()
+    for part in command[2:].split(';'):
+        name = part.lstrip('+').split('=')[0].split('?')[0]
+        if part.startswith('+') and name:
+            prefixes.add('+' + name)
+    return prefixes
+
+
+SIGNAL_BAR_THRESHOLDS = (2, 10, 15, 20, 25)  # +CSQ rssi for 1..5 bars
+
+
+def signal_bars(rssi):
+    """+CSQ rssi (0..31, 99 unknown) -> 0..5 bars"""
+    if rssi == 99:
+        return 0
+    return sum(1 for threshold in SIGNAL_BAR_THRESHOLDS if rssi >= threshold)
+
+
+class GSMResponse:
+    __slots__ = ('ok', 'lines', 'error')
+
+    def __init__(self, ok, lines, error=None):
+        self.ok = ok
+        self.lines = lines
+        self.error = error
+
+    def __repr__(self):
+        return f"GSMResponse(ok={self.ok}, lines={self.lines}, error={self.error!r})"
+
+
+class GSMCommand:
+    """A queued AT command; wait() for its GSMResponse or pass a callback"""
+    __slots__ = ('text', 'timeout', 'callback', 'prefixes', 'lines', 'deadline',
+                 'submitted_at', 'response', '_done')
+
+    def __init__(self, text, timeout, callback=None):
+        self.text = text
+        self.timeout = timeout
+        self.callback = callback
+        self.prefixes = response_prefixes(text)
+        self.lines = []
+        self.deadline = None
+        self.submitted_at = time.monotonic()
+        self.response = None
+        self._done = threading.Event()
+
+    def complete(self, response):
+        self.response = response
+        self._done.set()
+        if self.callback is not None:
+            try:
+                self.callback(response)
+            except Exception as e:
+                logger.warning(f"GSM callback for {self.text} failed: {e}")
+
+    def wait(self, timeout=None):
+        """GSMResponse, or None if it has not completed within timeout"""
+        self._done.wait(timeout)
+        return self.response
+
+
+class RawSerial:
+    """
+    Minimal termios serial port for when pyserial is not installed
+    (POSIX only): raw 8N1, non-blocking reads
+    """
+    def __init__(self, path, baudrate):
+        import termios
+        import tty
+
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self.fd)
+        attrs = termios.tcgetattr(self.fd)
+        speed = getattr(termios, f'B{baudrate}', termios.B9600)
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+
+    def fileno(self):
+        return self.fd
+
+    def read(self, size):
+        try:
+            return os.read(self.fd, size)
+        except BlockingIOError:
+            return b''
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self.fd, view):]
+            except BlockingIOError:
+                select.select([], [self.fd], [], 1.0)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_serial(path, baudrate):
+    """pyserial if installed, RawSerial otherwise"""
+    try:
+        import serial
+    except ImportError:
+        return RawSerial(path, baudrate)
+    return serial.Serial(path, baudrate, timeout=0, write_timeout=config.GSM_TIMEOUT)
+
+
+class GSMModem:
+    """
+    The worker. submit() never blocks; status() returns the cached state
+    dict (replaced, never mutated, on every change).
+    """
+    def __init__(self, port=config.GSM_SERIAL_PORT, baudrate=config.GSM_BAUD_RATE,
+                 timeout=config.GSM_TIMEOUT, pipeline_depth=config.GSM_PIPELINE_DEPTH,
+                 poll_interval=config.GSM_POLL_INTERVAL):
+        self.port_name = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.poll_interval = poll_interval
+        self.port = None
+        self.fake = None
+        self._queue = queue.Queue()
+        self._in_flight = []
+        self._buffer = b''
+        self._wake_r, self._wake_w = os.pipe()
+        self._resync_until = 0.0
+        self._stale_prefixes = set()
+        self._next_poll = 0.0
+        self._status_pending = False
+        self._running = False
+        self._thread = None
+        # Called with the new status dict after every change (telemetry)
+        self.listeners = []
+        # Called with each URC line
+        self.urc_handlers = []
+        self._status = {'connected': False, 'registered': False, 'registration': 'unknown',
+                        'rssi': 99, 'dbm': None, 'bars': 0, 'ber': 99, 'unread_sms': 0,
+                        'rings': 0, 'updated_at': None}
+        self.commands = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.urcs = 0
+
+    def start(self):
+        if self.port_name == 'simulated':
+            self.fake = FakeModem()
+            self.fake.start()
+            self.port = open_serial(self.fake.device, self.baudrate)
+        else:
+            self.port = open_serial(self.port_name, self.baudrate)
+        self._running = True
+        for command in INIT_COMMANDS:
+            self.submit(command)
+        self._thread = threading.Thread(target=self._run, name='gsm', daemon=True)
+        self._thread.start()
+        logger.info(f"GSM worker started on {self.port_name} ({self.baudrate} baud)")
+
+    def stop(self):
+        self._running = False
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self.port is not None:
+            self.port.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        if self.fake is not None:
+            self.fake.stop()
+
+    def status(self):
+        return self._status
+
+    def submit(self, text, timeout=None, callback=None):
+        """Queue an AT command; returns its GSMCommand immediately"""
+        command = GSMCommand(text, timeout or self.timeout, callback)
+        self._queue.put(command)
+        self._wake()
+        return command
+
+    def command(self, text, timeout=None):
+        """Blocking convenience for scripts; handlers should use submit() or status()"""
+        command = self.submit(text, timeout)
+        return command.wait((timeout or self.timeout) + 1.0) or GSMResponse(False, [], 'timeout')
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b'x')
+        except OSError:
+            pass
+
+    def _set_status(self, **changes):
+        status = dict(self._status, **changes)
+        if status == self._status:
+            return
+        status['updated_at'] = time.time()
+        self._status = status
+        for listener in self.listeners:
+            try:
+                listener(status)
+            except Exception as e:
+                logger.warning(f"GSM status listener failed: {e}")
+
+    def _run(self):
+        fd = self.port.fileno()
+        while self._running:
+            now = time.monotonic()
+            self._fill_pipeline(now)
+            wait = self._next_poll - now
+            if self._in_flight:
+                wait = min(wait, self._in_flight[0].deadline - now)
+            if self._resync_until:
+                wait = min(wait, self._resync_until - now)
+            readable, _, _ = select.select([fd, self._wake_r], [], [], max(0.0, wait))
+            if self._wake_r in readable:
+                os.read(self._wake_r, 4096)
+            if fd in readable:
+                self._read()
+            self._expire(time.monotonic())
+
+    def _fill_pipeline(self, now):
+        if self._resync_until:
+            if now < self._resync_until:
+                return
+            self._resync_until = 0.0
+        if now >= self._next_poll and not self._status_pending:
+            self._status_pending = True
+            self._next_poll = now + self.poll_interval
+            self._queue.put(GSMCommand(STATUS_COMMAND, self.timeout, self._status_polled))
+        while len(self._in_flight) < self.pipeline_depth:
+            try:
+                command = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            command.deadline = time.monotonic() + command.timeout
+            self._in_flight.append(command)
+            try:
+                self.port.write(command.text.encode('ascii') + b'\r')
+            except Exception as e:
+                self._fail(command, f"write failed: {e}")
+            self.commands += 1
+
+    def _status_polled(self, response):
+        self._status_pending = False
+        self._set_status(connected=response.ok or response.error != 'timeout')
+
+    def _read(self):
+        data = self.port.read(4096)
+        if not data:
+            return
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b'\n')
+        for raw in lines:
+            line = raw.strip().decode('ascii', 'replace')
+            if line:
+                self._handle_line(line)
+
+    def _handle_line(self, line):
+        head = self._in_flight[0] if self._in_flight else None
+        if head is not None and any(line == command.text for command in self._in_flight):
+            return  # echo, before ATE0 has taken effect
+        if is_final(line):
+            if head is None:
+                # Late result of a timed-out command, or noise
+                self._resync_until = self._resync_until and time.monotonic() + self.timeout
+                return
+            self._in_flight.pop(0)
+            ok = line in FINAL_OK
+            if not ok:
+                self.errors += 1
+            head.complete(GSMResponse(ok, head.lines, None if ok else line))
+            return
+        prefix = line.split(':', 1)[0] if line.startswith('+') else None
+        solicited = head is not None and (
+            prefix in head.prefixes if prefix else line not in URC_WORDS)
+        if solicited:
+            head.lines.append(line)
+            self._parse_status(prefix, line)
+            return
+        if self._resync_until:
+            # Late results of timed-out commands; keep the link quiet a while longer
+            if prefix in self._stale_prefixes or (prefix is None and line not in URC_WORDS):
+                self._resync_until = time.monotonic() + self.timeout
+                self._parse_status(prefix, line)
+                return
+        self.urcs += 1
+        self._parse_status(prefix, line)
+        for handler in self.urc_handlers:
+            try:
+                handler(line)
+            except Exception as e:
+                logger.warning(f"GSM URC handler failed on {line!r}: {e}")
+
+    def _parse_status(self, prefix, line):
+        if prefix is None:
+            if line == 'RING':
+                self._set_status(rings=self._status['rings'] + 1)
+            return
+        fields = [field.strip().strip('"') for field in line.split(':', 1)[1].split(',')]
+        try:
+            if prefix == '+CSQ':
+                rssi, ber = int(fields[0]), int(fields[1])
+                self._set_status(connected=True, rssi=rssi, ber=ber, bars=signal_bars(rssi),
+                                 dbm=None if rssi == 99 else -113 + 2 * rssi)
+            elif prefix == '+CREG':
+                # Response to AT+CREG? is 'n,stat[,lac,ci]', the URC 'stat[,lac,ci]'
+                stat = int(fields[1] if len(fields) in (2, 4) else fields[0])
+                self._set_status(registered=stat in (1, 5),
+                                 registration=REGISTRATION.get(stat, 'unknown'))
+            elif prefix == '+CMTI':
+                self._set_status(unread_sms=self._status['unread_sms'] + 1)
+        except (ValueError, IndexError):
+            logger.debug(f"Unparsed GSM line {line!r}")
+
+    def _fail(self, command, error):
+        if command in self._in_flight:
+            self._in_flight.remove(command)
+        self.errors += 1
+        command.complete(GSMResponse(False, command.lines, error))
+
+    def _expire(self, now):
+        if not self._in_flight or self._in_flight[0].deadline > now:
+            return
+        # Once one command times out the responses can no longer be matched
+        # to what is in flight: fail them all and wait for the line to go quiet
+        expired, self._in_flight = self._in_flight, []
+        self._stale_prefixes = set()
+        for command in expired:
+            self._stale_prefixes |= command.prefixes
+            self.timeouts += 1
+            command.complete(GSMResponse(False, command.lines, 'timeout'))
+        self._resync_until = now + self.timeout
+        logger.warning(f"GSM command {expired[0].text} timed out, "
+                       f"{len(expired) - 1} more in flight dropped")
+
+    def stats(self):
+        return {
+            'port': self.port_name,
+            'pipeline_depth': self.pipeline_depth,
+            'queued': self._queue.qsize(),
+            'in_flight': len(self._in_flight),
+            'commands': self.commands,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'urcs': self.urcs
+        }
+
+
+class FakeModem:
+    """
+    AT modem on a pty. Commands are processed one at a time, each taking
+    `processing` seconds, and every byte crossing the link is delayed by
+    `latency` seconds, so pipelining and slow modems can be measured.
+    """
+    def __init__(self, latency=0.0, processing=0.0, rssi=20, stat=1):
+        self.latency = latency
+        self.processing = processing
+        self.rssi = rssi
+        self.stat = stat
+        self.echo = True
+        self.creg_mode = 0
+        self.master, slave = os.openpty()
+        self.device = os.ttyname(slave)
+        self._slave = slave
+        self._outgoing = []  # heap of (send_at, order, bytes)
+        self._order = 0
+        self._busy_until = 0.0
+        self._buffer = b''
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self.received = 0
+
+    def start(self):
+        import tty
+        tty.setraw(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='fake-modem', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        os.close(self.master)
+        os.close(self._slave)
+
+    def urc(self, line):
+        """Send an unsolicited line (after the link latency)"""
+        self._send(time.monotonic() + self.latency, f'\r\n{line}\r\n')
+
+    def _send(self, at, text):
+        with self._lock:
+            self._order += 1
+            heapq.heappush(self._outgoing, (at, self._order, text.encode('ascii')))
+
+    def _run(self):
+        while self._running:
+            now = time.monotonic()
+            with self._lock:
+                while self._outgoing and self._outgoing[0][0] <= now:
+                    os.write(self.master, heapq.heappop(self._outgoing)[2])
+                wait = self._outgoing[0][0] - now if self._outgoing else 0.05
+            readable, _, _ = select.select([self.master], [], [], max(0.0, min(wait, 0.05)))
+            if readable:
+                try:
+                    data = os.read(self.master, 4096)
+                except OSError:
+                    return
+                self._receive(data, time.monotonic())
+
+    def _receive(self, data, now):
+        self._buffer += data
+        *commands, self._buffer = self._buffer.split(b'\r')
+        for raw in commands:
+            text = raw.strip().decode('ascii', 'replace')
+            if not text:
+                continue
+            self.received += 1
+            # Arrives after the link latency, waits for earlier commands, then is processed
+            started = max(now + self.latency, self._busy_until)
+            self._busy_until = started + self.processing
+            reply = (text + '\r' if self.echo else '') + self._execute(text)
+            self._send(self._busy_until + self.latency, reply)
+
+    def _execute(self, text):
+        if not text.upper().startswith('AT'):
+            return '\r\nERROR\r\n'
+        lines = []
+        for part in text[2:].split(';'):
+            part = part.upper()
+            if part in ('', 'E0', 'E1'):
+                if part:
+                    self.echo = part == 'E1'
+            elif part in ('+CMEE=1', '+CMGF=1'):
+                pass
+            elif part.startswith('+CREG='):
+                self.creg_mode = int(part[6:] or 0)
+            elif part == '+CREG?':
+                lines.append(f'+CREG: {self.creg_mode},{self.stat}')
+            elif part == '+CSQ':
+                lines.append(f'+CSQ: {self.rssi},0')
+            elif part == '+CGSN':
+                lines.append('867000000000000')
+            else:
+                return '\r\n+CME ERROR: 4\r\n'
+        return ''.join(f'\r\n{line}\r\n' for line in lines) + '\r\nOK\r\n'
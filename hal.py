@@ -0,0 +1,214 @@
+"""
+Hardware Abstraction Layer
+Pin-level backends (RPi.GPIO or in-process simulation) and the motor and
+servo drivers built on them from the pin definitions in config.py
+"""
+
+import logging
+import time
+from array import array
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Write kinds stored in the simulated backend log
+WRITE_DIGITAL = 0
+WRITE_PWM = 1
+
+
+class GPIOBackend:
+    """
+    Real backend on RPi.GPIO (BCM numbering)
+    """
+    def __init__(self):
+        import RPi.GPIO as GPIO
+
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+        self._pwm = {}
+        self._pins = set()
+        self.writes = 0
+
+    def setup_output(self, pin):
+        self.GPIO.setup(pin, self.GPIO.OUT, initial=self.GPIO.LOW)
+        self._pins.add(pin)
+
+    def write(self, pin, value):
+        self.GPIO.output(pin, self.GPIO.HIGH if value else self.GPIO.LOW)
+        self.writes += 1
+
+    def setup_input(self, pin):
+        self.GPIO.setup(pin, self.GPIO.IN, pull_up_down=self.GPIO.PUD_UP)
+        self._pins.add(pin)
+
+    def read(self, pin):
+        return bool(self.GPIO.input(pin))
+
+    def pwm_start(self, pin, frequency):
+        self.setup_output(pin)
+        pwm = self.GPIO.PWM(pin, frequency)
+        pwm.start(0)
+        self._pwm[pin] = pwm
+
+    def pwm_write(self, pin, duty):
+        self._pwm[pin].ChangeDutyCycle(duty)
+        self.writes += 1
+
+    def close(self):
+        for pwm in self._pwm.values():
+            pwm.stop()
+        self.GPIO.cleanup(list(self._pins))
+        self._pwm.clear()
+        self._pins.clear()
+
+    def stats(self):
+        return {'backend': 'gpio', 'writes': self.writes}
+
+
+class SimulatedBackend:
+    """
+    In-process backend that records every digital/PWM write with a monotonic
+    timestamp. The log is a preallocated ring of typed arrays, so recording
+    a write costs four stores and no allocation.
+    """
+    def __init__(self, capacity=config.HAL_SIM_LOG_SIZE):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.pins = array('B', bytes(capacity))
+        self.kinds = array('B', bytes(capacity))
+        self.values = array('f', bytes(4 * capacity))
+        self.writes = 0
+        self.state = {}
+        self.inputs = {}
+        self.frequencies = {}
+        self.started_at = time.monotonic()
+
+    def _record(self, pin, kind, value):
+        index = self.writes % self.capacity
+        self.timestamps[index] = time.monotonic()
+        self.pins[index] = pin
+        self.kinds[index] = kind
+        self.values[index] = value
+        self.writes += 1
+        self.state[pin] = value
+
+    def setup_output(self, pin):
+        self.state[pin] = 0
+
+    def write(self, pin, value):
+        self._record(pin, WRITE_DIGITAL, 1.0 if value else 0.0)
+
+    def setup_input(self, pin):
+        # Pulled up, like the GPIO backend
+        self.inputs.setdefault(pin, True)
+
+    def read(self, pin):
+        return self.inputs.get(pin, True)
+
+    def set_input(self, pin, value):
+        """Drive a simulated input pin (e.g. the battery monitor)"""
+        self.inputs[pin] = bool(value)
+
+    def pwm_start(self, pin, frequency):
+        self.frequencies[pin] = frequency
+        self.state[pin] = 0.0
+
+    def pwm_write(self, pin, duty):
+        self._record(pin, WRITE_PWM, duty)
+
+    def close(self):
+        pass
+
+    def log(self, last=None):
+        """Return recorded writes, oldest first, as (timestamp, pin, kind, value)"""
+        count = min(self.writes, self.capacity)
+        if last is not None:
+            count = min(count, last)
+        start = self.writes - count
+        entries = []
+        for n in range(start, self.writes):
+            index = n % self.capacity
+            entries.append((self.timestamps[index], self.pins[index],
+                            self.kinds[index], self.values[index]))
+        return entries
+
+    def clear(self):
+        self.writes = 0
+        self.started_at = time.monotonic()
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started_at
+        return {
+            'backend': 'simulated',
+            'writes': self.writes,
+            'writes_per_sec': round(self.writes / elapsed, 1) if elapsed > 0 else 0.0,
+            'log_capacity': self.capacity
+        }
+
+
+def create_backend(name=config.HAL_BACKEND):
+    """Build the backend selected in config.HAL_BACKEND ('gpio' or 'simulated')"""
+    if name == 'gpio':
+        return GPIOBackend()
+    return SimulatedBackend()
+
+
+class L298NMotorDriver:
+    """
+    L298N dual H-bridge on the motor pins from config.py
+    """
+    def __init__(self, backend, pwm_frequency=config.MOTOR_PWM_FREQUENCY):
+        self.backend = backend
+        self.pins = {
+            'left': (config.MOTOR_LEFT_FORWARD, config.MOTOR_LEFT_BACKWARD, config.MOTOR_LEFT_ENABLE),
+            'right': (config.MOTOR_RIGHT_FORWARD, config.MOTOR_RIGHT_BACKWARD, config.MOTOR_RIGHT_ENABLE)
+        }
+        for forward, backward, enable in self.pins.values():
+            backend.setup_output(forward)
+            backend.setup_output(backward)
+            backend.pwm_start(enable, pwm_frequency)
+        self.writes = 0
+
+    def _set(self, side, duty):
+        forward, backward, enable = self.pins[side]
+        self.backend.write(forward, duty > 0)
+        self.backend.write(backward, duty < 0)
+        self.backend.pwm_write(enable, min(100.0, abs(duty)))
+
+    def set_motors(self, left, right):
+        """Set signed duty cycles (-100..100) for the left and right motors"""
+        self._set('left', left)
+        self._set('right', right)
+        self.writes += 1
+
+    def stop(self):
+        self.set_motors(0.0, 0.0)
+
+    def close(self):
+        self.stop()
+        self.backend.close()
+
+
+class ServoDriver:
+    """
+    Hobby servos on config.SERVO_PINS, angle 0..180 mapped to
+    SERVO_MIN_DUTY..SERVO_MAX_DUTY at SERVO_PWM_FREQUENCY
+    """
+    def __init__(self, backend, pins=config.SERVO_PINS):
+        self.backend = backend
+        self.pins = list(pins)
+        for pin in self.pins:
+            backend.pwm_start(pin, config.SERVO_PWM_FREQUENCY)
+        self.writes = 0
+
+    @staticmethod
+    def angle_to_duty(angle):
+        span = config.SERVO_MAX_DUTY - config.SERVO_MIN_DUTY
+        return config.SERVO_MIN_DUTY + span * max(0, min(180, angle)) / 180.0
+
+    def set_angle(self, index, angle):
+        """Set servo `index` (0-based) to an angle in degrees"""
+        self.backend.pwm_write(self.pins[index], self.angle_to_duty(angle))
+        self.writes += 1
@@ -0,0 +1,266 @@
+"""
+Glass-to-glass latency instrumentation
+The sender stamps each frame's capture time into its top-right corner as a
+grid of black/white cells coarse enough to survive JPEG and H.264; the
+dashboard reads the code back from the displayed frame
+(static/js/latency_probe.js) and reports when it received and showed it.
+Joined with the sender's own per-frame stage times, that gives capture,
+convert, encode, network and decode latency for the MJPEG and WebRTC
+paths side by side.
+"""
+
+import collections
+import math
+import threading
+import time
+
+from metrics import Histogram
+
+# Code layout, shared with static/js/latency_probe.js: GRID x GRID cells,
+# each 1/CELLS_PER_WIDTH of the frame width, one cell in from the top-right
+# corner. Row-major bits: 32 bits of capture time (ms, wrapping every ~49
+# days) followed by a 4-bit population count of them.
+GRID = 6
+CELLS_PER_WIDTH = 40
+CODE_BITS = 32
+CODE_MASK = (1 << CODE_BITS) - 1
+CHECK_BITS = GRID * GRID - CODE_BITS
+
+STAGES = ('capture', 'convert', 'encode', 'network', 'decode', 'total')
+
+# Frames (and dashboard reports) waiting for their other half
+HISTORY = 512
+
+# Seconds; glass-to-glass ranges up to a badly buffered stream
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1,
+                   0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+
+def code_bits(code):
+    """The GRID*GRID cell values (1 = white) for a 32-bit code"""
+    bits = [(code >> (CODE_BITS - 1 - i)) & 1 for i in range(CODE_BITS)]
+    check = sum(bits) & ((1 << CHECK_BITS) - 1)
+    return bits + [(check >> (CHECK_BITS - 1 - i)) & 1 for i in range(CHECK_BITS)]
+
+
+def bits_code(bits):
+    """Inverse of code_bits(); None if the check bits do not match"""
+    code = 0
+    for bit in bits[:CODE_BITS]:
+        code = (code << 1) | bit
+    check = 0
+    for bit in bits[CODE_BITS:]:
+        check = (check << 1) | bit
+    if check != sum(bits[:CODE_BITS]) & ((1 << CHECK_BITS) - 1):
+        return None
+    return code
+
+
+def code_cells(width):
+    """(cell size, x, y) of the code grid in a frame `width` pixels wide"""
+    cell = max(1, width // CELLS_PER_WIDTH)
+    return cell, width - (GRID + 1) * cell, cell
+
+
+def draw_code(frame, code):
+    """Paint a code into a BGR/gray ndarray in place (a few slice fills)"""
+    cell, x0, y0 = code_cells(frame.shape[1])
+    for index, bit in enumerate(code_bits(code)):
+        row, col = divmod(index, GRID)
+        y = y0 + row * cell
+        x = x0 + col * cell
+        frame[y:y + cell, x:x + cell] = 255 if bit else 0
+
+
+def read_code(frame):
+    """Read a code back from a decoded frame (what the dashboard does in JS)"""
+    cell, x0, y0 = code_cells(frame.shape[1])
+    bits = []
+    for index in range(GRID * GRID):
+        row, col = divmod(index, GRID)
+        y = y0 + row * cell + cell // 2
+        x = x0 + col * cell + cell // 2
+        bits.append(1 if frame[y, x].mean() > 127 else 0)
+    return bits_code(bits)
+
+
+def capture_code(captured_at):
+    """Code for a wall-clock capture time in seconds"""
+    return int(captured_at * 1000) & CODE_MASK
+
+
+def unwrap_code(code, reference_ms):
+    """Full wall-clock ms of a code, taking the wrap closest before reference_ms"""
+    return reference_ms - ((int(reference_ms) - code) & CODE_MASK)
+
+
+def _number(value, name, optional=False):
+    """A finite int/float from a posted record; ValueError otherwise"""
+    if value is None and optional:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number, got {value!r}")
+    return value
+
+
+def _code(value):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= CODE_MASK:
+        raise ValueError(f"code must be a {CODE_BITS}-bit integer, got {value!r}")
+    return value
+
+
+def parse_frames(frames):
+    """Validate posted sender frames ([{code, ready, stages}]); ValueError on the first bad one"""
+    if not isinstance(frames, list):
+        raise ValueError("frames must be a list")
+    parsed = []
+    for frame in frames:
+        if not isinstance(frame, dict) or not isinstance(frame.get('stages'), dict):
+            raise ValueError(f"frame needs code, ready and stages: {frame!r}")
+        stages = {}
+        for stage, seconds in frame['stages'].items():
+            if stage not in STAGES:
+                raise ValueError(f"unknown stage {stage!r}")
+            if _number(seconds, stage) < 0:
+                raise ValueError(f"{stage} must not be negative")
+            stages[stage] = seconds
+        parsed.append({'code': _code(frame.get('code')),
+                       'ready': _number(frame.get('ready'), 'ready'), 'stages': stages})
+    return parsed
+
+
+def parse_reports(reports):
+    """Validate posted dashboard reports ([{code, received, displayed}])"""
+    if not isinstance(reports, list):
+        raise ValueError("reports must be a list")
+    parsed = []
+    for report in reports:
+        if not isinstance(report, dict):
+            raise ValueError(f"report needs code and displayed: {report!r}")
+        parsed.append((_code(report.get('code')),
+                       _number(report.get('received'), 'received', optional=True),
+                       _number(report.get('displayed'), 'displayed')))
+    return parsed
+
+
+def wall_time(monotonic_at):
+    """Wall-clock seconds for a time.monotonic() reading"""
+    return time.time() - (time.monotonic() - monotonic_at)
+
+
+class LatencyProbe:
+    """
+    Per-path stage histograms. The sender side calls stamp(), mark() and
+    frame_ready(); the dashboard side adds report() for the frames it
+    displayed. A sender in another process (the Pi's WebRTC track) sets
+    forward=True and ships its frames with drain() to the dashboard's
+    probe, which calls add_frames().
+
+    folded: {stage: stage it is measured in} for the stages a path has no
+    separate step for, reported as such rather than left out silently
+    """
+    def __init__(self, path, forward=False, history=HISTORY, folded=None):
+        self.path = path
+        self.folded = dict(folded or {})
+        self.forward = forward
+        self.history = history
+        self.histograms = {stage: Histogram(LATENCY_BUCKETS) for stage in STAGES}
+        self.last_code = None
+        self.frames_stamped = 0
+        self.frames_matched = 0
+        self._lock = threading.Lock()
+        self._stages = collections.OrderedDict()  # code -> {stage: seconds}
+        self._ready = collections.OrderedDict()  # code -> ms the sender was done
+        self._reports = collections.OrderedDict()  # code -> (received ms, displayed ms)
+        self._outbox = collections.deque(maxlen=history)
+
+    @staticmethod
+    def _remember(entries, key, value, limit):
+        entries[key] = value
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+    def stamp(self, frame, captured_at):
+        """Stamp a frame captured at wall-clock captured_at; returns its code"""
+        code = capture_code(captured_at)
+        draw_code(frame, code)
+        with self._lock:
+            self._remember(self._stages, code, {}, self.history)
+        self.last_code = code
+        self.frames_stamped += 1
+        return code
+
+    def mark(self, code, stage, seconds):
+        """Time a sender-side stage of a stamped frame"""
+        with self._lock:
+            stages = self._stages.get(code)
+            if stages is not None:
+                stages[stage] = seconds
+
+    def frame_ready(self, code, ready_at=None, **stages):
+        """
+        The sender is done with a frame (encoded, about to hit the network);
+        stages are its last stage times. Only the first call per code
+        counts, so fan-out senders sharing one stamped frame record it once.
+        """
+        with self._lock:
+            marked = self._stages.pop(code, None)
+        if marked is None:
+            return
+        marked.update(stages)
+        frame = {'code': code, 'ready': (ready_at or time.time()) * 1000, 'stages': marked}
+        if self.forward:
+            self._outbox.append(frame)
+        else:
+            self.add_frames([frame])
+
+    def drain(self):
+        """Frames waiting to be forwarded to the dashboard"""
+        frames = []
+        while self._outbox:
+            frames.append(self._outbox.popleft())
+        return frames
+
+    def add_frames(self, frames):
+        """Sender-side records ({code, ready, stages}), local or forwarded"""
+        for frame in frames:
+            for stage, seconds in frame['stages'].items():
+                if stage in self.histograms:
+                    self.histograms[stage].observe(seconds)
+            with self._lock:
+                report = self._reports.pop(frame['code'], None)
+                if report is None:
+                    self._remember(self._ready, frame['code'], frame['ready'], self.history)
+            if report is not None:
+                self._join(frame['code'], frame['ready'], *report)
+
+    def report(self, code, received, displayed):
+        """
+        The dashboard showed a frame; received/displayed are wall-clock ms on
+        the dashboard server's clock. received is None where the browser
+        cannot tell (an MJPEG <img>); network then includes decoding.
+        """
+        with self._lock:
+            ready = self._ready.pop(code, None)
+            if ready is None:
+                self._remember(self._reports, code, (received, displayed), self.history)
+        if ready is not None:
+            self._join(code, ready, received, displayed)
+
+    def _join(self, code, ready, received, displayed):
+        self.frames_matched += 1
+        arrived = displayed if received is None else received
+        self.histograms['network'].observe(max(0.0, arrived - ready) / 1000)
+        if received is not None:
+            self.histograms['decode'].observe(max(0.0, displayed - received) / 1000)
+        captured = unwrap_code(code, displayed)
+        self.histograms['total'].observe(max(0.0, displayed - captured) / 1000)
+
+    def snapshot(self):
+        return {
+            'frames_stamped': self.frames_stamped,
+            'frames_matched': self.frames_matched,
+            'folded': self.folded,
+            'stages': {stage: histogram.snapshot()
+                       for stage, histogram in self.histograms.items() if histogram.count}
+        }
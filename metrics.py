@@ -0,0 +1,297 @@
+"""
+Lightweight metrics primitives
+Fixed-bucket histograms cheap enough to update from hot loops, sharded
+counters, and a registry rendered in the Prometheus text format for /metrics
+"""
+
+import bisect
+import functools
+import itertools
+import threading
+import time
+
+# Upper bounds in seconds, suitable for loop jitter and command latency
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+                   0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is a bisect and two additions, no allocation.
+    Percentiles are reported as the upper bound of the bucket they fall in.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Upper bucket bound below which `fraction` of observations fall"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def merge(self, other):
+        """Add another histogram with the same buckets into this one"""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        if other.max > self.max:
+            self.max = other.max
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def snapshot(self, scale=1000.0):
+        """Summary in milliseconds (scale=1000) for JSON stats endpoints"""
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count * scale, 3) if self.count else 0.0,
+            'p50': round(self.percentile(0.5) * scale, 3),
+            'p90': round(self.percentile(0.9) * scale, 3),
+            'p99': round(self.percentile(0.99) * scale, 3),
+            'max': round(self.max * scale, 3),
+            'buckets': {str(round(bound * scale, 3)): count
+                        for bound, count in zip(self.buckets + (float('inf'),), self.counts)}
+        }
+
+
+def format_labels(labels):
+    """Prometheus label set: {name="value",...} (empty string for none)"""
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for name, value in labels.items())
+    return '{' + pairs + '}'
+
+
+def render_histogram(name, histogram, labels=None):
+    """Prometheus text exposition lines for one histogram (cumulative buckets)"""
+    labels = dict(labels or {})
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+        cumulative += count
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': le})} {cumulative}")
+    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    return lines
+
+
+# Cells per Counter / ShardedHistogram. Fixed, so threads that come and go
+# (request handlers, reconnecting workers) never grow a metric.
+METRIC_SHARDS = 16
+
+_local = threading.local()
+_shard_ids = itertools.count()
+
+
+def _shard():
+    """This thread's shard, assigned round-robin on its first metric update"""
+    try:
+        return _local.shard
+    except AttributeError:
+        _local.shard = next(_shard_ids) % METRIC_SHARDS
+        return _local.shard
+
+
+class Counter:
+    """
+    Monotonic counter split over METRIC_SHARDS cells with a lock each.
+    Threads are spread over the cells, so a lock is rarely contended.
+    value() sums the cells.
+    """
+    def __init__(self):
+        self._cells = [0] * METRIC_SHARDS
+        self._locks = [threading.Lock() for _ in range(METRIC_SHARDS)]
+
+    def inc(self, amount=1):
+        shard = _shard()
+        with self._locks[shard]:
+            self._cells[shard] += amount
+
+    def value(self):
+        return sum(self._cells)
+
+
+class ShardedHistogram:
+    """
+    Histogram split over METRIC_SHARDS shards with a lock each, for metrics
+    observed from request handlers and worker threads at once
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._shards = [Histogram(self.buckets) for _ in range(METRIC_SHARDS)]
+        self._locks = [threading.Lock() for _ in range(METRIC_SHARDS)]
+
+    def observe(self, value):
+        shard = _shard()
+        with self._locks[shard]:
+            self._shards[shard].observe(value)
+
+    def merged(self):
+        """One Histogram over every shard (a snapshot, not kept in sync)"""
+        total = Histogram(self.buckets)
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                total.merge(shard)
+        return total
+
+    def time(self):
+        return Timer(self)
+
+
+class Timer:
+    """Context manager observing its wall time (seconds) into a histogram"""
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+def timed(histogram):
+    """Decorator observing each call's wall time into a histogram"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class MetricFamily:
+    """
+    A named metric with a fixed set of label names. labels() returns the
+    child for one label combination; hot paths should look it up once and
+    keep it. A family without label names is used directly.
+    """
+    def __init__(self, name, documentation, kind, labelnames, factory):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self._children = {}
+        if not self.labelnames and factory is not None:
+            self._children[()] = factory()
+
+    def labels(self, *values, **labels):
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self.factory())
+        return child
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            if self.kind == 'histogram':
+                lines.extend(render_histogram(self.name, child.merged(), labels))
+            else:
+                lines.append(f"{self.name}{format_labels(labels)} {child.value()}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time (queue depth, viewers, ...)"""
+    def __init__(self, callback):
+        self.callback = callback
+
+    def value(self):
+        return self.callback()
+
+
+class MetricsRegistry:
+    """
+    Metric families plus collectors (callables returning exposition lines,
+    for state kept elsewhere), rendered in registration order
+    """
+    def __init__(self):
+        self._families = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _family(self, name, documentation, kind, labelnames, factory):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(
+                    name, documentation, kind, labelnames, factory)
+            elif family.kind != kind or family.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as a different {family.kind}")
+            return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._family(name, documentation, 'counter', labelnames, Counter)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._family(name, documentation, 'histogram', labelnames,
+                            lambda: ShardedHistogram(buckets))
+
+    def gauge(self, name, documentation, callback, labels=None):
+        """A callback gauge; one family may hold several label sets"""
+        family = self._family(name, documentation, 'gauge', tuple(labels or ()), None)
+        family._children[tuple(str(value) for value in (labels or {}).values())] = Gauge(callback)
+        return family
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """The whole registry in the Prometheus text exposition format"""
+        lines = []
+        for family in list(self._families.values()):
+            lines.extend(family.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry served at /metrics
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,200 @@
+"""
+Paced, adaptive MJPEG streaming for /video_feed
+Holds each client at the configured FPS on a monotonic clock and moves it
+along the quality/scale ladder (config.MJPEG_TIERS) based on measured send
+throughput; FPS is only lowered once the client is on the lowest tier
+"""
+
+import time
+
+import config
+
+BOUNDARY_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+BOUNDARY_TRAILER = b'\r\n\r\n'
+
+# Smoothing factor for the moving averages reported in stats()
+EWMA_ALPHA = 0.1
+
+# Throughput is measured over windows of this many seconds
+THROUGHPUT_WINDOW = 1.0
+# Headroom required before stepping down / up a tier
+STEP_DOWN_MARGIN = 1.1
+STEP_UP_MARGIN = 1.5
+# Consecutive good windows required before stepping up
+STEP_UP_WINDOWS = 3
+
+
+def encode_jpeg(frame, tier):
+    """Encode a BGR frame at a tier's scale and JPEG quality"""
+    # Imported here so importing this module (and app.py) does not load OpenCV
+    import cv2
+
+    scale = tier.get('scale', 1.0)
+    if scale != 1.0:
+        height, width = frame.shape[:2]
+        frame = cv2.resize(frame, (int(width * scale), int(height * scale)),
+                           interpolation=cv2.INTER_AREA)
+    ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, tier['quality']])
+    return jpeg.tobytes() if ret else None
+
+
+def find_tier(tiers, value):
+    """Resolve a ?tier= query value (name or index) to a tier index, or None"""
+    if value is None or value == '':
+        return None
+    for index, tier in enumerate(tiers):
+        if tier['name'] == value:
+            return index
+    try:
+        index = int(value)
+    except ValueError:
+        return None
+    return index if 0 <= index < len(tiers) else None
+
+
+class MJPEGStream:
+    """
+    Per-client paced generator on top of a FrameSubscriber.
+    Late frames are dropped (the hub always hands out the newest one),
+    so latency never builds up behind a slow link.
+    """
+    def __init__(self, subscriber, fps=config.VIDEO_FPS, min_fps=config.MJPEG_MIN_FPS,
+                 pinned=False, sleep=time.sleep):
+        """sleep: socketio.sleep when the response runs on a green thread"""
+        self.subscriber = subscriber
+        self.sleep = sleep
+        self.hub = subscriber.hub
+        self.pinned = pinned
+        self.target_fps = fps
+        self.min_fps = min(min_fps, fps)
+        self.fps = float(fps)
+        self.achieved_fps = 0.0
+        self.write_time = 0.0
+        self.throughput = None
+        self.slow_writes = 0
+        self.tier_changes = 0
+        self._fast_writes = 0
+        self._good_windows = 0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_write_time = 0.0
+        self._last_sent = None
+        subscriber.stream = self
+
+    def _record_write(self, write_time, size, now):
+        self.write_time += EWMA_ALPHA * (write_time - self.write_time)
+        if self._last_sent is not None:
+            fps = 1.0 / max(now - self._last_sent, 1e-6)
+            self.achieved_fps += EWMA_ALPHA * (fps - self.achieved_fps)
+        self._last_sent = now
+        self._window_bytes += size
+        self._window_write_time += write_time
+
+    def _required_rate(self, tier):
+        """Bytes/s a tier needs at the target FPS, or None if never encoded"""
+        size = self.hub.frame_size[tier]
+        return size * self.target_fps if size else None
+
+    def _adapt_tier(self, now):
+        """Move one tier down/up once per throughput window"""
+        if now - self._window_start < THROUGHPUT_WINDOW:
+            return
+        # Writes that never blocked mean the socket is not the bottleneck
+        if self._window_write_time > 0.001:
+            self.throughput = self._window_bytes / self._window_write_time
+        else:
+            self.throughput = None
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_write_time = 0.0
+
+        if self.pinned:
+            return
+
+        tier = self.subscriber.tier
+        required = self._required_rate(tier)
+        if self.throughput is not None and required and \
+                self.throughput < required * STEP_DOWN_MARGIN:
+            if tier < len(self.hub.tiers) - 1:
+                self.subscriber.set_tier(tier + 1)
+                self.tier_changes += 1
+            self._good_windows = 0
+            return
+
+        if tier == 0 or self.fps < self.target_fps:
+            return
+        upper = self._required_rate(tier - 1)
+        if self.throughput is None or upper is None or \
+                self.throughput > upper * STEP_UP_MARGIN:
+            self._good_windows += 1
+            if self._good_windows >= STEP_UP_WINDOWS:
+                self.subscriber.set_tier(tier - 1)
+                self.tier_changes += 1
+                self._good_windows = 0
+        else:
+            self._good_windows = 0
+
+    def _adapt_fps(self, write_time):
+        """Back off when the write blocked for a large part of the frame slot"""
+        interval = 1.0 / self.fps
+        lowest_tier = self.pinned or self.subscriber.tier == len(self.hub.tiers) - 1
+        if write_time > interval * 0.5:
+            self.slow_writes += 1
+            self._fast_writes = 0
+            # Drop quality first, frame rate only once there is no lower tier
+            if lowest_tier:
+                self.fps = max(self.min_fps, self.fps * 0.75)
+        elif write_time < interval * 0.1:
+            self._fast_writes += 1
+            # Recover slowly so a single fast write does not cause oscillation
+            if self._fast_writes >= self.fps and self.fps < self.target_fps:
+                self.fps = min(self.target_fps, self.fps + 1)
+                self._fast_writes = 0
+        else:
+            self._fast_writes = 0
+
+    def frames(self):
+        """Generator of multipart chunks; closes the subscriber on exit"""
+        next_deadline = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                if next_deadline > now:
+                    self.sleep(next_deadline - now)
+
+                frame = self.subscriber.next_frame()
+                if frame is None:
+                    next_deadline = time.monotonic()
+                    continue
+
+                # Yield the shared JPEG as its own chunk so it is never copied
+                start = time.monotonic()
+                yield BOUNDARY_HEADER
+                yield frame
+                yield BOUNDARY_TRAILER
+                now = time.monotonic()
+
+                write_time = now - start
+                self._record_write(write_time, len(frame), now)
+                self._adapt_fps(write_time)
+                self._adapt_tier(now)
+
+                interval = 1.0 / self.fps
+                next_deadline += interval
+                # Never try to catch up on missed slots
+                if now - next_deadline > interval:
+                    next_deadline = now
+        finally:
+            self.subscriber.close()
+
+    def stats(self):
+        return {
+            'pinned': self.pinned,
+            'target_fps': self.target_fps,
+            'current_fps': round(self.fps, 1),
+            'achieved_fps': round(self.achieved_fps, 1),
+            'write_ms': round(self.write_time * 1000, 2),
+            'throughput_kbps': round(self.throughput * 8 / 1000) if self.throughput else None,
+            'slow_writes': self.slow_writes,
+            'tier_changes': self.tier_changes
+        }
@@ -0,0 +1,162 @@
+"""
+Real-time motor control loop
+Runs at a fixed rate independent of the Socket.IO handlers: reads the
+latest drive vector, applies deadzone/sensitivity and tank-drive mixing,
+writes the result through a HAL motor driver and forces STOP when no command
+has arrived within AUTO_STOP_TIMEOUT
+"""
+
+import logging
+import threading
+import time
+
+import config
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+def apply_deadzone(value, deadzone=config.JOYSTICK_DEADZONE,
+                   sensitivity=config.JOYSTICK_SENSITIVITY):
+    """Zero small inputs, rescale the rest so output starts at 0 past the deadzone"""
+    magnitude = abs(value)
+    if magnitude < deadzone:
+        return 0.0
+    scaled = (magnitude - deadzone) / (100.0 - deadzone) * 100.0 if deadzone < 100 else 0.0
+    scaled = min(100.0, scaled * sensitivity)
+    return scaled if value > 0 else -scaled
+
+
+def mix_tank(x, y, deadzone=config.JOYSTICK_DEADZONE,
+             sensitivity=config.JOYSTICK_SENSITIVITY):
+    """
+    Convert a joystick vector (x right, +y forward, -100..100) to
+    left/right track speeds (-100..100)
+    """
+    x = apply_deadzone(x, deadzone, sensitivity)
+    y = apply_deadzone(y, deadzone, sensitivity)
+    left = max(-100.0, min(100.0, y + x))
+    right = max(-100.0, min(100.0, y - x))
+    return left, right
+
+
+def to_duty(speed, min_speed=config.MIN_SPEED, max_speed=config.MAX_SPEED):
+    """Map a track speed (-100..100) to a signed PWM duty cycle, honouring MIN_SPEED"""
+    if speed == 0:
+        return 0.0
+    duty = min_speed + (max_speed - min_speed) * abs(speed) / 100.0
+    return duty if speed > 0 else -duty
+
+
+class MotorController:
+    """
+    Fixed-rate control loop with deadman watchdog.
+    Handlers only call set_target(); the loop thread owns the driver.
+    """
+    def __init__(self, driver, rate=config.CONTROL_LOOP_HZ,
+                 timeout=config.AUTO_STOP_TIMEOUT, auto_stop=config.ENABLE_AUTO_STOP,
+                 autostart=True):
+        self.driver = driver
+        self.autostart = autostart
+        self.period = 1.0 / rate
+        self.timeout = timeout
+        self.auto_stop = auto_stop
+        self._lock = threading.Lock()
+        self._x = 0
+        self._y = 0
+        self._seq = 0
+        self._updated = None
+        self._applied_seq = 0
+        self._thread = None
+        self._running = False
+        self.stopped_by_watchdog = False
+        self.auto_stops = 0
+        self.left = 0.0
+        self.right = 0.0
+        self.loop_jitter = Histogram()
+        self.command_age = Histogram()
+
+    def set_target(self, x, y):
+        """Record the latest drive vector (called from any thread)"""
+        with self._lock:
+            self._x = x
+            self._y = y
+            self._seq += 1
+            self._updated = time.monotonic()
+        if self.autostart and self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        logger.info(f"Motor control loop started at {1.0 / self.period:.0f} Hz")
+
+    def stop(self):
+        """Stop the loop and the motors"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.driver.stop()
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while self._running:
+            now = time.monotonic()
+            self.loop_jitter.observe(abs(now - next_tick))
+            try:
+                self.tick(now)
+            except Exception as e:
+                logger.error(f"Motor control tick failed: {e}")
+
+            next_tick += self.period
+            now = time.monotonic()
+            # Skip missed ticks rather than running a burst to catch up
+            if now - next_tick > self.period:
+                next_tick = now
+            else:
+                time.sleep(max(0.0, next_tick - now))
+
+    def tick(self, now=None):
+        """One control-loop iteration (exposed for tests and replay)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            x, y, seq, updated = self._x, self._y, self._seq, self._updated
+
+        if updated is None:
+            return
+
+        # An idle car (last command was a stop) is not a watchdog event
+        if self.auto_stop and now - updated > self.timeout and (x or y):
+            if not self.stopped_by_watchdog:
+                self.stopped_by_watchdog = True
+                self.auto_stops += 1
+                logger.warning(f"No drive command for {self.timeout}s, auto-stopping")
+            left = right = 0.0
+        else:
+            self.stopped_by_watchdog = False
+            left, right = mix_tank(x, y)
+            left, right = to_duty(left), to_duty(right)
+
+        if seq != self._applied_seq:
+            self._applied_seq = seq
+            self.command_age.observe(now - updated)
+
+        if (left, right) != (self.left, self.right):
+            self.driver.set_motors(left, right)
+            self.left, self.right = left, right
+
+    def stats(self):
+        return {
+            'left_duty': round(self.left, 1),
+            'right_duty': round(self.right, 1),
+            'auto_stops': self.auto_stops,
+            'stopped_by_watchdog': self.stopped_by_watchdog,
+            'driver_writes': self.driver.writes,
+            'loop_jitter_ms': self.loop_jitter.snapshot(),
+            'command_age_ms': self.command_age.snapshot()
+        }
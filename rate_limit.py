@@ -0,0 +1,190 @@
+"""
+Per-session command rate limiting
+Enforces config.MAX_COMMAND_RATE with a token bucket per client, whatever
+the channel. Commands over the limit are not queued: only the newest state
+of each channel is kept and applied as soon as the next token is
+available, so the car always ends up in the last state the operator sent.
+"""
+
+import logging
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket refilled at `rate` tokens/s up to `burst`"""
+    def __init__(self, rate, burst, now=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_time(self, now=None):
+        """Seconds until the next token is available"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+
+class _Client:
+    def __init__(self, rate, burst, now):
+        self.bucket = TokenBucket(rate, burst, now)
+        # channel -> (apply, state), in the order the channels fell behind
+        self.pending = {}
+        self.flush_scheduled = False
+        self.last_seen = now
+
+
+class CommandRateLimiter:
+    """
+    Token-bucket limiter with one bucket per client (socket sid / client
+    address), shared by all of its channels ('drive', 'control', 'servo1',
+    ...). Pending state is kept per channel, so a servo command over the
+    limit does not replace a drive command. Commands are applied under the
+    limiter lock, so those of a channel are applied in the order they were
+    accepted; apply callables must not block.
+
+    Clients idle for idle_timeout seconds are forgotten (HTTP clients have
+    no disconnect event).
+
+    Counters:
+        accepted - applied immediately
+        merged   - deferred and later applied as part of the newest state
+        dropped  - deferred and superseded by a newer state before being applied
+        expired  - idle clients forgotten
+    """
+    def __init__(self, rate=config.MAX_COMMAND_RATE, burst=config.COMMAND_BURST,
+                 spawn=None, sleep=time.sleep, idle_timeout=config.RATE_LIMIT_IDLE_TIMEOUT,
+                 clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.spawn = spawn or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self.sleep = sleep
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._swept_at = clock()
+        self.accepted = 0
+        self.merged = 0
+        self.dropped = 0
+        self.expired = 0
+
+    def submit(self, client, channel, apply, state, merge=None):
+        """
+        Apply `apply(state)` now if the client has a token and nothing
+        pending on this channel. Otherwise keep `state` as the channel's
+        pending state (combined with an older pending one through
+        `merge(old, new)` if given) and apply it once a token frees up.
+        Returns True if applied immediately.
+        """
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            entry = self._clients.get(client)
+            if entry is None:
+                entry = self._clients[client] = _Client(self.rate, self.burst, now)
+            entry.last_seen = now
+
+            if channel not in entry.pending and entry.bucket.consume(now):
+                self.accepted += 1
+                apply(state)
+                return True
+
+            old = entry.pending.get(channel)
+            if old is not None:
+                self.dropped += 1
+                if merge is not None:
+                    state = merge(old[1], state)
+            entry.pending[channel] = (apply, state)
+            if not entry.flush_scheduled:
+                entry.flush_scheduled = True
+                self.spawn(lambda: self._flush(client))
+            return False
+
+    def _flush(self, client):
+        """Apply a client's pending channels, one token each, oldest first"""
+        while True:
+            with self._lock:
+                entry = self._clients.get(client)
+                if entry is None:
+                    return
+                if not entry.pending:
+                    entry.flush_scheduled = False
+                    return
+                now = self.clock()
+                if entry.bucket.consume(now):
+                    channel = next(iter(entry.pending))
+                    apply, state = entry.pending.pop(channel)
+                    self.merged += 1
+                    try:
+                        apply(state)
+                    except Exception as e:
+                        logger.error(f"Failed to apply rate-limited {channel} command: {e}")
+                    continue
+                delay = entry.bucket.wait_time(now)
+            self.sleep(delay)
+
+    def _expire(self, now):
+        """Forget idle clients; scans at most once per idle_timeout (lock held)"""
+        if now - self._swept_at < self.idle_timeout:
+            return
+        self._swept_at = now
+        idle = [client for client, entry in self._clients.items()
+                if not entry.pending and now - entry.last_seen >= self.idle_timeout]
+        for client in idle:
+            del self._clients[client]
+        self.expired += len(idle)
+
+    def forget(self, client):
+        """Drop a client's bucket and pending commands (client disconnect)"""
+        with self._lock:
+            self._clients.pop(client, None)
+
+    def stats(self):
+        return {
+            'max_rate': self.rate,
+            'burst': self.burst,
+            'clients': len(self._clients),
+            'accepted': self.accepted,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'expired': self.expired
+        }
+
+
+class PassThroughLimiter:
+    """
+    Same interface as CommandRateLimiter, but applies every command at once.
+    Used by control log replay, where wall-clock rate limiting would drop
+    messages the live session applied.
+    """
+    def __init__(self):
+        self.applied = 0
+
+    def submit(self, client, channel, apply, state, merge=None):
+        apply(state)
+        self.applied += 1
+        return True
+
+    def forget(self, client):
+        pass
+
+    def stats(self):
+        return {'applied': self.applied}
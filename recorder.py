@@ -0,0 +1,374 @@
+"""
+Session recorder on a segmented, memory-mapped ring file
+Frames already encoded for /video_feed, control state changes and
+telemetry events are appended, interleaved by timestamp, into fixed-size
+segments of one preallocated file. Each segment covers up to
+RECORD_SEGMENT_SECONDS; when the ring is full the oldest segment is
+reused, so disk usage never grows past the file size.
+
+File layout (little-endian):
+
+    header   magic, version, geometry, next segment sequence
+    index    one entry per segment: sequence, first/last timestamp,
+             bytes used, record count, state
+    segments RECORD_SEGMENTS x RECORD_SEGMENT_SIZE bytes of records:
+             timestamp float64 | kind uint8 | length uint32 | payload
+
+The index is small and lives in the header pages, so seek() finds the
+segment holding a timestamp without touching the segments themselves.
+"""
+
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RCRING01'
+VERSION = 1
+HEADER_STRUCT = struct.Struct('<8sIIIdQ')  # magic, version, segments, segment size, seconds, next seq
+INDEX_STRUCT = struct.Struct('<QddIIB3x')  # seq, start, end, used, count, state
+RECORD_STRUCT = struct.Struct('<dBI')  # timestamp, kind, payload length
+
+SEGMENT_EMPTY = 0
+SEGMENT_OPEN = 1
+SEGMENT_CLOSED = 2
+
+KIND_FRAME = 1  # JPEG bytes
+KIND_CONTROL = 2  # CONTROL_EVENT_STRUCT
+KIND_TELEMETRY = 3  # JSON object
+KIND_NAMES = {KIND_FRAME: 'frame', KIND_CONTROL: 'control', KIND_TELEMETRY: 'telemetry'}
+
+# Drive vector and servo angles after a change: x, y, servo 1..3
+CONTROL_EVENT_STRUCT = struct.Struct('<bb3B')
+
+
+def _data_offset(segments):
+    """Segments start on the first page boundary after the index"""
+    index_end = HEADER_STRUCT.size + segments * INDEX_STRUCT.size
+    return -(-index_end // mmap.PAGESIZE) * mmap.PAGESIZE
+
+
+class SegmentInfo:
+    """One index entry, as read from the file"""
+    __slots__ = ('slot', 'seq', 'start', 'end', 'used', 'count', 'state')
+
+    def __init__(self, slot, seq, start, end, used, count, state):
+        self.slot = slot
+        self.seq = seq
+        self.start = start
+        self.end = end
+        self.used = used
+        self.count = count
+        self.state = state
+
+    def to_dict(self):
+        return {'seq': self.seq, 'start': self.start, 'end': self.end,
+                'bytes': self.used, 'records': self.count,
+                'state': 'open' if self.state == SEGMENT_OPEN else 'closed'}
+
+
+class RingFile:
+    """Geometry and index access shared by the writer and readers"""
+    def __init__(self, path, writable=False, segments=None, segment_size=None,
+                 segment_seconds=None):
+        self.path = path
+        self.writable = writable
+        if writable:
+            self._open_for_write(segments, segment_size, segment_seconds)
+        else:
+            with open(path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_header()
+
+    def _open_for_write(self, segments, segment_size, segment_seconds):
+        size = _data_offset(segments) + segments * segment_size
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            existing = os.fstat(fd).st_size
+            if existing != size:
+                os.ftruncate(fd, size)
+                if hasattr(os, 'posix_fallocate'):
+                    # Reserve the blocks now, not on the first write to each page
+                    os.posix_fallocate(fd, 0, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        try:
+            self._read_header()
+            reuse = (self.segments, self.segment_size) == (segments, segment_size)
+        except ValueError:
+            reuse = False
+        if not reuse:
+            # New file, or a different geometry: start an empty ring
+            self.map[:_data_offset(segments)] = bytes(_data_offset(segments))
+            HEADER_STRUCT.pack_into(self.map, 0, MAGIC, VERSION, segments, segment_size,
+                                    segment_seconds, 0)
+            self._read_header()
+        self.segment_seconds = segment_seconds
+
+    def _read_header(self):
+        magic, version, segments, segment_size, seconds, next_seq = \
+            HEADER_STRUCT.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a recording ring file")
+        self.segments = segments
+        self.segment_size = segment_size
+        self.segment_seconds = seconds
+        self.data_offset = _data_offset(segments)
+
+    @property
+    def next_seq(self):
+        return HEADER_STRUCT.unpack_from(self.map, 0)[5]
+
+    def segment_offset(self, slot):
+        return self.data_offset + slot * self.segment_size
+
+    def index_offset(self, slot):
+        return HEADER_STRUCT.size + slot * INDEX_STRUCT.size
+
+    def segment_info(self, slot):
+        return SegmentInfo(slot, *INDEX_STRUCT.unpack_from(self.map, self.index_offset(slot)))
+
+    def index(self):
+        """Segments holding records, oldest first"""
+        entries = [self.segment_info(slot) for slot in range(self.segments)]
+        return sorted((e for e in entries if e.state != SEGMENT_EMPTY and e.count), key=lambda e: e.seq)
+
+    def close(self):
+        self.map.close()
+
+
+class RingRecorder:
+    """
+    Appends records to the ring. Thread-safe; each append packs the record
+    header and copies the payload straight into the mapping, with no
+    per-record allocation.
+    """
+    def __init__(self, path=config.RECORD_PATH, segments=config.RECORD_SEGMENTS,
+                 segment_size=config.RECORD_SEGMENT_SIZE,
+                 segment_seconds=config.RECORD_SEGMENT_SECONDS):
+        self.ring = RingFile(path, writable=True, segments=segments, segment_size=segment_size,
+                             segment_seconds=segment_seconds)
+        self.map = self.ring.map
+        self._lock = threading.Lock()
+        self._slot = None
+        self._seq = 0
+        self._start = 0.0
+        self._end = 0.0
+        self._used = 0
+        self._count = 0
+        self.records = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.segments_rolled = 0
+        self._close_open_segments()
+        logger.info(f"Recording to {path} ({segments} x {segment_size // 1024} KiB segments)")
+
+    def _close_open_segments(self):
+        """A previous run may have stopped mid-segment; its records stay readable"""
+        for slot in range(self.ring.segments):
+            info = self.ring.segment_info(slot)
+            if info.state == SEGMENT_OPEN:
+                self._write_index(slot, info.seq, info.start, info.end, info.used, info.count,
+                                  SEGMENT_CLOSED)
+
+    def _write_index(self, slot, seq, start, end, used, count, state):
+        INDEX_STRUCT.pack_into(self.map, self.ring.index_offset(slot),
+                               seq, start, end, used, count, state)
+
+    def _roll(self, timestamp):
+        """Close the current segment and reuse the oldest slot"""
+        if self._slot is not None:
+            self._write_index(self._slot, self._seq, self._start, self._end, self._used,
+                              self._count, SEGMENT_CLOSED)
+        self._seq = self.ring.next_seq
+        self._slot = self._seq % self.ring.segments
+        self._start = self._end = timestamp
+        self._used = 0
+        self._count = 0
+        # Empty first, so a reader never sees the old records under the new times
+        self._write_index(self._slot, self._seq, timestamp, timestamp, 0, 0, SEGMENT_EMPTY)
+        HEADER_STRUCT.pack_into(self.map, 0, MAGIC, VERSION, self.ring.segments,
+                                self.ring.segment_size, self.ring.segment_seconds, self._seq + 1)
+        self._write_index(self._slot, self._seq, timestamp, timestamp, 0, 0, SEGMENT_OPEN)
+        self.segments_rolled += 1
+
+    def append(self, kind, payload, timestamp=None):
+        """Append one record; returns False if it can never fit in a segment"""
+        if timestamp is None:
+            timestamp = time.time()
+        size = RECORD_STRUCT.size + len(payload)
+        if size > self.ring.segment_size:
+            self.dropped += 1
+            return False
+
+        with self._lock:
+            if self._slot is None or timestamp - self._start >= self.ring.segment_seconds or \
+                    self._used + size > self.ring.segment_size:
+                self._roll(timestamp)
+
+            offset = self.ring.segment_offset(self._slot) + self._used
+            RECORD_STRUCT.pack_into(self.map, offset, timestamp, kind, len(payload))
+            self.map[offset + RECORD_STRUCT.size:offset + size] = payload
+            self._used += size
+            self._count += 1
+            self._end = max(self._end, timestamp)
+            # Publish the record only once its bytes are in place
+            self._write_index(self._slot, self._seq, self._start, self._end, self._used,
+                              self._count, SEGMENT_OPEN)
+            self.records += 1
+            self.bytes_written += size
+        return True
+
+    def record_frame(self, jpeg, timestamp=None):
+        return self.append(KIND_FRAME, jpeg, timestamp)
+
+    def record_image(self, image, timestamp=None, quality=config.RECORD_JPEG_QUALITY):
+        """Encode and record a raw BGR frame (sources without JPEG frames of their own)"""
+        import cv2
+        ret, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return ret and self.append(KIND_FRAME, jpeg, timestamp)
+
+    def record_control(self, x, y, servos, timestamp=None):
+        return self.append(KIND_CONTROL, CONTROL_EVENT_STRUCT.pack(x, y, *servos), timestamp)
+
+    def record_telemetry(self, values, timestamp=None):
+        return self.append(KIND_TELEMETRY, json.dumps(values, separators=(',', ':')).encode(),
+                           timestamp)
+
+    def on_control(self, dispatcher):
+        """ControlDispatcher observer: record the control state after each change"""
+        self.record_control(dispatcher.x, dispatcher.y, dispatcher.servos)
+
+    def close(self):
+        with self._lock:
+            if self._slot is not None:
+                self._write_index(self._slot, self._seq, self._start, self._end, self._used,
+                                  self._count, SEGMENT_CLOSED)
+                self._slot = None
+            self.map.flush()
+            self.ring.close()
+
+    def stats(self):
+        return {
+            'path': self.ring.path,
+            'records': self.records,
+            'bytes_written': self.bytes_written,
+            'dropped': self.dropped,
+            'segments_rolled': self.segments_rolled,
+            'capacity_bytes': self.ring.segments * self.ring.segment_size
+        }
+
+
+class RingReader:
+    """
+    Reads a ring file (also while a recorder is writing it). Records come
+    back as (timestamp, kind, payload bytes).
+    """
+    def __init__(self, path=config.RECORD_PATH):
+        self.ring = RingFile(path)
+
+    def segments(self):
+        return self.ring.index()
+
+    def records(self, segment, since=None):
+        """Records of one segment, optionally from the first one at or after since"""
+        offset = self.ring.segment_offset(segment.slot)
+        end = offset + segment.used
+        while offset < end:
+            timestamp, kind, length = RECORD_STRUCT.unpack_from(self.ring.map, offset)
+            payload_at = offset + RECORD_STRUCT.size
+            offset = payload_at + length
+            if since is None or timestamp >= since:
+                yield timestamp, kind, self.ring.map[payload_at:offset]
+
+    def seek(self, timestamp, kinds=None):
+        """
+        Records from `timestamp` on, across segments in order. The index
+        picks the segment to open; only that segment is scanned to the
+        exact record.
+        """
+        index = self.segments()
+        if not index:
+            return
+        starts = [segment.start for segment in index]
+        first = max(0, bisect.bisect_right(starts, timestamp) - 1)
+        for segment in index[first:]:
+            seq = segment.seq
+            for record in self.records(segment, since=timestamp):
+                if kinds is None or record[1] in kinds:
+                    yield record
+            if self.ring.segment_info(segment.slot).seq != seq:
+                # The recorder reused the slot under us; later data is newer anyway
+                return
+
+    def frame_at(self, timestamp):
+        """(timestamp, jpeg) of the first frame at or after timestamp, or None"""
+        for record_time, _, payload in self.seek(timestamp, kinds=(KIND_FRAME,)):
+            return record_time, payload
+        return None
+
+    def close(self):
+        self.ring.close()
+
+
+def decode_event(kind, payload):
+    """Control/telemetry payloads as dicts (frames are left as bytes)"""
+    if kind == KIND_CONTROL:
+        x, y, s1, s2, s3 = CONTROL_EVENT_STRUCT.unpack(payload)
+        return {'x': x, 'y': y, 'servos': [s1, s2, s3]}
+    if kind == KIND_TELEMETRY:
+        return json.loads(payload)
+    return payload
+
+
+class FrameHubTap:
+    """
+    Records the frames the frame hub already produced for /video_feed, as
+    one more (internal, not counted as a viewer) subscriber on a fixed tier,
+    at up to fps frames per second
+    """
+    def __init__(self, hub, recorder, tier=config.RECORD_TIER, fps=config.RECORD_FPS):
+        self.hub = hub
+        self.recorder = recorder
+        self.tier = tier
+        self.fps = fps
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        subscriber = self.hub.subscribe(self.tier, internal=True)
+        interval = 1.0 / self.fps
+        next_at = 0.0
+        try:
+            while self._running:
+                frame = subscriber.next_frame()
+                now = time.monotonic()
+                if frame is None or now < next_at:
+                    continue
+                next_at = now + interval
+                self.recorder.record_frame(frame)
+        finally:
+            subscriber.close()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
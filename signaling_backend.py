@@ -0,0 +1,398 @@
+"""
+WebRTC signaling backends
+SignalingBackend is the interface shared by FirebaseSignaling (Firestore),
+LocalSignaling (in-memory rooms, served to the LAN by the dashboard's
+Flask-SocketIO server) and SocketIOSignaling (client of that server).
+All methods are blocking; wrap a backend in AsyncSignaling for asyncio code.
+
+Every backend delivers incrementally: offers/answers carry a version and
+a listener only sees each version once, and ICE candidates are read from
+a per-consumer cursor so nothing is fetched or delivered twice.
+"""
+
+import logging
+import threading
+import time
+
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+
+def description_version():
+    """Version stamp for a new offer/answer (microseconds since the epoch)"""
+    return time.time_ns() // 1000
+
+
+def session_room(room_id, session_id):
+    """Signaling room of one viewer session of room_id (fan-out mode)"""
+    return f"{room_id}__{session_id}"
+
+
+def normalize_candidate(data):
+    """
+    Return an ICE candidate as {'candidate', 'sdpMLineIndex', 'sdpMid'}.
+    The dashboard stores the fields flat next to 'from', the sender nests
+    them under 'candidate'; both shapes are accepted.
+    """
+    candidate = data.get('candidate')
+    if isinstance(candidate, dict):
+        return candidate
+    return {
+        'candidate': candidate,
+        'sdpMLineIndex': data.get('sdpMLineIndex'),
+        'sdpMid': data.get('sdpMid')
+    }
+
+
+class SignalingBackend:
+    """
+    Room-based offer/answer/ICE exchange.
+    Listener callbacks may be called from any thread.
+    """
+    def __init__(self):
+        self.reads = 0
+        self.duplicates = 0
+        self._versions = {}
+        self._ice_cursors = {}
+
+    def _deliver_description(self, room_id, kind, description, callback):
+        """Call callback unless this version of the offer/answer was already delivered"""
+        key = (room_id, kind)
+        version = description.get('version')
+        if version is not None and self._versions.get(key) == version:
+            self.duplicates += 1
+            return
+        self._versions[key] = version
+        callback(description)
+
+    def _forget_room(self, room_id):
+        for versions in (self._versions, self._ice_cursors):
+            for key in [key for key in versions if key[0] == room_id]:
+                del versions[key]
+
+    def stats(self):
+        return {'reads': self.reads, 'duplicates': self.duplicates}
+
+    def create_room(self, room_id):
+        raise NotImplementedError
+
+    def send_offer(self, room_id, offer_sdp, device_id):
+        raise NotImplementedError
+
+    def send_answer(self, room_id, answer_sdp, device_id):
+        raise NotImplementedError
+
+    def add_ice_candidate(self, room_id, candidate, device_id):
+        raise NotImplementedError
+
+    def add_ice_candidates(self, room_id, candidates, device_id):
+        """Add several ICE candidates; backends override this to batch"""
+        return all([self.add_ice_candidate(room_id, candidate, device_id)
+                    for candidate in candidates])
+
+    def get_offer(self, room_id):
+        raise NotImplementedError
+
+    def get_answer(self, room_id):
+        raise NotImplementedError
+
+    def get_ice_candidates(self, room_id, device_id, incremental=True):
+        """
+        Candidates from other devices. Incremental reads only return what
+        arrived since the previous read (or listener delivery) for device_id.
+        """
+        raise NotImplementedError
+
+    def get_room_status(self, room_id):
+        raise NotImplementedError
+
+    def listen_for_offer(self, room_id, callback):
+        raise NotImplementedError
+
+    def listen_for_answer(self, room_id, callback):
+        raise NotImplementedError
+
+    def listen_for_ice_candidates(self, room_id, device_id, callback):
+        raise NotImplementedError
+
+    def join_session(self, room_id, session_id, device_id):
+        """
+        Ask the fan-out sender of room_id for a peer connection of our own;
+        it negotiates in session_room(room_id, session_id)
+        """
+        raise NotImplementedError
+
+    def listen_for_sessions(self, room_id, callback):
+        """
+        Call callback({'session', 'from', 'timestamp'}) for every viewer
+        session of room_id; timestamp is a unix time, or None if unknown
+        """
+        raise NotImplementedError
+
+    def delete_session(self, room_id, session_id):
+        """Remove a session request once the sender has handled it"""
+        raise NotImplementedError
+
+    def cleanup_room(self, room_id):
+        raise NotImplementedError
+
+    def collect_garbage(self, ttl=SIGNALING_ROOM_TTL, dry_run=False):
+        """
+        Remove rooms created more than ttl seconds ago and older ICE
+        candidates; returns a report (with dry_run, only the report)
+        """
+        raise NotImplementedError
+
+
+class LocalSignaling(SignalingBackend):
+    """
+    In-memory rooms. Listeners see the current state as soon as they
+    subscribe (like a Firestore snapshot listener) and every change after.
+    subscribe() additionally reports all events, which app.py uses to
+    relay them to Socket.IO clients.
+    ICE candidates get a sequence number unique across all rooms, which is
+    the cursor consumers resume from.
+    """
+    def __init__(self):
+        super().__init__()
+        self.rooms = {}
+        self._seq = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def _room(self, room_id):
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = {
+                'created_at': time.time(),
+                'status': 'waiting',
+                'offer': None,
+                'answer': None,
+                'ice_candidates': [],
+                'sessions': []
+            }
+        return room
+
+    def subscribe(self, callback, room_id=None, event=None):
+        """
+        Call callback(room_id, event, data) for every 'offer', 'answer',
+        'ice_candidate' and 'session' event (optionally only for one room/event)
+        """
+        with self._lock:
+            self._listeners.append((room_id, event, callback))
+
+    def _notify(self, room_id, event, data):
+        for listener_room, listener_event, callback in list(self._listeners):
+            if listener_room in (None, room_id) and listener_event in (None, event):
+                try:
+                    callback(room_id, event, data)
+                except Exception as e:
+                    logger.error(f"Signaling listener failed: {e}")
+
+    def create_room(self, room_id):
+        with self._lock:
+            # A new room: requests left from an earlier sender run go with the old one
+            self.rooms.pop(room_id, None)
+            self._room(room_id)
+        logger.info(f"Room created: {room_id}")
+        return True
+
+    def _send_description(self, room_id, kind, sdp, device_id):
+        description = {'sdp': sdp, 'type': kind, 'from': device_id,
+                       'timestamp': time.time(), 'version': description_version()}
+        with self._lock:
+            room = self._room(room_id)
+            room[kind] = description
+            room['status'] = f'{kind}_sent'
+        self._notify(room_id, kind, description)
+        logger.info(f"{kind.capitalize()} sent to room: {room_id}")
+        return True
+
+    def send_offer(self, room_id, offer_sdp, device_id):
+        return self._send_description(room_id, 'offer', offer_sdp, device_id)
+
+    def send_answer(self, room_id, answer_sdp, device_id):
+        return self._send_description(room_id, 'answer', answer_sdp, device_id)
+
+    def add_ice_candidate(self, room_id, candidate, device_id):
+        return self.add_ice_candidates(room_id, [candidate], device_id)
+
+    def add_ice_candidates(self, room_id, candidates, device_id):
+        with self._lock:
+            entries = []
+            for candidate in candidates:
+                self._seq += 1
+                entries.append({'candidate': candidate, 'from': device_id,
+                                'timestamp': time.time(), 'seq': self._seq})
+            self._room(room_id)['ice_candidates'].extend(entries)
+        for entry in entries:
+            self._notify(room_id, 'ice_candidate', entry)
+        return True
+
+    def get_offer(self, room_id):
+        room = self.rooms.get(room_id)
+        self.reads += 1
+        return room['offer'] if room else None
+
+    def get_answer(self, room_id):
+        room = self.rooms.get(room_id)
+        self.reads += 1
+        return room['answer'] if room else None
+
+    def entries_after(self, room_id, after=0):
+        """ICE entries of a room with a sequence number above after"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return []
+        with self._lock:
+            entries = room['ice_candidates']
+            # Sequence numbers are increasing, so only the tail is scanned
+            start = len(entries)
+            while start > 0 and entries[start - 1]['seq'] > after:
+                start -= 1
+            return entries[start:]
+
+    def get_ice_candidates(self, room_id, device_id, incremental=True):
+        key = (room_id, device_id)
+        entries = self.entries_after(room_id, self._ice_cursors.get(key, 0) if incremental else 0)
+        self.reads += len(entries)
+        if entries and incremental:
+            self._ice_cursors[key] = entries[-1]['seq']
+        return [normalize_candidate(entry) for entry in entries if entry['from'] != device_id]
+
+    def get_room_status(self, room_id):
+        room = self.rooms.get(room_id)
+        self.reads += 1
+        return room['status'] if room else None
+
+    def _listen_for_description(self, room_id, kind, callback):
+        def on_event(room_id, event, data):
+            self._deliver_description(room_id, kind, data, callback)
+        with self._lock:
+            self._listeners.append((room_id, kind, on_event))
+            current = self.rooms.get(room_id, {}).get(kind)
+        if current:
+            self.reads += 1
+            on_event(room_id, kind, current)
+        logger.info(f"Listening for {kind} on room: {room_id}")
+
+    def listen_for_offer(self, room_id, callback):
+        self._listen_for_description(room_id, 'offer', callback)
+
+    def listen_for_answer(self, room_id, callback):
+        self._listen_for_description(room_id, 'answer', callback)
+
+    def listen_for_ice_candidates(self, room_id, device_id, callback):
+        key = (room_id, device_id)
+
+        def on_event(room_id, event, entry):
+            if entry['seq'] <= self._ice_cursors.get(key, 0):
+                self.duplicates += 1
+                return
+            self._ice_cursors[key] = entry['seq']
+            if entry['from'] != device_id:
+                callback(normalize_candidate(entry))
+        with self._lock:
+            self._listeners.append((room_id, 'ice_candidate', on_event))
+        # Replay only what this consumer has not seen yet
+        existing = self.entries_after(room_id, self._ice_cursors.get(key, 0))
+        self.reads += len(existing)
+        for entry in existing:
+            on_event(room_id, 'ice_candidate', entry)
+        logger.info(f"Listening for ICE candidates on room: {room_id}")
+
+    def join_session(self, room_id, session_id, device_id):
+        session = {'session': session_id, 'from': device_id, 'timestamp': time.time()}
+        with self._lock:
+            self._room(room_id)['sessions'].append(session)
+        self._notify(room_id, 'session', session)
+        logger.info(f"Session {session_id} requested in room: {room_id}")
+        return True
+
+    def listen_for_sessions(self, room_id, callback):
+        def on_event(room_id, event, session):
+            callback(session)
+        with self._lock:
+            self._listeners.append((room_id, 'session', on_event))
+            room = self.rooms.get(room_id)
+            existing = list(room['sessions']) if room else []
+        self.reads += len(existing)
+        for session in existing:
+            callback(session)
+        logger.info(f"Listening for sessions on room: {room_id}")
+
+    def delete_session(self, room_id, session_id):
+        with self._lock:
+            room = self.rooms.get(room_id)
+            if room is not None:
+                room['sessions'] = [session for session in room['sessions']
+                                    if session['session'] != session_id]
+        return True
+
+    def cleanup_room(self, room_id):
+        with self._lock:
+            self.rooms.pop(room_id, None)
+            # Room-specific listeners go with the room; global ones stay
+            self._listeners = [listener for listener in self._listeners
+                               if listener[0] != room_id]
+        self._forget_room(room_id)
+        logger.info(f"Room cleaned up: {room_id}")
+        return True
+
+    def collect_garbage(self, ttl=SIGNALING_ROOM_TTL, dry_run=False):
+        start = time.monotonic()
+        cutoff = time.time() - ttl
+        with self._lock:
+            expired = [room_id for room_id, room in self.rooms.items()
+                       if room['created_at'] < cutoff]
+            candidates = sum(
+                len(room['ice_candidates']) if room_id in expired else
+                sum(1 for entry in room['ice_candidates'] if entry['timestamp'] < cutoff)
+                for room_id, room in self.rooms.items())
+            sessions = sum(len(self.rooms[room_id]['sessions']) for room_id in expired)
+            if not dry_run:
+                for room in self.rooms.values():
+                    room['ice_candidates'] = [entry for entry in room['ice_candidates']
+                                              if entry['timestamp'] >= cutoff]
+        if not dry_run:
+            for room_id in expired:
+                self.cleanup_room(room_id)
+        return {
+            'dry_run': dry_run,
+            'rooms': len(expired),
+            'candidates': candidates,
+            'sessions': sessions,
+            'seconds': round(time.monotonic() - start, 3)
+        }
+
+
+def run_garbage_collector(signaling, interval=SIGNALING_GC_INTERVAL, ttl=SIGNALING_ROOM_TTL,
+                          sleep=time.sleep):
+    """Expire old rooms every interval seconds; run as a background task"""
+    while True:
+        sleep(interval)
+        try:
+            report = signaling.collect_garbage(ttl)
+            if report['rooms'] or report['candidates'] or report['sessions']:
+                logger.info(f"Signaling garbage collected: {report}")
+        except Exception as e:
+            logger.error(f"Signaling garbage collection failed: {e}")
+
+
+def create_signaling(name=SIGNALING_BACKEND, firebase_config_path=None,
+                     server_url=SIGNALING_SERVER_URL):
+    """
+    Build the backend selected by SIGNALING_BACKEND:
+    'firebase' (Firestore), 'local' (in-process, in-memory) or
+    'socketio' (the dashboard's LocalSignaling over Socket.IO)
+    """
+    if name == 'firebase':
+        from firebase_signalling import FirebaseSignaling
+        return FirebaseSignaling(firebase_config_path)
+    if name == 'local':
+        return LocalSignaling()
+    if name == 'socketio':
+        from socketio_signaling import SocketIOSignaling
+        return SocketIOSignaling(server_url)
+    raise ValueError(f"Unknown signaling backend: {name}")
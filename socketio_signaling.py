@@ -0,0 +1,151 @@
+"""
+Socket.IO signaling client
+Talks to the LocalSignaling rooms served by the dashboard (app.py) on
+SIGNALING_NAMESPACE, so a sender on the same LAN negotiates without any
+WAN round trips
+"""
+
+import logging
+
+import socketio
+
+from signaling_backend import SignalingBackend, normalize_candidate
+from webrtc_config import *
+
+logger = logging.getLogger(__name__)
+
+
+class SocketIOSignaling(SignalingBackend):
+    """
+    Blocking client; requests wait for the server's acknowledgement and
+    listener callbacks run on the Socket.IO client thread
+    """
+    def __init__(self, server_url=SIGNALING_SERVER_URL, namespace=SIGNALING_NAMESPACE,
+                 timeout=SIGNALING_TIMEOUT):
+        super().__init__()
+        self.namespace = namespace
+        self.timeout = timeout
+        self._listeners = {'offer': [], 'answer': [], 'ice_candidate': [], 'session': []}
+        self._joins = []
+        self.sio = socketio.Client(reconnection=True)
+        self.sio.on('connect', self._rejoin, namespace=namespace)
+        for event in self._listeners:
+            self.sio.on(event, self._make_handler(event), namespace=namespace)
+        self.sio.connect(server_url, namespaces=[namespace], wait_timeout=timeout)
+        logger.info(f"Connected to signaling server: {server_url}{namespace}")
+
+    def _call(self, event, data):
+        try:
+            return self.sio.call(event, data, namespace=self.namespace, timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"Signaling request '{event}' failed: {e}")
+            return None
+
+    def _make_handler(self, event):
+        def handler(message):
+            for room_id, callback in list(self._listeners[event]):
+                if message.get('room') == room_id:
+                    self.reads += 1
+                    callback(message['data'])
+        return handler
+
+    def _join_message(self, join):
+        room_id, event, device_id = join
+        message = {'room': room_id, 'event': event, 'device': device_id}
+        if event == 'ice_candidate':
+            message['after'] = self._ice_cursors.get((room_id, device_id), 0)
+        return message
+
+    def _join(self, room_id, event, device_id=None):
+        join = (room_id, event, device_id)
+        self._joins.append(join)
+        self._call('join', self._join_message(join))
+
+    def _rejoin(self):
+        # Room membership does not survive a reconnect; the server replays
+        # the room state on every join (ICE only after our cursor)
+        for join in self._joins:
+            self.sio.emit('join', self._join_message(join), namespace=self.namespace)
+
+    def create_room(self, room_id):
+        return bool(self._call('create_room', {'room': room_id}))
+
+    def send_offer(self, room_id, offer_sdp, device_id):
+        return bool(self._call('send_offer', {'room': room_id, 'sdp': offer_sdp, 'from': device_id}))
+
+    def send_answer(self, room_id, answer_sdp, device_id):
+        return bool(self._call('send_answer', {'room': room_id, 'sdp': answer_sdp, 'from': device_id}))
+
+    def add_ice_candidate(self, room_id, candidate, device_id):
+        return self.add_ice_candidates(room_id, [candidate], device_id)
+
+    def add_ice_candidates(self, room_id, candidates, device_id):
+        return bool(self._call('add_ice_candidates',
+                               {'room': room_id, 'candidates': candidates, 'from': device_id}))
+
+    def _get_room(self, room_id):
+        return self._call('get_room', {'room': room_id}) or {}
+
+    def get_offer(self, room_id):
+        return self._get_room(room_id).get('offer')
+
+    def get_answer(self, room_id):
+        return self._get_room(room_id).get('answer')
+
+    def get_ice_candidates(self, room_id, device_id, incremental=True):
+        key = (room_id, device_id)
+        after = self._ice_cursors.get(key, 0) if incremental else 0
+        entries = self._call('get_ice_candidates', {'room': room_id, 'after': after}) or []
+        self.reads += len(entries)
+        if entries and incremental:
+            self._ice_cursors[key] = max(self._ice_cursors.get(key, 0), entries[-1]['seq'])
+        return [normalize_candidate(entry) for entry in entries if entry['from'] != device_id]
+
+    def get_room_status(self, room_id):
+        return self._get_room(room_id).get('status')
+
+    def _listen_for_description(self, room_id, kind, callback):
+        def on_description(description):
+            self._deliver_description(room_id, kind, description, callback)
+        self._listeners[kind].append((room_id, on_description))
+        self._join(room_id, kind)
+
+    def listen_for_offer(self, room_id, callback):
+        self._listen_for_description(room_id, 'offer', callback)
+
+    def listen_for_answer(self, room_id, callback):
+        self._listen_for_description(room_id, 'answer', callback)
+
+    def listen_for_ice_candidates(self, room_id, device_id, callback):
+        key = (room_id, device_id)
+
+        def on_candidate(entry):
+            if entry['seq'] <= self._ice_cursors.get(key, 0):
+                self.duplicates += 1
+                return
+            self._ice_cursors[key] = entry['seq']
+            if entry['from'] != device_id:
+                callback(normalize_candidate(entry))
+        self._listeners['ice_candidate'].append((room_id, on_candidate))
+        self._join(room_id, 'ice_candidate', device_id)
+
+    def join_session(self, room_id, session_id, device_id):
+        return bool(self._call('join_session', {'room': room_id, 'session': session_id,
+                                                'from': device_id}))
+
+    def listen_for_sessions(self, room_id, callback):
+        self._listeners['session'].append((room_id, callback))
+        self._join(room_id, 'session')
+
+    def delete_session(self, room_id, session_id):
+        return bool(self._call('delete_session', {'room': room_id, 'session': session_id}))
+
+    def cleanup_room(self, room_id):
+        for listeners in self._listeners.values():
+            listeners[:] = [listener for listener in listeners if listener[0] != room_id]
+        self._joins = [join for join in self._joins if join[0] != room_id]
+        self._forget_room(room_id)
+        return bool(self._call('cleanup_room', {'room': room_id}))
+
+    def close(self):
+        self.sio.disconnect()
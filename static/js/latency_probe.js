@@ -0,0 +1,166 @@
+/**
+ * Glass-to-glass latency probe (instrumentation mode)
+ * Reads the capture-time code the sender stamps into the top-right corner
+ * of every frame (layout in latency_probe.py) and reports to the dashboard
+ * server when each frame was received and displayed, on the server's clock
+ */
+
+const LATENCY_GRID = 6;
+const LATENCY_CELLS_PER_WIDTH = 40;
+const LATENCY_CODE_BITS = 32;
+const LATENCY_REPORT_URL = '/metrics/latency';
+const LATENCY_REPORT_INTERVAL = 1000;  // ms
+const LATENCY_MAX_REPORTS = 300;  // per POST
+const LATENCY_CLOCK_SAMPLES = 10;
+
+class LatencyProbe {
+    /**
+     * path: 'webrtc' (a <video>) or 'mjpeg' (the /video_feed <img>)
+     */
+    constructor(path, element) {
+        this.path = path;
+        this.element = element;
+        this.canvas = document.createElement('canvas');
+        this.context = this.canvas.getContext('2d', { willReadFrequently: true });
+        this.lastCode = null;
+        this.reports = [];
+        this.clockSamples = [];  // [roundTrip, offset]
+        this.offset = 0;  // server clock - local clock, ms
+        this.timer = null;
+    }
+
+    start() {
+        if (this.path === 'webrtc' && 'requestVideoFrameCallback' in this.element) {
+            // Per decoded frame, with the packet receive time for WebRTC sources
+            const onFrame = (now, metadata) => {
+                this.sample(metadata.receiveTime, metadata.expectedDisplayTime);
+                this.element.requestVideoFrameCallback(onFrame);
+            };
+            this.element.requestVideoFrameCallback(onFrame);
+        } else {
+            // <img> (and browsers without rVFC): poll once per display frame
+            const onAnimationFrame = (now) => {
+                this.sample(undefined, now);
+                requestAnimationFrame(onAnimationFrame);
+            };
+            requestAnimationFrame(onAnimationFrame);
+        }
+        this.flush();
+        this.timer = setInterval(() => this.flush(), LATENCY_REPORT_INTERVAL);
+        console.log(`⏱️ Latency probe started (${this.path})`);
+    }
+
+    sourceWidth() {
+        return this.element.videoWidth || this.element.naturalWidth || 0;
+    }
+
+    readCode() {
+        const width = this.sourceWidth();
+        if (!width) {
+            return null;
+        }
+        const cell = Math.max(1, Math.floor(width / LATENCY_CELLS_PER_WIDTH));
+        const size = LATENCY_GRID * cell;
+        const x0 = width - (LATENCY_GRID + 1) * cell;
+        this.canvas.width = size;
+        this.canvas.height = size;
+        try {
+            this.context.drawImage(this.element, x0, cell, size, size, 0, 0, size, size);
+        } catch (error) {
+            return null;  // no frame yet
+        }
+        const pixels = this.context.getImageData(0, 0, size, size).data;
+
+        const bits = [];
+        for (let index = 0; index < LATENCY_GRID * LATENCY_GRID; index++) {
+            const row = Math.floor(index / LATENCY_GRID);
+            const col = index % LATENCY_GRID;
+            const offset = ((row * cell + (cell >> 1)) * size + col * cell + (cell >> 1)) * 4;
+            const luma = (pixels[offset] + pixels[offset + 1] + pixels[offset + 2]) / 3;
+            bits.push(luma > 127 ? 1 : 0);
+        }
+
+        // 32 code bits, then their population count mod 16
+        let code = 0;
+        let ones = 0;
+        for (let i = 0; i < LATENCY_CODE_BITS; i++) {
+            code = code * 2 + bits[i];
+            ones += bits[i];
+        }
+        let check = 0;
+        for (let i = LATENCY_CODE_BITS; i < bits.length; i++) {
+            check = check * 2 + bits[i];
+        }
+        return check === (ones & 15) ? code : null;
+    }
+
+    toServerTime(performanceTime) {
+        return performance.timeOrigin + performanceTime + this.offset;
+    }
+
+    sample(received, displayed) {
+        const code = this.readCode();
+        if (code === null || code === this.lastCode) {
+            return;
+        }
+        this.lastCode = code;
+        // Timestamps are meaningless on the server until the clock is synced
+        if (this.clockSamples.length && this.reports.length < LATENCY_MAX_REPORTS) {
+            this.reports.push({
+                code: code,
+                received: received === undefined ? null : this.toServerTime(received),
+                displayed: this.toServerTime(displayed)
+            });
+        }
+    }
+
+    updateClock(sentAt, receivedAt, serverTime) {
+        // NTP-style: trust the offset measured over the shortest round trip
+        this.clockSamples.push([receivedAt - sentAt, serverTime - (sentAt + receivedAt) / 2]);
+        if (this.clockSamples.length > LATENCY_CLOCK_SAMPLES) {
+            this.clockSamples.shift();
+        }
+        const best = this.clockSamples.reduce((a, b) => (b[0] < a[0] ? b : a));
+        this.offset = best[1];
+    }
+
+    async flush() {
+        const reports = this.reports;
+        this.reports = [];
+        const sentAt = Date.now();
+        try {
+            const response = await fetch(LATENCY_REPORT_URL, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ path: this.path, reports: reports })
+            });
+            const result = await response.json();
+            this.updateClock(sentAt, Date.now(), result.time);
+        } catch (error) {
+            console.error('❌ Latency report failed:', error);
+        }
+    }
+}
+
+// Probe both video paths when the server runs in instrumentation mode
+async function initLatencyProbes() {
+    try {
+        const response = await fetch(LATENCY_REPORT_URL);
+        const status = await response.json();
+        if (!status.enabled) {
+            return;
+        }
+        const video = document.getElementById('video-stream');
+        const image = document.getElementById('video-fallback');
+        if (video) {
+            new LatencyProbe('webrtc', video).start();
+        }
+        if (image) {
+            new LatencyProbe('mjpeg', image).start();
+        }
+    } catch (error) {
+        console.error('❌ Latency probe initialization failed:', error);
+    }
+}
+
+document.addEventListener('DOMContentLoaded', initLatencyProbes);
@@ -6,6 +6,33 @@ let isJoystickActive = false;
 let joystickPosition = { x: 0, y: 0 };
 let currentCommand = 'stop';
 
+// Binary control protocol (see control_protocol.py)
+const CONTROL_PROTOCOL_VERSION = 1;
+const CONTROL_MESSAGE_SIZE = 19;
+const FLAG_DRIVE = 0x01;
+const FLAG_SERVOS = 0x02;
+const COMMAND_VECTORS = {
+    forward: { x: 0, y: 100 },
+    backward: { x: 0, y: -100 },
+    left: { x: -100, y: 0 },
+    right: { x: 100, y: 0 },
+    stop: { x: 0, y: 0 }
+};
+
+// Latest control state; every message carries the full state
+const controlState = { seq: 0, x: 0, y: 0, servos: [90, 90, 90] };
+const controlLatency = { samples: 0, avgRtt: 0, lastRtt: 0 };
+
+// Input coalescing: at most one control update per animation frame
+let pendingControlFlags = 0;
+let controlFlushScheduled = false;
+const pendingHttpServos = new Set();
+const coalesceStats = { queued: 0, sent: 0, merged: 0 };
+
+// Resend a non-zero drive state regularly so the server's auto-stop
+// watchdog (AUTO_STOP_TIMEOUT) only fires when the dashboard goes away
+const DRIVE_KEEPALIVE_MS = 1000;
+
 // DOM Elements
 const controlButtons = document.querySelectorAll('.dpad-btn');
 const joystickArea = document.getElementById('joystick-area');
@@ -15,6 +42,17 @@ const joystickY = document.getElementById('joystick-y');
 const connectionStatus = document.getElementById('connection-status');
 const directionStatus = document.getElementById('direction-status');
 const controlMode = document.getElementById('control-mode');
+const signalStatus = document.getElementById('signal-status');
+const batteryStatus = document.getElementById('battery-status');
+const videoStatus = document.getElementById('video-status');
+
+// Server-pushed telemetry (see telemetry.py): latest value per key, redrawn
+// at most once per animation frame. Local input wins over the server's
+// view of the direction for LOCAL_INPUT_HOLD_MS.
+const telemetryState = {};
+let telemetryRenderScheduled = false;
+let lastLocalInputAt = 0;
+const LOCAL_INPUT_HOLD_MS = 500;
 
 // Socket.IO event handlers
 socket.on('connect', () => {
@@ -43,6 +81,112 @@ socket.on('joystick_response', (data) => {
     console.log('Joystick response:', data);
 });
 
+socket.on('telemetry', (batch) => {
+    Object.assign(telemetryState, batch.d);
+    // Acknowledge so the server can hold back batches when we fall behind
+    socket.emit('telemetry_ack', [batch.n, batch.seq]);
+    if (!telemetryRenderScheduled) {
+        telemetryRenderScheduled = true;
+        requestAnimationFrame(renderTelemetry);
+    }
+});
+
+function renderTelemetry() {
+    telemetryRenderScheduled = false;
+    const t = telemetryState;
+    
+    if (t.direction && performance.now() - lastLocalInputAt > LOCAL_INPUT_HOLD_MS
+            && !isJoystickActive && currentCommand === 'stop') {
+        directionStatus.textContent = t.direction;
+        if (t.direction !== 'STOP' && t.control_source) {
+            controlMode.textContent = `Remote (${t.control_source})`;
+        }
+    }
+    if (t.gsm) {
+        signalStatus.textContent = t.gsm.registered ? `📡 ${t.gsm.bars}/5` : '📡 No service';
+    } else if (t.link) {
+        signalStatus.textContent = `📡 ${t.link.clients} online`;
+    }
+    if (t.battery) {
+        batteryStatus.textContent = t.battery.low ? `🔋 <${t.battery.warning_level}%` : '🔋 OK';
+        batteryStatus.classList.toggle('status-disconnected', t.battery.low);
+    }
+    if (t.link) {
+        videoStatus.textContent = `📹 ${t.link.viewers} viewing`;
+    }
+}
+
+socket.on('control_ack', (data) => {
+    // Ack echoes our own timestamp, so the RTT needs no clock sync
+    const view = new DataView(data);
+    const rtt = performance.now() - view.getFloat64(4, true);
+    controlLatency.samples++;
+    controlLatency.lastRtt = rtt;
+    controlLatency.avgRtt += (rtt - controlLatency.avgRtt) / Math.min(controlLatency.samples, 50);
+});
+
+function sendControlState(flags) {
+    const buffer = new ArrayBuffer(CONTROL_MESSAGE_SIZE);
+    const view = new DataView(buffer);
+    
+    controlState.seq = (controlState.seq + 1) >>> 0;
+    view.setUint8(0, CONTROL_PROTOCOL_VERSION);
+    view.setUint32(1, controlState.seq, true);
+    view.setFloat64(5, performance.now(), true);
+    view.setInt8(13, controlState.x);
+    view.setInt8(14, controlState.y);
+    controlState.servos.forEach((angle, i) => view.setUint8(15 + i, angle));
+    view.setUint8(18, flags);
+    
+    lastLocalInputAt = performance.now();
+    socket.emit('control', buffer);
+}
+
+function queueControlState(flags) {
+    coalesceStats.queued++;
+    if (pendingControlFlags) {
+        coalesceStats.merged++;
+    }
+    pendingControlFlags |= flags;
+    
+    if (!controlFlushScheduled) {
+        controlFlushScheduled = true;
+        requestAnimationFrame(flushControlState);
+    }
+}
+
+function flushControlState() {
+    controlFlushScheduled = false;
+    const flags = pendingControlFlags;
+    pendingControlFlags = 0;
+    
+    if (socket.connected) {
+        if (flags) {
+            sendControlState(flags);
+            coalesceStats.sent++;
+        }
+        pendingHttpServos.clear();
+        return;
+    }
+    
+    // Socket down: fall back to HTTP, one request per changed servo
+    pendingHttpServos.forEach(servoId => {
+        sendServoCommandHttp(servoId, controlState.servos[servoId - 1]);
+        coalesceStats.sent++;
+    });
+    pendingHttpServos.clear();
+}
+
+setInterval(() => {
+    if (socket.connected) {
+        if (controlState.x !== 0 || controlState.y !== 0) {
+            queueControlState(FLAG_DRIVE);
+        }
+    } else if (currentCommand !== 'stop' && !isJoystickActive) {
+        sendCommandHttp(currentCommand);
+    }
+}, DRIVE_KEEPALIVE_MS);
+
 // Button control handlers
 controlButtons.forEach(button => {
     button.addEventListener('mousedown', () => handleButtonPress(button));
@@ -98,6 +242,18 @@ function handleButtonRelease(button) {
 }
 
 function sendCommand(command) {
+    const vector = COMMAND_VECTORS[command];
+    if (vector && socket.connected) {
+        controlState.x = vector.x;
+        controlState.y = vector.y;
+        queueControlState(FLAG_DRIVE);
+    } else {
+        sendCommandHttp(command);
+    }
+}
+
+function sendCommandHttp(command) {
+    lastLocalInputAt = performance.now();
     fetch('/control', {
         method: 'POST',
         headers: {
@@ -181,7 +337,7 @@ function moveJoystick(e) {
     joystickPosition = { x: normalizedX, y: normalizedY };
     
     // Send joystick data via socket
-    socket.emit('joystick_move', joystickPosition);
+    sendJoystickPosition(normalizedX, normalizedY);
     
     // Update direction status based on joystick position
     updateDirectionFromJoystick(normalizedX, normalizedY);
@@ -199,7 +355,7 @@ function stopJoystickControl(e) {
     joystickY.textContent = '0';
     
     // Send stop position
-    socket.emit('joystick_move', { x: 0, y: 0 });
+    sendJoystickPosition(0, 0);
     
     // Update status
     directionStatus.textContent = 'STOP';
@@ -211,6 +367,17 @@ function stopJoystickControl(e) {
     stopBtn.classList.add('active');
 }
 
+function sendJoystickPosition(x, y) {
+    if (socket.connected) {
+        controlState.x = x;
+        controlState.y = y;
+        queueControlState(FLAG_DRIVE);
+    } else {
+        lastLocalInputAt = performance.now();
+        socket.emit('joystick_move', { x: x, y: y });
+    }
+}
+
 function updateDirectionFromJoystick(x, y) {
     const threshold = 20; // Minimum value to register movement
     
@@ -331,6 +498,20 @@ function handleServoChange(e) {
 }
 
 function sendServoCommand(servoId, angle) {
+    const index = parseInt(servoId) - 1;
+    if (index < 0 || index >= controlState.servos.length) {
+        sendServoCommandHttp(servoId, angle);
+        return;
+    }
+    
+    controlState.servos[index] = angle;
+    if (!socket.connected) {
+        pendingHttpServos.add(index + 1);
+    }
+    queueControlState(FLAG_SERVOS);
+}
+
+function sendServoCommandHttp(servoId, angle) {
     fetch('/servo_control', {
         method: 'POST',
         headers: {
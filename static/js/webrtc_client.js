@@ -7,26 +7,22 @@
 // <script src="https://www.gstatic.com/firebasejs/10.7.1/firebase-app-compat.js"></script>
 // <script src="https://www.gstatic.com/firebasejs/10.7.1/firebase-firestore-compat.js"></script>
 
-class WebRTCClient {
+/**
+ * Firestore signaling: offer/answer on the room document, ICE candidates
+ * in its ice_candidates subcollection
+ */
+class FirebaseSignalingClient {
     constructor(firebaseConfig, roomId, deviceId) {
-        this.firebaseConfig = firebaseConfig;
         this.roomId = roomId;
         this.deviceId = deviceId;
-        this.pc = null;
         this.db = null;
-        this.remoteStream = null;
-        this.connected = false;
-        this.reconnectAttempts = 0;
-        this.maxReconnectAttempts = 3;
+        this.unsubscribers = {};
+        this.offerVersion = null;
         
-        this.initFirebase();
-    }
-    
-    initFirebase() {
         try {
             // Initialize Firebase
             if (!firebase.apps.length) {
-                firebase.initializeApp(this.firebaseConfig);
+                firebase.initializeApp(firebaseConfig);
             }
             this.db = firebase.firestore();
             console.log('✅ Firebase initialized');
@@ -35,60 +31,203 @@ class WebRTCClient {
         }
     }
     
+    roomRef() {
+        return this.db.collection('webrtc_signaling').doc(this.roomId);
+    }
+    
+    useSession(sessionId) {
+        // Fan-out: negotiate in our own session room of the sender's room
+        this.baseRoomId = this.roomId;
+        this.sessionId = sessionId;
+        this.roomId = `${this.baseRoomId}__${sessionId}`;
+    }
+    
+    async joinSession() {
+        await this.db.collection('webrtc_signaling').doc(this.baseRoomId)
+            .collection('sessions').doc(this.sessionId)
+            .set({
+                session: this.sessionId,
+                from: this.deviceId,
+                timestamp: firebase.firestore.FieldValue.serverTimestamp()
+            });
+    }
+    
+    listen(name, unsubscribe) {
+        // One listener per kind; restarting the client replaces it
+        if (this.unsubscribers[name]) {
+            this.unsubscribers[name]();
+        }
+        this.unsubscribers[name] = unsubscribe;
+    }
+    
+    onOffer(callback) {
+        // The snapshot fires on every room change; deliver each offer version once
+        this.listen('offer', this.roomRef().onSnapshot((snapshot) => {
+            const offer = snapshot.exists ? snapshot.data().offer : null;
+            if (offer && offer.version !== this.offerVersion) {
+                this.offerVersion = offer.version;
+                callback(offer);
+            }
+        }, (error) => {
+            console.error('❌ Error listening for offers:', error);
+        }));
+    }
+    
+    async sendAnswer(answer) {
+        await this.roomRef().update({
+            answer: {
+                sdp: answer.sdp,
+                type: answer.type,
+                from: this.deviceId,
+                version: Date.now() * 1000,
+                timestamp: firebase.firestore.FieldValue.serverTimestamp()
+            },
+            status: 'answer_sent'
+        });
+    }
+    
+    async sendIceCandidate(candidate) {
+        await this.roomRef().collection('ice_candidates').add({
+            candidate: candidate.candidate,
+            sdpMLineIndex: candidate.sdpMLineIndex,
+            sdpMid: candidate.sdpMid,
+            from: this.deviceId,
+            timestamp: firebase.firestore.FieldValue.serverTimestamp()
+        });
+    }
+    
+    onIceCandidate(callback) {
+        this.listen('ice', this.roomRef().collection('ice_candidates')
+            .where('from', '!=', this.deviceId)
+            .onSnapshot((snapshot) => {
+                snapshot.docChanges().forEach((change) => {
+                    if (change.type === 'added') {
+                        callback(normalizeCandidate(change.doc.data()));
+                    }
+                });
+            }, (error) => {
+                console.error('❌ Error listening for ICE candidates:', error);
+            }));
+    }
+}
+
+/**
+ * LAN signaling through the dashboard server's in-memory rooms
+ * (Socket.IO namespace, no WAN round trips)
+ */
+class SocketSignalingClient {
+    constructor(namespace, roomId, deviceId) {
+        this.roomId = roomId;
+        this.deviceId = deviceId;
+        this.callbacks = {};
+        this.joins = {};
+        this.offerVersion = null;
+        this.iceCursor = 0;
+        this.socket = io(namespace);
+        
+        this.socket.on('offer', (message) => this.dispatch('offer', message));
+        this.socket.on('ice_candidate', (message) => this.dispatch('ice_candidate', message));
+        // Room membership does not survive a reconnect; the server replays
+        // the room state on every join (ICE candidates after our cursor)
+        this.socket.on('connect', () => {
+            Object.keys(this.joins).forEach((event) => this.emitJoin(event));
+        });
+    }
+    
+    useSession(sessionId) {
+        // Fan-out: negotiate in our own session room of the sender's room
+        this.baseRoomId = this.roomId;
+        this.sessionId = sessionId;
+        this.roomId = `${this.baseRoomId}__${sessionId}`;
+    }
+    
+    async joinSession() {
+        this.socket.emit('join_session', { room: this.baseRoomId, session: this.sessionId, from: this.deviceId });
+    }
+    
+    dispatch(event, message) {
+        if (message.room === this.roomId && this.callbacks[event]) {
+            this.callbacks[event](message.data);
+        }
+    }
+    
+    emitJoin(event) {
+        this.socket.emit('join', { room: this.roomId, event: event, device: this.deviceId, after: this.iceCursor });
+    }
+    
+    join(event) {
+        this.joins[event] = true;
+        if (this.socket.connected) {
+            this.emitJoin(event);
+        }
+    }
+    
+    onOffer(callback) {
+        this.callbacks.offer = (offer) => {
+            if (offer.version !== this.offerVersion) {
+                this.offerVersion = offer.version;
+                callback(offer);
+            }
+        };
+        this.join('offer');
+    }
+    
+    async sendAnswer(answer) {
+        this.socket.emit('send_answer', { room: this.roomId, sdp: answer.sdp, from: this.deviceId });
+    }
+    
+    async sendIceCandidate(candidate) {
+        this.socket.emit('add_ice_candidates', {
+            room: this.roomId,
+            from: this.deviceId,
+            candidates: [{
+                candidate: candidate.candidate,
+                sdpMLineIndex: candidate.sdpMLineIndex,
+                sdpMid: candidate.sdpMid
+            }]
+        });
+    }
+    
+    onIceCandidate(callback) {
+        this.callbacks.ice_candidate = (entry) => {
+            if (entry.seq <= this.iceCursor) {
+                return;
+            }
+            this.iceCursor = entry.seq;
+            if (entry.from !== this.deviceId) {
+                callback(normalizeCandidate(entry));
+            }
+        };
+        this.join('ice_candidate');
+    }
+}
+
+// The sender nests candidate fields under 'candidate', the dashboard stores them flat
+function normalizeCandidate(data) {
+    if (data.candidate && typeof data.candidate === 'object') {
+        return data.candidate;
+    }
+    return { candidate: data.candidate, sdpMLineIndex: data.sdpMLineIndex, sdpMid: data.sdpMid };
+}
+
+class WebRTCClient {
+    constructor(signaling, roomId, deviceId) {
+        this.signaling = signaling;
+        this.roomId = roomId;
+        this.deviceId = deviceId;
+        this.pc = null;
+        this.remoteStream = null;
+        this.connected = false;
+        this.reconnectAttempts = 0;
+        this.maxReconnectAttempts = 3;
+    }
+    
     async start(videoElement) {
         try {
             console.log(`🚀 Starting WebRTC client for room: ${this.roomId}`);
             
-            // Create peer connection
-            this.pc = new RTCPeerConnection({
-                iceServers: [
-                    { urls: 'stun:stun.l.google.com:19302' },
-                    { urls: 'stun:stun1.l.google.com:19302' },
-                    { urls: 'stun:stun2.l.google.com:19302' }
-                ]
-            });
-            
-            // Handle incoming tracks
-            this.pc.ontrack = (event) => {
-                console.log('📹 Received remote track');
-                if (event.streams && event.streams[0]) {
-                    videoElement.srcObject = event.streams[0];
-                    this.remoteStream = event.streams[0];
-                    this.updateConnectionStatus('streaming');
-                }
-            };
-            
-            // Handle connection state changes
-            this.pc.onconnectionstatechange = () => {
-                console.log(`🔄 Connection state: ${this.pc.connectionState}`);
-                this.updateConnectionStatus(this.pc.connectionState);
-                
-                if (this.pc.connectionState === 'connected') {
-                    this.connected = true;
-                    this.reconnectAttempts = 0;
-                    console.log('✅ WebRTC connected!');
-                } else if (this.pc.connectionState === 'failed') {
-                    this.connected = false;
-                    console.error('❌ WebRTC connection failed');
-                    this.handleConnectionFailure();
-                } else if (this.pc.connectionState === 'disconnected') {
-                    this.connected = false;
-                    console.warn('⚠️ WebRTC disconnected');
-                }
-            };
-            
-            // Handle ICE candidates
-            this.pc.onicecandidate = (event) => {
-                if (event.candidate) {
-                    console.log('🧊 New ICE candidate');
-                    this.sendIceCandidate(event.candidate);
-                }
-            };
-            
-            // Handle ICE connection state
-            this.pc.oniceconnectionstatechange = () => {
-                console.log(`🧊 ICE connection state: ${this.pc.iceConnectionState}`);
-            };
+            this.videoElement = videoElement;
+            this.createPeerConnection();
             
             // Listen for offers from RPi
             this.listenForOffers();
@@ -104,20 +243,76 @@ class WebRTCClient {
         }
     }
     
-    listenForOffers() {
-        const roomRef = this.db.collection('webrtc_signaling').doc(this.roomId);
+    createPeerConnection() {
+        // Create peer connection
+        const pc = this.pc = new RTCPeerConnection({
+            iceServers: [
+                { urls: 'stun:stun.l.google.com:19302' },
+                { urls: 'stun:stun1.l.google.com:19302' },
+                { urls: 'stun:stun2.l.google.com:19302' }
+            ]
+        });
         
-        roomRef.onSnapshot(async (snapshot) => {
-            if (snapshot.exists) {
-                const data = snapshot.data();
-                
-                if (data.offer && !this.pc.currentRemoteDescription) {
-                    console.log('📨 Received offer from RPi');
-                    await this.handleOffer(data.offer);
-                }
+        // Handle incoming tracks
+        pc.ontrack = (event) => {
+            console.log('📹 Received remote track');
+            if (event.streams && event.streams[0]) {
+                this.videoElement.srcObject = event.streams[0];
+                this.remoteStream = event.streams[0];
+                this.updateConnectionStatus('streaming');
             }
-        }, (error) => {
-            console.error('❌ Error listening for offers:', error);
+        };
+        
+        // Handle connection state changes (ignoring replaced connections)
+        pc.onconnectionstatechange = () => {
+            if (pc !== this.pc) {
+                return;
+            }
+            console.log(`🔄 Connection state: ${pc.connectionState}`);
+            this.updateConnectionStatus(pc.connectionState);
+            
+            if (pc.connectionState === 'connected') {
+                this.connected = true;
+                this.reconnectAttempts = 0;
+                console.log('✅ WebRTC connected!');
+            } else if (pc.connectionState === 'failed') {
+                this.connected = false;
+                console.error('❌ WebRTC connection failed');
+                this.handleConnectionFailure();
+            } else if (pc.connectionState === 'disconnected') {
+                this.connected = false;
+                console.warn('⚠️ WebRTC disconnected');
+            }
+        };
+        
+        // Handle ICE candidates
+        pc.onicecandidate = (event) => {
+            if (event.candidate) {
+                console.log('🧊 New ICE candidate');
+                this.sendIceCandidate(event.candidate);
+            }
+        };
+        
+        // Handle ICE connection state
+        pc.oniceconnectionstatechange = () => {
+            console.log(`🧊 ICE connection state: ${pc.iceConnectionState}`);
+        };
+    }
+    
+    listenForOffers() {
+        this.signaling.onOffer(async (offer) => {
+            if (!this.pc) {
+                return;
+            }
+            if (this.pc.currentRemoteDescription) {
+                // A new offer version: the RPi is reconnecting with a fresh
+                // peer connection, so answer it with one too
+                console.log('🔄 New offer from RPi, renegotiating');
+                this.pc.close();
+                this.createPeerConnection();
+            }
+            console.log('📨 Received offer from RPi');
+            await this.handleOffer(offer);
         });
     }
     
@@ -138,7 +333,7 @@ class WebRTCClient {
             await this.pc.setLocalDescription(answer);
             console.log('✅ Local description set');
             
-            // Send answer to Firebase
+            // Send answer to the RPi
             await this.sendAnswer(answer);
             console.log('✅ Answer sent to RPi');
             
@@ -149,19 +344,8 @@ class WebRTCClient {
     
     async sendAnswer(answer) {
         try {
-            const roomRef = this.db.collection('webrtc_signaling').doc(this.roomId);
-            
-            await roomRef.update({
-                answer: {
-                    sdp: answer.sdp,
-                    type: answer.type,
-                    from: this.deviceId,
-                    timestamp: firebase.firestore.FieldValue.serverTimestamp()
-                },
-                status: 'answer_sent'
-            });
-            
-            console.log('📤 Answer uploaded to Firebase');
+            await this.signaling.sendAnswer(answer);
+            console.log('📤 Answer sent');
         } catch (error) {
             console.error('❌ Error sending answer:', error);
         }
@@ -169,18 +353,7 @@ class WebRTCClient {
     
     async sendIceCandidate(candidate) {
         try {
-            const iceRef = this.db.collection('webrtc_signaling')
-                .doc(this.roomId)
-                .collection('ice_candidates');
-            
-            await iceRef.add({
-                candidate: candidate.candidate,
-                sdpMLineIndex: candidate.sdpMLineIndex,
-                sdpMid: candidate.sdpMid,
-                from: this.deviceId,
-                timestamp: firebase.firestore.FieldValue.serverTimestamp()
-            });
-            
+            await this.signaling.sendIceCandidate(candidate);
             console.log('📤 ICE candidate sent');
         } catch (error) {
             console.error('❌ Error sending ICE candidate:', error);
@@ -188,34 +361,15 @@ class WebRTCClient {
     }
     
     listenForIceCandidates() {
-        const iceRef = this.db.collection('webrtc_signaling')
-            .doc(this.roomId)
-            .collection('ice_candidates');
-        
-        iceRef.where('from', '!=', this.deviceId)
-            .onSnapshot((snapshot) => {
-                snapshot.docChanges().forEach(async (change) => {
-                    if (change.type === 'added') {
-                        const data = change.doc.data();
-                        console.log('🧊 Received ICE candidate from RPi');
-                        
-                        try {
-                            const candidate = new RTCIceCandidate({
-                                candidate: data.candidate,
-                                sdpMLineIndex: data.sdpMLineIndex,
-                                sdpMid: data.sdpMid
-                            });
-                            
-                            await this.pc.addIceCandidate(candidate);
-                            console.log('✅ ICE candidate added');
-                        } catch (error) {
-                            console.error('❌ Error adding ICE candidate:', error);
-                        }
-                    }
-                });
-            }, (error) => {
-                console.error('❌ Error listening for ICE candidates:', error);
-            });
+        this.signaling.onIceCandidate(async (data) => {
+            console.log('🧊 Received ICE candidate from RPi');
+            try {
+                await this.pc.addIceCandidate(new RTCIceCandidate(data));
+                console.log('✅ ICE candidate added');
+            } catch (error) {
+                console.error('❌ Error adding ICE candidate:', error);
+            }
+        });
     }
     
     updateConnectionStatus(status) {
@@ -295,20 +449,28 @@ async function initWebRTC() {
     try {
         console.log('🎬 Initializing WebRTC...');
         
-        // Firebase configuration
-        const firebaseConfig = {
-            apiKey: "YOUR_API_KEY",
-            authDomain: "YOUR_PROJECT_ID.firebaseapp.com",
-            projectId: "YOUR_PROJECT_ID",
-            storageBucket: "YOUR_PROJECT_ID.appspot.com",
-            messagingSenderId: "YOUR_MESSAGING_SENDER_ID",
-            appId: "YOUR_APP_ID"
-        };
+        // Signaling backend and room come from the dashboard server; while
+        // its signaling backend is still starting, ask again
+        let config = await (await fetch('/webrtc/config')).json();
+        while (config.signaling === 'pending' || config.signaling === 'starting') {
+            await new Promise(resolve => setTimeout(resolve, 500));
+            config = await (await fetch('/webrtc/config')).json();
+        }
         
-        const roomId = 'rpi_car_stream';
-        const deviceId = 'dashboard_viewer';
+        const roomId = config.roomId;
+        const deviceId = config.deviceId;
         
-        webrtcClient = new WebRTCClient(firebaseConfig, roomId, deviceId);
+        const signaling = config.signaling === 'local'
+            ? new SocketSignalingClient(config.signalingNamespace, roomId, deviceId)
+            : new FirebaseSignalingClient(config.firebase, roomId, deviceId);
+        console.log(`📡 Using ${config.signaling} signaling`);
+        
+        // Fan-out sender or relay: ask for a peer connection of our own
+        if (config.fanout) {
+            signaling.useSession(Math.random().toString(36).slice(2, 10));
+        }
+        
+        webrtcClient = new WebRTCClient(signaling, signaling.roomId, deviceId);
         
         const videoElement = document.getElementById('video-stream');
         if (videoElement) {
@@ -317,6 +479,11 @@ async function initWebRTC() {
             videoElement.playsInline = true;
             
             await webrtcClient.start(videoElement);
+            if (config.fanout) {
+                // Listeners are up, so the session's offer cannot be missed
+                await signaling.joinSession();
+                console.log(`👥 Joined viewer session ${signaling.sessionId}`);
+            }
             console.log('✅ WebRTC initialized successfully');
         }
         
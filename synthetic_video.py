@@ -0,0 +1,92 @@
+"""
+Synthetic test-pattern source for USE_TEST_VIDEO mode
+The gradient background is built once per resolution, each frame only
+redraws the moving circle and text into a reused output buffer
+"""
+
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+import config
+
+
+class TestPatternRenderer:
+    """
+    Render the dashboard test pattern at a fixed resolution.
+    target_fps paces render() on a monotonic clock; 0/None renders as fast as possible.
+    """
+    # (width, height) -> read-only background shared by every renderer
+    _backgrounds = {}
+
+    def __init__(self, width=config.VIDEO_WIDTH, height=config.VIDEO_HEIGHT,
+                 target_fps=config.TEST_VIDEO_FPS):
+        self.width = width
+        self.height = height
+        self.target_fps = target_fps
+        self.background = self.get_background(width, height)
+        self.output = np.empty_like(self.background)
+        self.frame_count = 0
+        self._next_deadline = None
+
+        # Circle orbit scaled from the original 640x480 layout
+        self.radius = max(1, int(50 * width / 640))
+        self.orbit_x = 200 * width / 640
+        self.orbit_y = 100 * height / 480
+
+    @classmethod
+    def get_background(cls, width, height):
+        """Return the cached gradient background for a resolution"""
+        key = (width, height)
+        background = cls._backgrounds.get(key)
+        if background is None:
+            rows = np.arange(height, dtype=np.uint16)[:, np.newaxis]
+            background = np.empty((height, width, 3), dtype=np.uint8)
+            background[:, :, 0] = (rows // 2) % 256
+            background[:, :, 1] = (rows // 3) % 255
+            background[:, :, 2] = 150
+            background.flags.writeable = False
+            cls._backgrounds[key] = background
+        return background
+
+    def pace(self):
+        """Sleep until the next frame slot; skip ahead instead of bursting when late"""
+        if not self.target_fps:
+            return
+
+        interval = 1.0 / self.target_fps
+        now = time.monotonic()
+        if self._next_deadline is None or now - self._next_deadline > interval:
+            self._next_deadline = now
+        elif self._next_deadline > now:
+            time.sleep(self._next_deadline - now)
+        self._next_deadline += interval
+
+    def render(self):
+        """
+        Draw the next frame into the shared output buffer and return it.
+        The buffer is overwritten on the next call.
+        """
+        self.pace()
+        self.frame_count += 1
+
+        frame = self.output
+        np.copyto(frame, self.background)
+
+        # Add moving circle
+        center_x = int(self.width / 2 + self.orbit_x * np.sin(self.frame_count * 0.05))
+        center_y = int(self.height / 2 + self.orbit_y * np.cos(self.frame_count * 0.05))
+        cv2.circle(frame, (center_x, center_y), self.radius, (0, 255, 255), -1)
+
+        # Add timestamp
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cv2.putText(frame, "Test Video Feed", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(frame, timestamp, (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, f"Frame: {self.frame_count}", (10, 90),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+        return frame
@@ -0,0 +1,193 @@
+"""
+Telemetry bus and Socket.IO push
+Sources publish key/value state at their own rates (or on change); the bus
+keeps the latest value and a change sequence number per key. Every tick the
+broadcaster sends the keys changed since the previous tick as one batch to
+a room holding every up-to-date dashboard, so the packet is encoded once
+and traffic follows the rate of change, not sources x clients.
+
+Clients acknowledge batches. One that falls more than max_in_flight batches
+behind leaves the room and, once it has acknowledged what it was sent, gets
+a single merged delta from its last acknowledged sequence and rejoins.
+Values are absolute, so applying one twice is harmless.
+"""
+
+import logging
+import threading
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryBus:
+    """
+    Latest value per key plus the sequence number of its last change.
+    Publishing an unchanged value is a dict lookup and a compare.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._versions = {}
+        self.seq = 0
+        self.published = 0
+
+    def publish(self, key, value):
+        """Set one key; returns True if the value changed"""
+        with self._lock:
+            self.published += 1
+            if key in self._values and self._values[key] == value:
+                return False
+            self.seq += 1
+            self._values[key] = value
+            self._versions[key] = self.seq
+            return True
+
+    def update(self, values):
+        """Publish several keys under one lock hold"""
+        with self._lock:
+            for key, value in values.items():
+                self.published += 1
+                if key in self._values and self._values[key] == value:
+                    continue
+                self.seq += 1
+                self._values[key] = value
+                self._versions[key] = self.seq
+
+    def changes_since(self, seq):
+        """({key: value} changed after seq, current seq)"""
+        with self._lock:
+            if seq >= self.seq:
+                return {}, self.seq
+            return {key: self._values[key] for key, version in self._versions.items()
+                    if version > seq}, self.seq
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def poll(self, read, interval, sleep):
+        """Publish read()'s dict every interval seconds (run as a background task)"""
+        while True:
+            try:
+                self.update(read())
+            except Exception as e:
+                logger.warning(f"Telemetry source {getattr(read, '__name__', read)} failed: {e}")
+            sleep(interval)
+
+    def stats(self):
+        return {'keys': len(self._values), 'seq': self.seq, 'published': self.published}
+
+
+class TelemetryClient:
+    __slots__ = ('live', 'joined', 'sent', 'acked', 'acked_seq')
+
+    def __init__(self):
+        self.live = False
+        self.joined = 0  # batch number of its last catch-up
+        self.sent = 0  # last batch number sent to this client
+        self.acked = 0  # last batch number it acknowledged
+        self.acked_seq = 0  # bus sequence it has applied
+
+
+class TelemetryBroadcaster:
+    """
+    Ticks the bus into 'telemetry' events. socketio is the Flask-SocketIO
+    instance; room membership goes through its python-socketio server so
+    ticks need no request context.
+    """
+    EVENT = 'telemetry'
+
+    def __init__(self, bus, socketio, interval=config.TELEMETRY_INTERVAL,
+                 max_in_flight=config.TELEMETRY_MAX_IN_FLIGHT, room='telemetry', namespace='/'):
+        self.bus = bus
+        self.socketio = socketio
+        self.interval = interval
+        self.max_in_flight = max_in_flight
+        self.room = room
+        self.namespace = namespace
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.batch = 0
+        self.sent_seq = 0
+        self.catchups = 0
+        self.lagged = 0
+
+    def add_client(self, sid):
+        """New clients start out of the room; the next tick sends them the full state"""
+        with self._lock:
+            self._clients[sid] = TelemetryClient()
+
+    def remove_client(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def ack(self, sid, batch, seq):
+        try:
+            batch, seq = int(batch), int(seq)
+        except (TypeError, ValueError):
+            return
+        # Under the lock: tick() reads acked/acked_seq as a pair
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is not None and batch > client.acked:
+                client.acked = batch
+                client.acked_seq = seq
+
+    def tick(self):
+        changes, seq = self.bus.changes_since(self.sent_seq)
+        if changes:
+            self.batch += 1
+            self.socketio.emit(self.EVENT, {'n': self.batch, 'seq': seq, 'd': changes},
+                               to=self.room, namespace=self.namespace)
+            self.sent_seq = seq
+
+        leaving, joining = [], []
+        with self._lock:
+            for sid, client in self._clients.items():
+                if client.live:
+                    client.sent = self.batch
+                    if self.batch - max(client.acked, client.joined) > self.max_in_flight:
+                        client.live = False
+                        leaving.append(sid)
+                elif client.acked >= client.sent:
+                    # Nothing in flight: everything it missed in one message
+                    client.live = True
+                    client.joined = client.sent = self.batch
+                    joining.append((sid, client.acked_seq))
+
+        server = self.socketio.server
+        for sid in leaving:
+            server.leave_room(sid, self.room, namespace=self.namespace)
+        self.lagged += len(leaving)
+        for sid, acked_seq in joining:
+            changes, seq = self.bus.changes_since(acked_seq)
+            self.socketio.emit(self.EVENT, {'n': self.batch, 'seq': seq, 'd': changes},
+                               to=sid, namespace=self.namespace)
+            server.enter_room(sid, self.room, namespace=self.namespace)
+        self.catchups += len(joining)
+
+    def run(self, sleep):
+        """Broadcast loop (run as a background task)"""
+        while True:
+            sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.warning(f"Telemetry tick failed: {e}")
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def stats(self):
+        with self._lock:
+            lagging = sum(1 for client in self._clients.values() if not client.live)
+        return {
+            'clients': len(self._clients),
+            'lagging': lagging,
+            'batches': self.batch,
+            'catchups': self.catchups,
+            'lagged': self.lagged,
+            'bus': self.bus.stats()
+        }
@@ -0,0 +1,217 @@
+"""
+In-memory stand-in for the slice of the Firestore client FirebaseSignaling
+uses. Every document handed back (get, stream, snapshot) counts as one
+billed read in `reads`; SERVER_TIMESTAMP becomes a strictly increasing
+server time so ordering by timestamp is deterministic.
+"""
+
+import itertools
+from datetime import datetime, timedelta, timezone
+
+
+class _ChangeType:
+    def __init__(self, name):
+        self.name = name
+
+
+ADDED = _ChangeType('ADDED')
+
+
+class Change:
+    def __init__(self, document):
+        self.type = ADDED
+        self.document = document
+
+
+class Snapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = dict(data) if data is not None else None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field)
+
+
+class Query:
+    def __init__(self, collection, filters=(), order=None, after=None):
+        self.collection = collection
+        self.filters = filters
+        self.order = order
+        self.after = after
+
+    def where(self, field, op, value):
+        return Query(self.collection, self.filters + ((field, op, value),), self.order, self.after)
+
+    def order_by(self, field):
+        return Query(self.collection, self.filters, field, self.after)
+
+    def start_after(self, snapshot):
+        return Query(self.collection, self.filters, self.order, snapshot)
+
+    def select(self, fields):
+        return self
+
+    def _matches(self, data):
+        for field, op, value in self.filters:
+            if op != '<':
+                raise NotImplementedError(op)
+            if data.get(field) is None or not data[field] < value:
+                return False
+        if self.after is not None:
+            return data[self.order] > self.after.get(self.order)
+        return True
+
+    def _documents(self):
+        documents = [(ref, data) for ref, data in self.collection._documents() if self._matches(data)]
+        if self.order is not None:
+            documents.sort(key=lambda document: document[1][self.order])
+        return documents
+
+    def stream(self):
+        for ref, data in self._documents():
+            self.collection.db.reads += 1
+            yield Snapshot(ref, data)
+
+    def on_snapshot(self, callback):
+        self.collection.db._query_listeners.append((self, callback, set()))
+        self.collection.db._fire_query(self, callback, set())
+
+
+class CollectionReference(Query):
+    def __init__(self, db, path, parent=None):
+        super().__init__(self)
+        self.db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+        self.parent = parent
+
+    def document(self, document_id=None):
+        if document_id is None:
+            document_id = f'auto{next(self.db._ids)}'
+        return DocumentReference(self.db, f'{self.path}/{document_id}', self)
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def list_documents(self):
+        prefix = self.path + '/'
+        ids = {path[len(prefix):].split('/')[0] for path in self.db.docs if path.startswith(prefix)}
+        return [self.document(document_id) for document_id in sorted(ids)]
+
+    def _documents(self):
+        prefix = self.path + '/'
+        return [(DocumentReference(self.db, path, self), data) for path, data in self.db.docs.items()
+                if path.startswith(prefix) and '/' not in path[len(prefix):]]
+
+
+class DocumentReference:
+    def __init__(self, db, path, parent):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+        self.parent = parent
+
+    def collection(self, name):
+        return CollectionReference(self.db, f'{self.path}/{name}', self)
+
+    def set(self, data):
+        self.db._write(self, self.db._resolve(data))
+
+    def update(self, data):
+        if self.path not in self.db.docs:
+            raise KeyError(f'No document to update: {self.path}')
+        self.db._write(self, dict(self.db.docs[self.path], **self.db._resolve(data)))
+
+    def delete(self):
+        self.db.docs.pop(self.path, None)
+
+    def get(self):
+        self.db.reads += 1
+        return Snapshot(self, self.db.docs.get(self.path))
+
+    def on_snapshot(self, callback):
+        self.db._document_listeners.append((self.path, callback))
+        self.db.reads += 1
+        callback([Snapshot(self, self.db.docs.get(self.path))], [], None)
+
+
+class WriteBatch:
+    def __init__(self, db):
+        self.db = db
+        self.operations = []
+
+    def set(self, ref, data):
+        self.operations.append(lambda: ref.set(data))
+
+    def delete(self, ref):
+        self.operations.append(ref.delete)
+
+    def commit(self):
+        self.db.commits += 1
+        for operation in self.operations:
+            operation()
+
+
+class FakeFirestore:
+    def __init__(self, server_timestamp):
+        self.server_timestamp = server_timestamp
+        self.docs = {}
+        self.reads = 0
+        self.commits = 0
+        self._ids = itertools.count(1)
+        self._clock = itertools.count(1)
+        self._document_listeners = []
+        self._query_listeners = []
+
+    def now(self):
+        """Server time: one millisecond later on every call"""
+        return datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=next(self._clock))
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def _resolve(self, data):
+        resolved = {}
+        for key, value in data.items():
+            if value is self.server_timestamp:
+                value = self.now()
+            elif isinstance(value, dict):
+                value = self._resolve(value)
+            resolved[key] = value
+        return resolved
+
+    def _write(self, ref, data):
+        self.docs[ref.path] = data
+        for path, callback in list(self._document_listeners):
+            if path == ref.path:
+                self.reads += 1
+                callback([Snapshot(ref, data)], [], None)
+        for query, callback, delivered in list(self._query_listeners):
+            if ref.parent.path == query.collection.path:
+                self._fire_query(query, callback, delivered)
+
+    def _fire_query(self, query, callback, delivered):
+        changes = []
+        for ref, data in query._documents():
+            if ref.path not in delivered:
+                delivered.add(ref.path)
+                self.reads += 1
+                changes.append(Change(Snapshot(ref, data)))
+        if changes:
+            callback([change.document for change in changes], changes, None)
+
+    def redeliver(self):
+        """Resend every listened document as ADDED, as a listener does after its stream reconnects"""
+        for query, callback, delivered in list(self._query_listeners):
+            delivered.clear()
+            self._fire_query(query, callback, delivered)
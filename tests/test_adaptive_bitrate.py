@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+LADDER = [{'bitrate': 250000}, {'bitrate': 500000}, {'bitrate': 1000000}]
+BAD = {'loss': 0.2, 'rtt': 0.05}
+SLOW = {'loss': 0.0, 'rtt': 0.5}
+GOOD = {'loss': 0.0, 'rtt': 0.05}
+MIDDLE = {'loss': 0.05, 'rtt': 0.05}
+
+
+@pytest.fixture
+def abr(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'RPi'))
+    import adaptive_bitrate
+    monkeypatch.setattr(adaptive_bitrate, 'ABR_DOWN_SAMPLES', 2)
+    monkeypatch.setattr(adaptive_bitrate, 'ABR_UP_SAMPLES', 3)
+    return adaptive_bitrate
+
+
+def controller(abr, level=2, log_path=None):
+    return abr.AdaptiveBitrateController(None, ladder=LADDER, start_level=level, log_path=log_path)
+
+
+def run(control, samples):
+    """Feed samples through decide() as step() does; returns the levels after each"""
+    levels = []
+    for sample in samples:
+        control.level = control.decide(sample)
+        levels.append(control.level)
+    return levels
+
+
+def test_steps_down_after_consecutive_bad_samples(abr):
+    control = controller(abr)
+    # Loss or round-trip time alone is enough
+    assert run(control, [BAD, SLOW, BAD, BAD]) == [2, 1, 1, 0]
+    # Never below the bottom rung
+    assert run(control, [BAD, BAD]) == [0, 0]
+
+
+def test_in_between_samples_reset_both_counters(abr):
+    control = controller(abr)
+    assert run(control, [BAD, MIDDLE, BAD, GOOD, BAD]) == [2, 2, 2, 2, 2]
+
+    control = controller(abr, level=0)
+    assert run(control, [GOOD, GOOD, MIDDLE, GOOD, GOOD, GOOD]) == [0, 0, 0, 0, 0, 1]
+
+
+def test_steps_up_slower_than_down(abr):
+    control = controller(abr, level=0)
+    assert run(control, [GOOD] * 7) == [0, 0, 1, 1, 1, 2, 2]
+    assert run(control, [GOOD] * 3) == [2, 2, 2]
+
+
+def test_missing_rtt_counts_as_clean(abr):
+    control = controller(abr, level=1)
+    assert run(control, [{'loss': 0.0, 'rtt': None}] * 3) == [1, 1, 2]
+
+
+def test_logged_session_replays_to_the_same_switches(abr, tmp_path):
+    path = tmp_path / 'abr.jsonl'
+    control = controller(abr, log_path=str(path))
+    control._log('start', profile=control.profile)
+    for sample in [BAD, BAD, GOOD, BAD, BAD, GOOD, GOOD, GOOD]:
+        control._log('sample', **sample)
+        level = control.decide(sample)
+        if level != control.level:
+            control.level = level
+            control._log('switch', profile=control.profile)
+    # Lines are written by the log's thread; stop() flushes them
+    control.stop()
+
+    events = [json.loads(line)['event'] for line in path.read_text().splitlines()]
+    assert events.count('switch') == 3
+    logged, replayed = abr.replay_decisions(str(path), ladder=LADDER)
+    assert logged == replayed == [1, 0, 1]
+
+
+class Encoder:
+    target_bitrate = 500000
+
+
+class Sender:
+    def __init__(self, kind='video'):
+        self.track = type('Track', (), {'kind': kind})()
+        self._RTCRtpSender__encoder = None
+
+
+class PeerConnection:
+    def __init__(self, *senders):
+        self.senders = senders
+
+    def getSenders(self):
+        return self.senders
+
+
+def test_bitrate_is_set_per_sender_once_its_encoder_exists(abr, monkeypatch):
+    monkeypatch.setattr(abr, '_private_encoder_supported', True)
+    monkeypatch.setattr(abr, 'ENCODER_POLL_INTERVAL', 0.001)
+    video, audio, other = Sender(), Sender('audio'), Sender()
+    other._RTCRtpSender__encoder = Encoder()
+
+    async def connect():
+        task = asyncio.create_task(abr.apply_bitrate_when_ready(PeerConnection(video, audio), 250000))
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        # aiortc builds the encoder with the first frame
+        video._RTCRtpSender__encoder = Encoder()
+        return await task
+
+    assert asyncio.run(connect())
+    assert video._RTCRtpSender__encoder.target_bitrate == 250000
+    # Another connection's encoder keeps its own bitrate
+    assert other._RTCRtpSender__encoder.target_bitrate == 500000
+    assert not asyncio.run(abr.apply_bitrate_when_ready(PeerConnection(Sender()), 250000, timeout=0))
+
+
+def test_unchecked_aiortc_leaves_encoders_alone(abr, monkeypatch, caplog):
+    monkeypatch.setattr(abr, '_private_encoder_supported', None)
+    monkeypatch.setattr(abr.metadata, 'version', lambda name: '2.1.0')
+    sender = Sender()
+    sender._RTCRtpSender__encoder = Encoder()
+    with caplog.at_level('WARNING'):
+        assert abr.set_sender_bitrate(sender, 250000)
+        abr.set_sender_bitrate(sender, 250000)
+    assert sender._RTCRtpSender__encoder.target_bitrate == 500000
+    # Logged once, not per call
+    assert len([record for record in caplog.records if 'aiortc 2.1.0' in record.message]) == 1
+
+    monkeypatch.setattr(abr, '_private_encoder_supported', None)
+    monkeypatch.setattr(abr.metadata, 'version', lambda name: '1.9.0')
+    assert abr.private_encoder_supported()
+
+
+def test_decision_log_writes_off_the_calling_thread(abr, monkeypatch, tmp_path):
+    path = tmp_path / 'abr.jsonl'
+    opened_by = []
+
+    def recording_open(*args, **kwargs):
+        opened_by.append(threading.current_thread().name)
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr(abr, 'open', recording_open, raising=False)
+    control = controller(abr, log_path=str(path))
+    control._log('sample', loss=0.0, rtt=None)
+    control._log('sample', loss=0.1, rtt=None)
+    control.stop()
+    control._log('sample', loss=0.2, rtt=None)
+    control.stop()
+
+    assert opened_by == ['abr-log', 'abr-log']
+    assert [json.loads(line)['loss'] for line in path.read_text().splitlines()] == [0.0, 0.1, 0.2]
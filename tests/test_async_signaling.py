@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+from async_signaling import AsyncSignaling
+from signaling_backend import LocalSignaling
+
+CANDIDATE = {'candidate': 'candidate:1 1 udp 1 10.0.0.2 5000 typ host',
+             'sdpMLineIndex': 0, 'sdpMid': '0'}
+
+
+class CountingSignaling(LocalSignaling):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def add_ice_candidates(self, room_id, candidates, device_id):
+        self.batches.append((room_id, device_id, len(candidates)))
+        return super().add_ice_candidates(room_id, candidates, device_id)
+
+
+def make_signaling(batch_window=0.02):
+    backend = CountingSignaling()
+    return backend, AsyncSignaling(lambda: backend, max_workers=2, batch_window=batch_window)
+
+
+def test_trickled_candidates_are_written_in_one_batch_per_device():
+    backend, signaling = make_signaling()
+
+    async def trickle():
+        await signaling.connect()
+        for _ in range(3):
+            await signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+        await signaling.add_ice_candidate('car', CANDIDATE, 'dashboard')
+        # Queued, not written yet
+        assert backend.batches == []
+        await asyncio.sleep(0.1)
+        await signaling.close()
+
+    asyncio.run(trickle())
+    assert sorted(backend.batches) == [('car', 'dashboard', 1), ('car', 'pi', 3)]
+    stats = signaling.stats()
+    assert (stats['ice_batches'], stats['ice_candidates']) == (2, 4)
+    assert backend.get_ice_candidates('car', 'dashboard') == [CANDIDATE] * 3
+
+
+def test_flush_writes_now_and_cancels_the_timer():
+    backend, signaling = make_signaling(batch_window=10)
+
+    async def flush():
+        await signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+        await signaling.flush()
+        assert signaling._flush_handle is None
+        assert backend.batches == [('car', 'pi', 1)]
+        # Nothing left for a second flush or cleanup_room to write
+        await signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+        await signaling.cleanup_room('car')
+        await signaling.flush()
+        await signaling.close()
+
+    asyncio.run(flush())
+    assert backend.batches == [('car', 'pi', 1), ('car', 'pi', 1)]
+
+
+def test_listener_callbacks_run_on_the_loop_thread():
+    backend, signaling = make_signaling()
+    delivered = []
+
+    async def listen():
+        loop_thread = threading.current_thread()
+        done = asyncio.Event()
+
+        def on_offer(offer):
+            delivered.append((offer['sdp'], threading.current_thread() is loop_thread))
+            done.set()
+
+        await signaling.listen_for_offer('car', on_offer)
+        # The backend fires from whatever thread wrote the offer
+        writer = threading.Thread(target=backend.send_offer, args=('car', 'sdp-1', 'pi'))
+        writer.start()
+        await asyncio.wait_for(done.wait(), 2.0)
+        writer.join()
+        await signaling.close()
+
+    asyncio.run(listen())
+    assert delivered == [('sdp-1', True)]
+    assert signaling.calls >= 1 and signaling.round_trip.count >= 1
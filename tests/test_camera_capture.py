@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+
+class FakeVideoCapture:
+    """Fills the buffer it is handed with the frame number; fails on request"""
+    def __init__(self, camera_id):
+        self.count = 0
+        self.fail = threading.Event()
+        self.settings = {}
+
+    def set(self, prop, value):
+        self.settings[prop] = value
+
+    def isOpened(self):
+        return True
+
+    def read(self, buffer):
+        time.sleep(0.001)
+        if self.fail.is_set():
+            return False, None
+        self.count += 1
+        buffer[...] = self.count % 256
+        return True, buffer
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def camera_capture(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'RPi'))
+    import camera_capture
+    monkeypatch.setattr(camera_capture.cv2, 'VideoCapture', FakeVideoCapture)
+    return camera_capture
+
+
+def test_latest_frame_comes_from_the_double_buffer(camera_capture):
+    capture = camera_capture.CameraCapture(width=32, height=24)
+    with capture.latest() as (seq, captured_at, frame):
+        assert (seq, captured_at, frame) == (0, None, None)
+
+    capture.start()
+    try:
+        assert capture.wait_first_frame(2.0)
+        seen = []
+        for _ in range(20):
+            with capture.latest() as (seq, captured_at, frame):
+                # Whole frames only: the worker never writes the front buffer
+                assert (frame == frame[0, 0, 0]).all()
+                assert any(frame is buffer for buffer in capture._buffers)
+                seen.append(seq)
+            time.sleep(0.002)
+        assert seen == sorted(seen) and seen[-1] > seen[0]
+        assert captured_at <= time.monotonic()
+    finally:
+        capture.stop()
+
+
+def test_read_failures_are_counted_and_resolution_changes_apply(camera_capture):
+    capture = camera_capture.CameraCapture(width=32, height=24)
+    capture.request_resolution(16, 12)
+    capture.camera.fail.set()
+    capture.start()
+    try:
+        time.sleep(0.1)
+        assert capture.read_failures > 0 and capture.frames_captured == 0
+        assert (capture.width, capture.height) == (16, 12)
+        assert capture.camera.settings[camera_capture.cv2.CAP_PROP_FRAME_WIDTH] == 16
+
+        capture.camera.fail.clear()
+        assert capture.wait_first_frame(2.0)
+        assert capture.stats()['frames_captured'] > 0
+    finally:
+        capture.stop()
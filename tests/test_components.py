@@ -0,0 +1,34 @@
+import threading
+import time
+
+from components import DISABLED, PENDING, READY, Component
+
+
+def test_warm_in_background_builds_once_off_the_caller():
+    release = threading.Event()
+    builds = []
+
+    def factory():
+        builds.append(threading.current_thread().name)
+        release.wait(5)
+        return 'value'
+
+    component = Component('slow', factory)
+    started = time.monotonic()
+    component.warm_in_background()
+    component.warm_in_background()
+    assert time.monotonic() - started < 0.5
+    assert component.peek() is None
+    release.set()
+    deadline = time.monotonic() + 2
+    while component.state != READY and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert component.peek() == 'value'
+    assert builds == ['warm-slow']
+
+
+def test_warm_in_background_skips_disabled():
+    component = Component('off', lambda: 'value', enabled=False)
+    component.warm_in_background()
+    assert component.state == DISABLED
+    assert Component('idle', lambda: 1).state == PENDING
@@ -0,0 +1,49 @@
+import pytest
+
+import control_log
+from control_log import ControlLogWriter, ControlReplayer, parse_speed, read_log
+
+
+def test_writer_never_overwrites(tmp_path):
+    path = tmp_path / 'run.ctl'
+    writer = ControlLogWriter(str(path))
+    writer.log_control('sid', b'\x01\x02')
+    writer.close()
+    with pytest.raises(FileExistsError):
+        ControlLogWriter(str(path))
+    assert len(read_log(str(path))[1]) == 1
+
+
+def test_default_path_is_per_run(tmp_path):
+    path = control_log.new_log_path(str(tmp_path))
+    assert path.startswith(str(tmp_path)) and path.endswith(f'-{control_log.os.getpid()}.ctl')
+
+
+def test_parse_speed():
+    assert parse_speed(['replay', 'log']) == 1.0
+    assert parse_speed(['replay', 'log', '--speed', 'max']) is None
+    assert parse_speed(['replay', 'log', '--speed', '4']) == 4.0
+    for argv in (['replay', 'log', '--speed'], ['replay', 'log', '--speed', '0'],
+                 ['replay', 'log', '--speed', 'fast']):
+        with pytest.raises(ValueError):
+            parse_speed(argv)
+
+
+def test_main_prints_usage_for_missing_speed(capsys):
+    assert control_log.main(['control_log.py', 'replay', 'log', '--speed']) == 2
+    output = capsys.readouterr().out
+    assert '--speed needs a value' in output and 'control_log.py replay' in output
+
+
+def test_replay_round_trip(tmp_path):
+    path = str(tmp_path / 'synth.ctl')
+    control_log.synthesize(path, 20)
+    _, records = read_log(path)
+    assert [r.offset for r in records[:3]] == [0.0, 0.02, 0.04]
+
+    received = []
+    replayer = ControlReplayer(records, {control_log.SOURCE_CONTROL: lambda c, p: received.append(p)},
+                               speed=None)
+    report = replayer.run()
+    assert report['messages'] == 20 and report['errors'] == 0
+    assert received == [r.payload for r in records]
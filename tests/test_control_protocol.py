@@ -0,0 +1,48 @@
+import pytest
+
+from control_protocol import ControlDispatcher
+
+
+@pytest.mark.parametrize('x, y, expected', [
+    (0, 0, (0, 0)),
+    (50.7, -20.2, (50, -20)),
+    ('30', '-40', (30, -40)),
+    (250, -1e9, (100, -100)),
+])
+def test_validate_vector_coerces_and_clamps(x, y, expected):
+    assert ControlDispatcher.validate_vector(x, y) == expected
+
+
+@pytest.mark.parametrize('x, y', [
+    ('left', 0), (None, 0), (0, [1]), ({}, 0), (float('nan'), 0), (0, float('inf')),
+])
+def test_validate_vector_rejects_non_numeric(x, y):
+    with pytest.raises(ValueError):
+        ControlDispatcher.validate_vector(x, y)
+
+
+def test_bad_drive_leaves_state_alone():
+    dispatcher = ControlDispatcher()
+    dispatcher.drive(10, 60)
+    with pytest.raises(ValueError):
+        dispatcher.drive('x', 0)
+    assert (dispatcher.x, dispatcher.y) == (10, 60)
+
+
+@pytest.mark.parametrize('servo_id, angle, expected', [
+    (1, 90, (0, 90)),
+    ('3', '5.5', (2, 6)),
+    (2.0, -20, (1, 0)),
+    (1, 1e300, (0, 180)),
+])
+def test_validate_servo_coerces_rounds_and_clamps(servo_id, angle, expected):
+    assert ControlDispatcher.validate_servo(servo_id, angle) == expected
+
+
+@pytest.mark.parametrize('servo_id, angle', [
+    (1, float('inf')), (1, float('-inf')), (1, float('nan')), (1, 'Infinity'), (1, None),
+    (1.9, 90), ('1.5', 90), (0, 90), (4, 90), (None, 90), (float('inf'), 90),
+])
+def test_validate_servo_rejects_bad_input(servo_id, angle):
+    with pytest.raises(ValueError):
+        ControlDispatcher.validate_servo(servo_id, angle)
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_socketio')
+
+import app as dashboard
+
+
+def test_bad_joystick_input_is_dropped_before_the_limiter():
+    client = dashboard.socketio.test_client(dashboard.app)
+    client.get_received()
+    before = dashboard.command_limiter.stats()
+    for data in ({'x': 'left', 'y': 0}, {'x': None, 'y': 5}, ['not', 'a', 'dict'], 'x'):
+        client.emit('joystick_move', data)
+    after = dashboard.command_limiter.stats()
+    assert (after['accepted'], after['dropped']) == (before['accepted'], before['dropped'])
+    assert client.get_received() == []
+
+    client.emit('joystick_move', {'x': '20', 'y': 40.5})
+    assert dashboard.command_limiter.stats()['accepted'] == before['accepted'] + 1
+    assert (dashboard.control_dispatcher.x, dashboard.control_dispatcher.y) == (20, 40)
+    client.disconnect()
+
+
+@pytest.mark.parametrize('body', [b'not json', b'[1, 2]', b'{"command": 5}'])
+def test_bad_http_control_is_rejected(body):
+    response = dashboard.app.test_client().post('/control', data=body,
+                                                content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_bad_servo_body_is_rejected():
+    response = dashboard.app.test_client().post('/servo_control', data=b'"90"',
+                                                content_type='application/json')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', [
+    b'{"servo_id": 1, "angle": 1e999}',
+    b'{"servo_id": 1, "angle": Infinity}',
+    b'{"servo_id": 1, "angle": -Infinity}',
+    b'{"servo_id": 1, "angle": NaN}',
+    b'{"servo_id": 1.9, "angle": 90}',
+    b'{"servo_id": "2.5", "angle": 90}',
+])
+def test_bad_servo_values_are_rejected(body):
+    response = dashboard.app.test_client().post('/servo_control', data=body,
+                                                content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_servo_channel_uses_the_validated_id():
+    client = dashboard.app.test_client()
+    response = client.post('/servo_control', json={'servo_id': 2.0, 'angle': '44.6'},
+                           environ_base={'REMOTE_ADDR': '10.9.9.9'})
+    assert response.status_code == 200
+    assert response.get_json()['servo_id'] == 2 and response.get_json()['angle'] == 45
+    assert dashboard.control_dispatcher.servos[1] == 45
+
+
+@pytest.mark.parametrize('body', [
+    b'[]',
+    b'{"path": ["mjpeg"]}',
+    b'{"path": "vhs"}',
+    b'{"path": "mjpeg", "reports": [{}]}',
+    b'{"path": "mjpeg", "reports": [{"code": 1, "displayed": Infinity}]}',
+    b'{"path": "webrtc", "frames": [{}]}',
+    b'{"path": "webrtc", "frames": [{"code": 1, "ready": 5, "stages": {"encode": "fast"}}]}',
+])
+def test_bad_latency_report_is_rejected(body):
+    response = dashboard.app.test_client().post('/metrics/latency', data=body,
+                                                content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_latency_report_is_accepted():
+    response = dashboard.app.test_client().post(
+        '/metrics/latency',
+        json={'path': 'webrtc', 'frames': [{'code': 1, 'ready': 5, 'stages': {'encode': 0.002}}],
+              'reports': [{'code': 1, 'received': None, 'displayed': 30}]})
+    assert response.status_code == 200
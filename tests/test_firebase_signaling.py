@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip('firebase_admin')
+
+import firebase_signalling
+from fake_firestore import FakeFirestore
+from firebase_signalling import FirebaseSignaling
+from signaling_backend import SignalingBackend
+from webrtc_config import FIREBASE_SIGNALING_COLLECTION
+
+ROOM = 'car'
+CANDIDATE = {'candidate': 'candidate:1 1 udp 1 10.0.0.2 5000 typ host',
+             'sdpMLineIndex': 0, 'sdpMid': '0'}
+
+
+@pytest.fixture
+def firestore():
+    return FakeFirestore(firebase_signalling.firestore.SERVER_TIMESTAMP)
+
+
+@pytest.fixture
+def signaling(firestore):
+    # Skip __init__: no credentials, the fake client stands in for firestore.client()
+    backend = FirebaseSignaling.__new__(FirebaseSignaling)
+    SignalingBackend.__init__(backend)
+    backend.db = firestore
+    backend.signaling_ref = firestore.collection(FIREBASE_SIGNALING_COLLECTION)
+    backend.create_room(ROOM)
+    return backend
+
+
+def test_offer_is_delivered_once_per_version(signaling, firestore):
+    offers = []
+    signaling.listen_for_offer(ROOM, offers.append)
+    signaling.send_offer(ROOM, 'sdp-1', 'pi')
+    # Any other change to the room fires the snapshot again with the same offer
+    signaling.send_answer(ROOM, 'answer-1', 'dashboard')
+    signaling.send_offer(ROOM, 'sdp-2', 'pi')
+
+    assert [offer['sdp'] for offer in offers] == ['sdp-1', 'sdp-2']
+    assert offers[0]['version'] != offers[1]['version']
+    assert signaling.duplicates == 1
+    # Initial snapshot plus one per room write
+    assert signaling.reads == firestore.reads == 4
+
+
+def test_get_ice_candidates_reads_from_the_cursor(signaling, firestore):
+    signaling.add_ice_candidates(ROOM, [CANDIDATE, CANDIDATE], 'pi')
+    signaling.add_ice_candidate(ROOM, CANDIDATE, 'dashboard')
+
+    assert signaling.get_ice_candidates(ROOM, 'dashboard') == [CANDIDATE, CANDIDATE]
+    assert firestore.reads == 3
+    assert firestore.commits == 1
+
+    # Nothing new: no documents read again
+    assert signaling.get_ice_candidates(ROOM, 'dashboard') == []
+    assert firestore.reads == 3
+
+    signaling.add_ice_candidate(ROOM, CANDIDATE, 'pi')
+    assert signaling.get_ice_candidates(ROOM, 'dashboard') == [CANDIDATE]
+    assert signaling.reads == firestore.reads == 4
+
+    # A full read still sees everything
+    assert len(signaling.get_ice_candidates(ROOM, 'dashboard', incremental=False)) == 3
+
+
+def test_ice_listener_skips_redelivered_and_resumes_from_cursor(signaling, firestore):
+    signaling.add_ice_candidates(ROOM, [CANDIDATE, CANDIDATE], 'pi')
+    received = []
+    signaling.listen_for_ice_candidates(ROOM, 'dashboard', received.append)
+    assert len(received) == 2 and firestore.reads == 2
+
+    # The listener's stream reconnects and sends every document again
+    firestore.redeliver()
+    assert len(received) == 2
+    assert signaling.duplicates == 2
+
+    # A listener registered again starts after the last candidate seen
+    signaling.listen_for_ice_candidates(ROOM, 'dashboard', received.append)
+    reads = firestore.reads
+    signaling.add_ice_candidate(ROOM, CANDIDATE, 'pi')
+    assert len(received) == 4  # one new candidate, seen by both listeners
+    assert firestore.reads == reads + 2
+
+
+def test_garbage_counts_each_kind(signaling, firestore):
+    signaling.add_ice_candidates(ROOM, [CANDIDATE, CANDIDATE], 'pi')
+    signaling.join_session(ROOM, 's1', 'viewer')
+    # A live room whose candidates are all stale
+    signaling.create_room('live')
+    signaling.add_ice_candidate('live', CANDIDATE, 'pi')
+    live = f'{FIREBASE_SIGNALING_COLLECTION}/live'
+    firestore.docs[live]['created_at'] = datetime.now(timezone.utc)
+
+    report = signaling.collect_garbage(ttl=60, dry_run=True)
+    assert (report['rooms'], report['candidates'], report['sessions']) == (1, 3, 1)
+
+    signaling.collect_garbage(ttl=60)
+    assert list(firestore.docs) == [live]
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('av')
+
+
+@pytest.fixture
+def FrameConverter(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'RPi'))
+    from frame_convert import FrameConverter
+    return FrameConverter
+
+
+def capture(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_held_frames_are_never_overwritten(FrameConverter):
+    converter = FrameConverter('bgr24', pool_size=2, max_pool_size=4)
+    # Relay subscribers that have not encoded their frames yet
+    held = [converter.convert(capture(value)) for value in range(6)]
+    assert [int(frame.to_ndarray()[0, 0, 0]) for frame in held] == list(range(6))
+    assert converter.stats()['pool_size'] == 4
+    assert converter.busy_frames == 2
+
+
+def test_released_frames_are_reused(FrameConverter):
+    converter = FrameConverter('yuv420p', pool_size=2)
+    for value in range(10):
+        frame = converter.convert(capture(value))
+        del frame
+    stats = converter.stats()
+    assert stats['pool_size'] == 2 and stats['pooled_frames'] + stats['fallback_frames'] == 10
+    assert converter.busy_frames == 0
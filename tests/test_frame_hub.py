@@ -0,0 +1,54 @@
+import threading
+import time
+
+from frame_hub import FrameHub
+
+TIERS = [{'name': 'high'}, {'name': 'low'}]
+
+
+class Camera:
+    def __init__(self):
+        self.event = threading.Event()
+
+    def read(self):
+        self.event.wait(0.01)
+        return b'frame'
+
+
+def make_hub():
+    return FrameHub(Camera, lambda frame, tier: frame + tier['name'].encode(), TIERS)
+
+
+def test_internal_subscriber_is_not_a_viewer():
+    hub = make_hub()
+    tap = hub.subscribe(1, internal=True)
+    assert hub.viewer_count == 0
+    viewer = hub.subscribe(0)
+    assert hub.viewer_count == 1
+    stats = hub.stats()
+    assert stats['viewers'] == 1
+    assert [tier['viewers'] for tier in stats['tiers']] == [1, 0]
+
+    # The tap still receives frames
+    assert tap.next_frame(timeout=2.0) == b'framelow'
+    viewer.close()
+    assert hub.viewer_count == 0
+    viewer.close()
+    assert hub.viewer_count == 0
+    tap.close()
+
+
+def test_polling_wait_with_cooperative_sleep():
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(seconds)
+
+    hub = FrameHub(Camera, lambda frame, tier: frame, TIERS, sleep=sleep, poll_interval=0.002)
+    viewer = hub.subscribe(0)
+    assert viewer.next_frame(timeout=2.0) == b'frame'
+    assert sleeps and set(sleeps) == {0.002}
+    viewer.close()
+    # Timeout without frames: returns None after polling, never raises
+    assert hub.wait_for_frame(hub.latest(0)[0] + 100, 0, timeout=0.01) == (hub.latest(0)[0] + 100, None)
@@ -0,0 +1,113 @@
+import sys
+import time
+
+import pytest
+
+if sys.platform == 'win32':
+    pytest.skip('FakeModem needs a pty', allow_module_level=True)
+
+from gsm import GSMCommand, GSMModem
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def modem():
+    modem = GSMModem(port='simulated', timeout=0.5, pipeline_depth=4, poll_interval=60)
+    modem.start()
+    # Init commands and the first status poll are through
+    assert modem.command('AT').ok
+    yield modem
+    modem.stop()
+
+
+def test_pipelined_commands_complete_in_order(modem):
+    modem.fake.processing = 0.02
+    done = []
+    commands = [modem.submit(text, callback=lambda response, text=text: done.append(text))
+                for text in ('AT+CSQ', 'AT+CGSN', 'AT+CREG?', 'AT')]
+    assert all(command.wait(2.0) for command in commands)
+
+    assert done == ['AT+CSQ', 'AT+CGSN', 'AT+CREG?', 'AT']
+    assert [command.response.lines for command in commands] == \
+        [['+CSQ: 20,0'], ['867000000000000'], ['+CREG: 1,1'], []]
+    assert all(command.response.ok for command in commands)
+
+
+def test_error_results_are_not_ok(modem):
+    errors = modem.errors
+    unsupported = modem.command('AT+CFUN=0')
+    garbage = modem.command('HELLO')
+    assert (unsupported.ok, unsupported.error) == (False, '+CME ERROR: 4')
+    assert (garbage.ok, garbage.error) == (False, 'ERROR')
+    assert modem.errors == errors + 2
+    # The link is still in step
+    assert modem.command('AT+CGSN').lines == ['867000000000000']
+
+
+def test_urcs_update_cached_status(modem):
+    seen = []
+    modem.urc_handlers.append(seen.append)
+    assert modem.status()['registration'] == 'home'
+
+    modem.fake.urc('+CMTI: "SM",3')
+    modem.fake.urc('RING')
+    modem.fake.urc('+CREG: 5')
+    assert wait_for(lambda: len(seen) == 3)
+
+    status = modem.status()
+    assert (status['unread_sms'], status['rings']) == (1, 1)
+    assert (status['registered'], status['registration']) == (True, 'roaming')
+    assert seen == ['+CMTI: "SM",3', 'RING', '+CREG: 5']
+    assert modem.stats()['urcs'] == 3
+
+
+def test_timeout_fails_everything_in_flight_and_resyncs(modem):
+    modem.fake.processing = 0.2
+    slow = modem.submit('AT+CSQ', timeout=0.05)
+    behind = modem.submit('AT+CGSN', timeout=0.05)
+    assert slow.wait(2.0).error == behind.wait(2.0).error == 'timeout'
+    assert modem.stats()['timeouts'] == 2
+
+    # The late +CSQ/OK lines are absorbed during resync, not matched to the
+    # next command or reported as URCs
+    modem.fake.processing = 0.0
+    urcs = modem.urcs
+    response = modem.command('AT+CREG?')
+    assert (response.ok, response.lines) == (True, ['+CREG: 1,1'])
+    assert modem.urcs == urcs
+
+
+def test_expire_collects_stale_prefixes():
+    modem = GSMModem(port='simulated', timeout=1.0)
+    try:
+        commands = [GSMCommand(text, 1.0) for text in ('AT+CSQ;+CREG?', 'AT+CGSN')]
+        for command in commands:
+            command.deadline = 10.0
+            modem._in_flight.append(command)
+
+        modem._expire(9.0)
+        assert modem._in_flight == commands
+
+        modem._expire(10.5)
+        assert modem._in_flight == []
+        assert [command.response.error for command in commands] == ['timeout', 'timeout']
+        assert modem._stale_prefixes == {'+CSQ', '+CREG', '+CGSN'}
+        assert modem._resync_until == 11.5
+
+        # A late answer keeps the line quiet and still refreshes the cache
+        modem._handle_line('+CSQ: 31,0')
+        assert modem.urcs == 0 and modem.status()['bars'] == 5
+        assert modem._resync_until > 11.5
+        # A real URC still gets through
+        modem._handle_line('RING')
+        assert modem.urcs == 1
+    finally:
+        modem.stop()
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip('av')
+pytest.importorskip('aiortc')
+
+AUD = b'\x00\x00\x00\x01\x09\xf0'
+SPS = b'\x00\x00\x00\x01\x67\x42\xc0\x1e'
+IDR = b'\x00\x00\x01\x65\x88\x84'
+P_SLICE = b'\x00\x00\x00\x01\x41\x9a\x02'
+
+
+@pytest.fixture
+def h264(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'RPi'))
+    import h264_passthrough
+    return h264_passthrough
+
+
+def test_split_access_units_keeps_the_partial_tail(h264):
+    key, delta = AUD + SPS + IDR, AUD + P_SLICE
+    units, rest = h264.split_access_units(b'\x00junk' + key + delta + AUD + P_SLICE[:3])
+    assert units == [key, delta]
+    assert rest == AUD + P_SLICE[:3]
+    assert h264.split_access_units(SPS) == ([], SPS)
+
+
+def test_keyframes_are_found_behind_either_start_code(h264):
+    assert h264.is_keyframe(AUD + SPS + IDR)
+    assert h264.is_keyframe(AUD + b'\x00\x00\x00\x01\x65\x88')
+    assert not h264.is_keyframe(AUD + P_SLICE)
+    assert not h264.is_keyframe(AUD + b'\x00\x00\x01')
+
+
+def test_encoder_command(h264):
+    command = h264.encoder_command(['-i', 'in'], width=320, height=240, fps=15,
+                                   bitrate=250000, encoder='libx264')
+    assert command[command.index('-b:v') + 1] == '250000'
+    assert command[command.index('-vf') + 1] == 'scale=320:240'
+    assert '-tune' in command and command[-2:] == ['h264', '-']
+    assert '-tune' not in h264.encoder_command([], encoder='h264_v4l2m2m')
+
+
+def test_full_queue_skips_to_the_next_keyframe(h264):
+    async def deliver():
+        encoder = h264.H264EncoderProcess([], queue_size=2)
+        encoder.queue = asyncio.Queue()
+        for unit in (AUD + SPS + IDR, AUD + P_SLICE, AUD + P_SLICE, AUD + P_SLICE, AUD + SPS + IDR):
+            encoder._deliver(unit, 0.0)
+        return encoder
+
+    encoder = asyncio.run(deliver())
+    # The two queued units were flushed, both P-frames after them dropped
+    assert encoder.queue.qsize() == 1
+    assert h264.is_keyframe(encoder.queue.get_nowait()[0])
+    assert encoder.stats() == {'access_units': 5, 'dropped_units': 4, 'bytes_received': 0}
@@ -0,0 +1,61 @@
+import config
+from hal import (WRITE_DIGITAL, WRITE_PWM, L298NMotorDriver, ServoDriver, SimulatedBackend,
+                 create_backend)
+
+
+def test_create_backend_defaults_to_simulation():
+    assert isinstance(create_backend('simulated'), SimulatedBackend)
+    assert isinstance(create_backend('anything-else'), SimulatedBackend)
+
+
+def test_simulated_log_is_a_ring():
+    backend = SimulatedBackend(capacity=4)
+    for duty in range(6):
+        backend.pwm_write(18, duty)
+    backend.write(17, True)
+
+    log = backend.log()
+    assert [(pin, kind, value) for _, pin, kind, value in log] == \
+        [(18, WRITE_PWM, 3.0), (18, WRITE_PWM, 4.0), (18, WRITE_PWM, 5.0), (17, WRITE_DIGITAL, 1.0)]
+    assert [entry[0] for entry in log] == sorted(entry[0] for entry in log)
+    assert len(backend.log(last=2)) == 2
+    assert backend.state == {18: 5.0, 17: 1.0}
+    assert backend.stats()['writes'] == 7
+
+    backend.clear()
+    assert backend.log() == []
+
+
+def test_simulated_inputs_are_pulled_up():
+    backend = SimulatedBackend(capacity=4)
+    backend.setup_input(5)
+    assert backend.read(5) is True
+    backend.set_input(5, 0)
+    assert backend.read(5) is False
+
+
+def test_motor_driver_sets_direction_and_duty():
+    backend = SimulatedBackend(capacity=16)
+    driver = L298NMotorDriver(backend)
+    assert backend.frequencies[config.MOTOR_LEFT_ENABLE] == config.MOTOR_PWM_FREQUENCY
+
+    driver.set_motors(60.0, -150.0)
+    state = backend.state
+    assert (state[config.MOTOR_LEFT_FORWARD], state[config.MOTOR_LEFT_BACKWARD],
+            state[config.MOTOR_LEFT_ENABLE]) == (1.0, 0.0, 60.0)
+    assert (state[config.MOTOR_RIGHT_FORWARD], state[config.MOTOR_RIGHT_BACKWARD],
+            state[config.MOTOR_RIGHT_ENABLE]) == (0.0, 1.0, 100.0)
+
+    driver.stop()
+    assert [state[pin] for pins in driver.pins.values() for pin in pins] == [0.0] * 6
+    assert driver.writes == 2
+
+
+def test_servo_angle_maps_to_clamped_duty():
+    backend = SimulatedBackend(capacity=16)
+    servos = ServoDriver(backend, pins=[12, 13])
+    servos.set_angle(0, 90)
+    servos.set_angle(1, 270)
+    assert backend.state[12] == (config.SERVO_MIN_DUTY + config.SERVO_MAX_DUTY) / 2
+    assert backend.state[13] == config.SERVO_MAX_DUTY
+    assert ServoDriver.angle_to_duty(-30) == config.SERVO_MIN_DUTY
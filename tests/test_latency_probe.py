@@ -0,0 +1,76 @@
+import math
+import time
+
+import pytest
+
+from frame_hub import PROBE_FOLDED_STAGES, FrameHub
+from latency_probe import CODE_MASK, LatencyProbe, parse_frames, parse_reports
+
+
+def test_parse_frames_accepts_sender_records():
+    frames = [{'code': 7, 'ready': 1000.5, 'stages': {'capture': 0.001, 'encode': 0}}]
+    assert parse_frames(frames) == frames
+    assert parse_frames([]) == []
+
+
+@pytest.mark.parametrize('frames', [
+    {'code': 1},
+    [{}],
+    [{'code': 1, 'ready': 10}],
+    [{'code': 1, 'ready': 10, 'stages': []}],
+    [{'code': '1', 'ready': 10, 'stages': {}}],
+    [{'code': CODE_MASK + 1, 'ready': 10, 'stages': {}}],
+    [{'code': True, 'ready': 10, 'stages': {}}],
+    [{'code': 1, 'ready': math.inf, 'stages': {}}],
+    [{'code': 1, 'ready': 10, 'stages': {'warp': 0.1}}],
+    [{'code': 1, 'ready': 10, 'stages': {'encode': math.nan}}],
+    [{'code': 1, 'ready': 10, 'stages': {'encode': -0.1}}],
+])
+def test_parse_frames_rejects_malformed_records(frames):
+    with pytest.raises(ValueError):
+        parse_frames(frames)
+
+
+def test_parse_reports():
+    assert parse_reports([{'code': 3, 'displayed': 20.0}, {'code': 4, 'received': 9, 'displayed': 11}]) \
+        == [(3, None, 20.0), (4, 9, 11)]
+    for reports in ([{}], [{'code': 3}], [{'code': 3, 'displayed': '20'}],
+                    [{'code': 3, 'received': math.inf, 'displayed': 20}], [5], 'reports'):
+        with pytest.raises(ValueError):
+            parse_reports(reports)
+
+
+def test_snapshot_labels_folded_stages():
+    assert LatencyProbe('webrtc').snapshot()['folded'] == {}
+    assert LatencyProbe('mjpeg', folded=PROBE_FOLDED_STAGES).snapshot()['folded'] == PROBE_FOLDED_STAGES
+
+
+class Probe:
+    def __init__(self):
+        self.marks = []
+        self.ready = []
+
+    def stamp(self, frame, captured_at):
+        return 1
+
+    def mark(self, code, stage, seconds):
+        self.marks.append((code, stage))
+
+    def frame_ready(self, code, **stages):
+        self.ready.append((code, sorted(stages)))
+
+
+class Camera:
+    def read(self):
+        time.sleep(0.005)
+        return b'frame'
+
+
+def test_mjpeg_path_marks_capture_and_encode():
+    probe = Probe()
+    hub = FrameHub(Camera, lambda frame, tier: frame, [{'name': 'high'}], probe=probe)
+    viewer = hub.subscribe(0)
+    assert viewer.next_frame(timeout=2.0) == b'frame'
+    viewer.close()
+    assert (1, 'capture') in probe.marks
+    assert (1, ['encode']) in probe.ready
@@ -0,0 +1,104 @@
+import pytest
+
+from signaling_backend import LocalSignaling, create_signaling, normalize_candidate
+
+CANDIDATE = {'candidate': 'candidate:1 1 udp 1 10.0.0.2 5000 typ host',
+             'sdpMLineIndex': 0, 'sdpMid': '0'}
+
+
+def test_offer_listener_sees_the_current_offer_then_each_new_one_once():
+    signaling = LocalSignaling()
+    signaling.create_room('car')
+    signaling.send_offer('car', 'sdp-1', 'pi')
+    offers = []
+    signaling.listen_for_offer('car', offers.append)
+    signaling.send_answer('car', 'answer-1', 'dashboard')
+    signaling.send_offer('car', 'sdp-2', 'pi')
+
+    assert [offer['sdp'] for offer in offers] == ['sdp-1', 'sdp-2']
+    assert offers[-1]['type'] == 'offer' and offers[-1]['from'] == 'pi'
+    assert signaling.get_room_status('car') == 'offer_sent'
+    assert signaling.get_answer('car')['sdp'] == 'answer-1'
+
+
+def test_ice_reads_resume_from_the_cursor_and_skip_own_candidates():
+    signaling = LocalSignaling()
+    signaling.create_room('car')
+    signaling.add_ice_candidates('car', [CANDIDATE, CANDIDATE], 'pi')
+    signaling.add_ice_candidate('car', CANDIDATE, 'dashboard')
+
+    assert signaling.get_ice_candidates('car', 'dashboard') == [CANDIDATE, CANDIDATE]
+    assert signaling.get_ice_candidates('car', 'dashboard') == []
+    signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+    assert signaling.get_ice_candidates('car', 'dashboard') == [CANDIDATE]
+    assert len(signaling.get_ice_candidates('car', 'dashboard', incremental=False)) == 3
+
+
+def test_ice_listener_delivers_each_candidate_once():
+    signaling = LocalSignaling()
+    signaling.create_room('car')
+    signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+    received = []
+    signaling.listen_for_ice_candidates('car', 'dashboard', received.append)
+    signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+    assert len(received) == 2
+
+    # Registering again only replays what this consumer has not seen
+    signaling.listen_for_ice_candidates('car', 'dashboard', received.append)
+    assert len(received) == 2
+    # One delivery per consumer, however many of its listeners are registered
+    signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+    assert len(received) == 3
+    assert signaling.duplicates == 1
+
+
+def test_subscribe_reports_events_and_cleanup_drops_room_listeners():
+    signaling = LocalSignaling()
+    events, offers = [], []
+    signaling.subscribe(lambda room_id, event, data: events.append((room_id, event)))
+    signaling.create_room('car')
+    signaling.listen_for_offer('car', offers.append)
+    signaling.send_offer('car', 'sdp-1', 'pi')
+    signaling.add_ice_candidate('car', CANDIDATE, 'pi')
+    signaling.cleanup_room('car')
+    signaling.send_offer('car', 'sdp-2', 'pi')
+
+    assert events == [('car', 'offer'), ('car', 'ice_candidate'), ('car', 'offer')]
+    assert [offer['sdp'] for offer in offers] == ['sdp-1']
+
+
+def test_candidate_shapes_are_normalized():
+    # Sender: nested under 'candidate'; dashboard: flat next to 'from'
+    assert normalize_candidate({'candidate': CANDIDATE, 'from': 'pi'}) == CANDIDATE
+    assert normalize_candidate(dict(CANDIDATE, **{'from': 'dashboard'})) == CANDIDATE
+
+
+def test_create_signaling():
+    assert isinstance(create_signaling('local'), LocalSignaling)
+    with pytest.raises(ValueError):
+        create_signaling('carrier-pigeon')
+
+
+def test_dashboard_replays_room_state_after_the_cursor():
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_socketio')
+    import app as dashboard
+    from webrtc_config import SIGNALING_NAMESPACE
+
+    local = dashboard.local_signaling
+    local.create_room('lan')
+    local.add_ice_candidates('lan', [CANDIDATE, CANDIDATE], 'pi')
+    after = local.entries_after('lan')[0]['seq']
+    client = dashboard.socketio.test_client(dashboard.app, namespace=SIGNALING_NAMESPACE)
+    client.emit('join', {'room': 'lan', 'event': 'ice_candidate', 'after': after,
+                         'device': 'dashboard'}, namespace=SIGNALING_NAMESPACE)
+    replayed = client.get_received(SIGNALING_NAMESPACE)
+    assert [message['args'][0]['data']['seq'] for message in replayed] == [after + 1]
+
+    # Live events reach clients in the room
+    local.send_offer('lan', 'sdp-1', 'pi')
+    live = client.get_received(SIGNALING_NAMESPACE)
+    assert [(message['name'], message['args'][0]['data']['sdp']) for message in live] == \
+        [('offer', 'sdp-1')]
+    client.disconnect(namespace=SIGNALING_NAMESPACE)
+    local.cleanup_room('lan')
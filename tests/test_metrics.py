@@ -0,0 +1,25 @@
+import threading
+
+import metrics
+from metrics import Counter, ShardedHistogram
+
+
+def test_short_lived_threads_do_not_grow_metrics():
+    counter = Counter()
+    histogram = ShardedHistogram()
+
+    def work():
+        for _ in range(100):
+            counter.inc()
+            histogram.observe(0.001)
+
+    for _ in range(10):
+        threads = [threading.Thread(target=work) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert counter.value() == 20000
+    assert histogram.merged().count == 20000
+    assert len(counter._cells) == len(histogram._shards) == metrics.METRIC_SHARDS
@@ -0,0 +1,93 @@
+import math
+
+from mjpeg_stream import STEP_UP_WINDOWS, THROUGHPUT_WINDOW, MJPEGStream, find_tier
+
+TIERS = [{'name': 'high'}, {'name': 'medium'}, {'name': 'low'}]
+FPS = 10
+
+
+class Hub:
+    tiers = TIERS
+    # Bytes per frame; at FPS the tiers need 300, 100 and 30 kB/s
+    frame_size = [30000, 10000, 3000]
+
+
+class Subscriber:
+    hub = Hub()
+
+    def __init__(self, tier=0):
+        self.tier = tier
+
+    def set_tier(self, tier):
+        self.tier = tier
+
+
+def make_stream(tier=0, pinned=False):
+    subscriber = Subscriber(tier)
+    return subscriber, MJPEGStream(subscriber, fps=FPS, min_fps=2, pinned=pinned)
+
+
+def window(stream, throughput):
+    """Close one throughput window in which writes moved `throughput` bytes/s"""
+    stream._window_bytes = throughput
+    stream._window_write_time = 1.0
+    stream._adapt_tier(stream._window_start + THROUGHPUT_WINDOW)
+
+
+def test_steps_down_one_tier_per_slow_window():
+    subscriber, stream = make_stream()
+    window(stream, 200000)
+    assert subscriber.tier == 1
+    # 50 kB/s is under medium's 100 kB/s plus margin
+    window(stream, 50000)
+    assert subscriber.tier == 2
+    window(stream, 10000)
+    assert subscriber.tier == 2
+    assert stream.tier_changes == 2
+
+
+def test_steps_up_only_after_sustained_headroom():
+    subscriber, stream = make_stream(tier=2)
+    # Enough for medium, but not with the step-up margin
+    window(stream, 120000)
+    assert subscriber.tier == 2 and stream._good_windows == 0
+    for _ in range(STEP_UP_WINDOWS - 1):
+        window(stream, 160000)
+    assert subscriber.tier == 2
+    window(stream, 160000)
+    assert subscriber.tier == 1 and stream._good_windows == 0
+    # A slow window in between resets the count
+    window(stream, 500000)
+    window(stream, 20000)
+    assert subscriber.tier == 2
+    assert stream._good_windows == 0
+
+
+def test_partial_window_and_pinned_stream_do_not_move():
+    subscriber, stream = make_stream()
+    stream._window_bytes, stream._window_write_time = 1000, 1.0
+    stream._adapt_tier(stream._window_start + THROUGHPUT_WINDOW / 2)
+    assert subscriber.tier == 0
+
+    subscriber, stream = make_stream(pinned=True)
+    window(stream, 1000)
+    assert subscriber.tier == 0 and stream.throughput == 1000
+
+
+def test_fps_drops_only_on_the_lowest_tier():
+    subscriber, stream = make_stream()
+    stream._adapt_fps(0.09)
+    assert stream.fps == FPS and stream.slow_writes == 1
+
+    subscriber.tier = 2
+    stream._adapt_fps(0.09)
+    assert stream.fps == FPS * 0.75
+    # Recovers one fps after a run of fast writes
+    for _ in range(math.ceil(stream.fps)):
+        stream._adapt_fps(0.001)
+    assert stream.fps == FPS * 0.75 + 1
+
+
+def test_find_tier():
+    assert [find_tier(TIERS, value) for value in ('low', '1', '', None, '3', 'ultra')] == \
+        [2, 1, None, None, None, None]
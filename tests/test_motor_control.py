@@ -0,0 +1,96 @@
+import time
+
+from hal import WRITE_DIGITAL, WRITE_PWM, L298NMotorDriver, SimulatedBackend
+from motor_control import MotorController, apply_deadzone, mix_tank, to_duty
+
+
+def test_deadzone_zeroes_small_input_and_rescales_the_rest():
+    assert apply_deadzone(19, deadzone=20) == 0.0
+    assert apply_deadzone(-19, deadzone=20) == 0.0
+    assert apply_deadzone(20, deadzone=20) == 0.0
+    assert apply_deadzone(60, deadzone=20) == 50.0
+    assert apply_deadzone(-100, deadzone=20) == -100.0
+    # Sensitivity scales the output, never past full speed
+    assert apply_deadzone(60, deadzone=20, sensitivity=3.0) == 100.0
+
+
+def test_mix_tank():
+    assert mix_tank(0, 100, deadzone=0) == (100.0, 100.0)
+    assert mix_tank(0, -100, deadzone=0) == (-100.0, -100.0)
+    # Spin on the spot to the right
+    assert mix_tank(100, 0, deadzone=0) == (100.0, -100.0)
+    # Forward-right: left track clamped, right track slowed
+    assert mix_tank(50, 100, deadzone=0) == (100.0, 50.0)
+    # Jitter around the centre is ignored
+    assert mix_tank(10, -15, deadzone=20) == (0.0, 0.0)
+
+
+def test_to_duty_honours_min_speed():
+    assert to_duty(0, min_speed=30, max_speed=100) == 0.0
+    assert to_duty(1, min_speed=30, max_speed=100) == 30.7
+    assert to_duty(-100, min_speed=30, max_speed=100) == -100.0
+
+
+def make_controller(**kwargs):
+    backend = SimulatedBackend(capacity=64)
+    driver = L298NMotorDriver(backend)
+    return backend, driver, MotorController(driver, timeout=0.5, auto_stop=True,
+                                            autostart=False, **kwargs)
+
+
+def test_tick_writes_only_on_change():
+    backend, driver, controller = make_controller()
+    controller.tick()
+    assert driver.writes == 0
+
+    controller.set_target(0, 100)
+    now = time.monotonic()
+    controller.tick(now)
+    controller.tick(now + 0.01)
+    assert driver.writes == 1
+    assert (controller.left, controller.right) == (to_duty(100), to_duty(100))
+    # Forward on both sides: direction pins then the enable PWM
+    kinds = [kind for _, _, kind, _ in backend.log()]
+    assert kinds == [WRITE_DIGITAL, WRITE_DIGITAL, WRITE_PWM] * 2
+
+
+def test_watchdog_stops_motors_without_commands():
+    backend, driver, controller = make_controller()
+    controller.set_target(0, 100)
+    updated = time.monotonic()
+    controller.tick(updated)
+    assert controller.left > 0
+
+    controller.tick(updated + 0.6)
+    assert (controller.left, controller.right) == (0.0, 0.0)
+    assert controller.stopped_by_watchdog and controller.auto_stops == 1
+    # Still counted once while it stays stopped
+    controller.tick(updated + 1.0)
+    assert controller.auto_stops == 1
+
+    # A new command drives again
+    controller.set_target(-100, 0)
+    controller.tick()
+    assert not controller.stopped_by_watchdog
+    assert (controller.left, controller.right) == (to_duty(-100), to_duty(100))
+
+
+def test_idle_car_is_not_a_watchdog_event():
+    backend, driver, controller = make_controller()
+    controller.set_target(0, 0)
+    controller.tick(time.monotonic() + 10)
+    assert controller.auto_stops == 0 and not controller.stopped_by_watchdog
+
+
+def test_loop_thread_applies_targets_and_stops_the_driver():
+    backend, driver, controller = make_controller(rate=200)
+    controller.start()
+    try:
+        controller.set_target(0, 100)
+        deadline = time.monotonic() + 2.0
+        while controller.left == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert controller.left == to_duty(100)
+    finally:
+        controller.stop()
+    assert backend.state[driver.pins['left'][2]] == 0.0
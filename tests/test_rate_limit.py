@@ -0,0 +1,83 @@
+from rate_limit import CommandRateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(clock, **options):
+    """Limiter whose flushes run only when the test calls them"""
+    flushes = []
+    limiter = CommandRateLimiter(rate=10, burst=2, spawn=flushes.append,
+                                 sleep=lambda seconds: None, clock=clock, **options)
+    return limiter, flushes
+
+
+def test_one_bucket_per_client_across_channels():
+    clock = Clock()
+    limiter, _ = make_limiter(clock)
+    applied = []
+    assert limiter.submit('a', 'drive', applied.append, 1)
+    assert limiter.submit('a', 'servo1', applied.append, 2)
+    # The burst of 2 is spent for every channel of 'a', not per channel
+    assert not limiter.submit('a', 'servo2', applied.append, 3)
+    assert not limiter.submit('a', 'drive', applied.append, 4)
+    assert limiter.submit('b', 'drive', applied.append, 5)
+    assert applied == [1, 2, 5]
+    assert limiter.stats()['clients'] == 2
+
+
+def test_pending_state_per_channel_is_merged_and_applied_in_order():
+    clock = Clock()
+    limiter, flushes = make_limiter(clock)
+    applied = []
+    for value in range(2):
+        limiter.submit('a', 'drive', applied.append, value)
+    limiter.submit('a', 'drive', applied.append, 10)
+    limiter.submit('a', 'servo1', applied.append, 20)
+    limiter.submit('a', 'drive', applied.append, 11)
+    assert len(flushes) == 1
+
+    clock.now = 1.0
+    flushes[0]()
+    assert applied == [0, 1, 11, 20]
+    stats = limiter.stats()
+    assert (stats['accepted'], stats['merged'], stats['dropped']) == (2, 2, 1)
+
+    # Nothing pending: once a token is back the next command goes straight through
+    clock.now = 2.0
+    assert limiter.submit('a', 'drive', applied.append, 12)
+
+
+def test_channel_with_pending_state_does_not_overtake_it():
+    clock = Clock()
+    limiter, flushes = make_limiter(clock)
+    applied = []
+    limiter.submit('a', 'drive', applied.append, 1)
+    limiter.submit('a', 'drive', applied.append, 2)
+    limiter.submit('a', 'drive', applied.append, 3)
+    clock.now = 1.0
+    # A token is available again, but drive 3 is still pending
+    assert not limiter.submit('a', 'drive', applied.append, 4)
+    flushes[0]()
+    assert applied == [1, 2, 4]
+
+
+def test_idle_clients_expire():
+    clock = Clock()
+    limiter, _ = make_limiter(clock, idle_timeout=60)
+    for address in ('10.0.0.1', '10.0.0.2'):
+        limiter.submit(address, 'drive', lambda state: None, 0)
+    clock.now = 30.0
+    limiter.submit('10.0.0.1', 'drive', lambda state: None, 0)
+    clock.now = 61.0
+    limiter.submit('10.0.0.3', 'drive', lambda state: None, 0)
+    assert limiter.stats()['clients'] == 2
+    assert limiter.stats()['expired'] == 1
+
+    limiter.forget('10.0.0.3')
+    assert limiter.stats()['clients'] == 1
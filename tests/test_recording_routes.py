@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_socketio')
+
+import app as dashboard
+
+
+@pytest.fixture
+def client():
+    return dashboard.app.test_client()
+
+
+def test_recording_disabled(client, monkeypatch):
+    monkeypatch.setattr(dashboard.config, 'RECORD_ENABLED', False)
+    assert client.get('/recording/frame').status_code == 409
+    assert client.get('/recording/events').status_code == 409
+
+
+def test_nothing_recorded_yet(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(dashboard.config, 'RECORD_ENABLED', True)
+    monkeypatch.setattr(dashboard.config, 'RECORD_PATH', str(tmp_path / 'missing.ring'))
+    assert client.get('/recording/frame').status_code == 404
+    assert client.get('/recording/events').status_code == 404
@@ -0,0 +1,87 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('av')
+pytest.importorskip('aiortc')
+
+
+@pytest.fixture
+def sender_module(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'RPi'))
+    import rpi_webrtc_sender
+    return rpi_webrtc_sender
+
+
+class Signaling:
+    def stats(self):
+        return {}
+
+
+class PeerConnection:
+    def getSenders(self):
+        return []
+
+
+def make_sender(sender_module, monkeypatch, results):
+    """A connected sender whose renegotiations return (or raise) results in turn"""
+    monkeypatch.setattr(sender_module, 'reconnect_backoff', lambda attempt: 0.0)
+    sender = sender_module.RPiWebRTCSender('car', signaling=Signaling(), abr_enabled=False)
+    sender.pc = PeerConnection()
+    sender.state = 'connected'
+    sender.connected = True
+    offers = []
+
+    async def negotiate(answer_timeout):
+        offers.append(answer_timeout)
+        result = results[len(offers) - 1]
+        if isinstance(result, Exception):
+            raise result
+        if result:
+            sender.on_connected()
+        return result
+
+    sender.negotiate = negotiate
+    return sender, offers
+
+
+def test_backoff_doubles_up_to_the_cap_with_jitter(sender_module):
+    backoff = sender_module.reconnect_backoff
+    for attempt, full in enumerate([0.25, 0.5, 1.0, 2.0, 4.0, 5.0, 5.0]):
+        for _ in range(20):
+            assert full / 2 <= backoff(attempt, base=0.25, cap=5.0) <= full
+
+
+def test_failure_renegotiates_on_the_warm_session(sender_module, monkeypatch):
+    sender, offers = make_sender(sender_module, monkeypatch, [False, asyncio.TimeoutError(), True])
+
+    async def fail():
+        sender.on_failed()
+        assert sender.state == 'recovering' and not sender.connected
+        await sender._recovery_task
+
+    asyncio.run(fail())
+    assert offers == [sender_module.RECONNECT_ANSWER_TIMEOUT] * 3
+    assert (sender.state, sender.connected) == ('connected', True)
+    assert (sender.reconnects, sender.reconnect_attempts) == (1, 3)
+    assert sender.stats()['recovery_ms']['count'] == 1
+
+
+def test_gives_up_after_max_attempts(sender_module, monkeypatch):
+    attempts = sender_module.MAX_RECONNECT_ATTEMPTS
+    sender, offers = make_sender(sender_module, monkeypatch, [False] * attempts)
+
+    async def fail():
+        sender.on_failed()
+        # A second failure event while recovering starts no second recovery
+        task = sender._recovery_task
+        sender.on_failed()
+        assert sender._recovery_task is task
+        await task
+
+    asyncio.run(fail())
+    assert len(offers) == attempts
+    assert sender.state == 'failed' and sender.reconnects == 0
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from signaling_backend import LocalSignaling
+
+
+def test_create_room_drops_old_requests():
+    signaling = LocalSignaling()
+    signaling.join_session('car', 's1', 'viewer')
+    signaling.create_room('car')
+    seen = []
+    signaling.listen_for_sessions('car', seen.append)
+    assert seen == []
+
+
+def test_deleted_session_is_not_delivered_again():
+    signaling = LocalSignaling()
+    signaling.create_room('car')
+    signaling.join_session('car', 's1', 'viewer')
+    signaling.join_session('car', 's2', 'viewer')
+    signaling.delete_session('car', 's1')
+    seen = []
+    signaling.listen_for_sessions('car', seen.append)
+    assert [session['session'] for session in seen] == ['s2']
+
+
+def test_fanout_ignores_and_deletes_stale_sessions(monkeypatch):
+    pytest.importorskip('aiortc')
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'RPi'))
+    from fanout_sender import FanoutSender
+
+    class Signaling:
+        def __init__(self):
+            self.deleted = []
+
+        async def delete_session(self, room_id, session_id):
+            self.deleted.append(session_id)
+
+    async def run():
+        signaling = Signaling()
+        sender = FanoutSender('car', signaling=signaling, track_factory=None, max_viewers=0)
+        sender._running = True
+        sender.started_at = time.time()
+        sender.on_session({'session': 'old', 'timestamp': sender.started_at - 60})
+        sender.on_session({'session': 'new', 'timestamp': sender.started_at + 1})
+        await asyncio.sleep(0)
+        return sender, signaling
+
+    sender, signaling = asyncio.run(run())
+    assert sender.stale == 1 and sender.rejected == 1
+    assert signaling.deleted == ['old', 'new']
@@ -0,0 +1,28 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from synthetic_video import TestPatternRenderer
+
+
+def test_background_matches_the_per_row_gradient_and_is_shared():
+    background = TestPatternRenderer.get_background(64, 600)
+    assert background.shape == (600, 64, 3)
+    assert not background.flags.writeable
+    for row in (0, 1, 299, 510, 599):
+        # The loop it replaced: [i//2, (i//3) % 255, 150], wrapped to uint8
+        assert background[row, 0].tolist() == [(row // 2) % 256, (row // 3) % 255, 150]
+        assert (background[row] == background[row, 0]).all()
+    assert TestPatternRenderer.get_background(64, 600) is background
+
+
+def test_render_reuses_its_buffer_and_leaves_the_background_clean():
+    renderer = TestPatternRenderer(160, 120, target_fps=0)
+    first = renderer.render()
+    second = renderer.render()
+    assert first is second is renderer.output
+    assert renderer.frame_count == 2
+    # The circle and text are drawn on the copy only
+    assert not (second == renderer.background).all()
+    assert renderer.background is TestPatternRenderer.get_background(160, 120)
@@ -0,0 +1,100 @@
+import threading
+
+from telemetry import TelemetryBroadcaster, TelemetryBus
+
+
+class Server:
+    def __init__(self):
+        self.rooms = set()
+
+    def enter_room(self, sid, room, namespace):
+        self.rooms.add(sid)
+
+    def leave_room(self, sid, room, namespace):
+        self.rooms.discard(sid)
+
+
+class SocketIO:
+    def __init__(self):
+        self.server = Server()
+        self.emitted = []
+
+    def emit(self, event, data, to, namespace):
+        self.emitted.append((to, data))
+
+    def take(self):
+        emitted, self.emitted = self.emitted, []
+        return emitted
+
+
+def make_broadcaster():
+    bus = TelemetryBus()
+    socketio = SocketIO()
+    return bus, socketio, TelemetryBroadcaster(bus, socketio, max_in_flight=2)
+
+
+def test_new_client_gets_full_state_then_joins_the_room():
+    bus, socketio, broadcaster = make_broadcaster()
+    bus.update({'speed': 1, 'rssi': 20})
+    broadcaster.add_client('a')
+    broadcaster.tick()
+
+    assert socketio.take() == [('telemetry', {'n': 1, 'seq': 2, 'd': {'speed': 1, 'rssi': 20}}),
+                               ('a', {'n': 1, 'seq': 2, 'd': {'speed': 1, 'rssi': 20}})]
+    assert socketio.server.rooms == {'a'}
+    # Unchanged values send nothing
+    bus.publish('speed', 1)
+    broadcaster.tick()
+    assert socketio.take() == []
+
+
+def test_lagging_client_leaves_and_catches_up_with_one_merged_delta():
+    bus, socketio, broadcaster = make_broadcaster()
+    broadcaster.add_client('slow')
+    broadcaster.tick()
+    socketio.take()
+
+    for speed in range(1, 5):
+        bus.update({'speed': speed, 'tick': speed})
+        broadcaster.tick()
+    # Never acknowledged: dropped once more than max_in_flight batches behind
+    assert socketio.server.rooms == set()
+    assert broadcaster.stats()['lagging'] == 1 and broadcaster.lagged == 1
+    sent = broadcaster._clients['slow'].sent
+    socketio.take()
+
+    # Still out of the room while batches are unacknowledged
+    bus.publish('rssi', 12)
+    broadcaster.tick()
+    assert [to for to, _ in socketio.take()] == ['telemetry']
+
+    # It applied the state up to batch 2 (seq 2); the rest arrives as one message
+    broadcaster.ack('slow', sent, 2)
+    broadcaster.tick()
+    assert socketio.take() == [('slow', {'n': broadcaster.batch, 'seq': bus.seq,
+                                         'd': {'speed': 4, 'tick': 4, 'rssi': 12}})]
+    assert socketio.server.rooms == {'slow'}
+    assert broadcaster.catchups == 2
+
+
+def test_ack_ignores_bad_and_stale_values():
+    bus, socketio, broadcaster = make_broadcaster()
+    broadcaster.add_client('a')
+    broadcaster.ack('a', 3, 7)
+    for batch, seq in ((None, 1), ('x', 1), (2, 9)):
+        broadcaster.ack('a', batch, seq)
+    broadcaster.ack('gone', 5, 5)
+    client = broadcaster._clients['a']
+    assert (client.acked, client.acked_seq) == (3, 7)
+
+
+def test_ack_waits_for_the_tick_lock():
+    bus, socketio, broadcaster = make_broadcaster()
+    broadcaster.add_client('a')
+    with broadcaster._lock:
+        acking = threading.Thread(target=broadcaster.ack, args=('a', 1, 1))
+        acking.start()
+        acking.join(0.05)
+        assert acking.is_alive() and broadcaster._clients['a'].acked == 0
+    acking.join(1.0)
+    assert broadcaster._clients['a'].acked == 1
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_socketio')
+
+import app as dashboard
+from components import DEGRADED, PENDING, READY, STARTING, Component
+
+
+def use_signaling(monkeypatch, factory):
+    monkeypatch.setattr(dashboard, 'SIGNALING_BACKEND', 'firebase')
+    component = Component('signaling', factory, fallback=lambda: dashboard.local_signaling)
+    monkeypatch.setattr(dashboard, 'signaling', component)
+    return component
+
+
+def get_config():
+    response = dashboard.app.test_client().get('/webrtc/config')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def wait_for(component, states, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while component.state not in states and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return component.state
+
+
+def test_pending_backend_is_reported_without_blocking(monkeypatch):
+    release = threading.Event()
+
+    def slow_firestore():
+        release.wait(5)
+        return object()
+
+    component = use_signaling(monkeypatch, slow_firestore)
+    assert component.state == PENDING
+    started = time.monotonic()
+    assert get_config()['signaling'] in (PENDING, STARTING)
+    # Built on its own thread, not on the request
+    assert wait_for(component, (STARTING,)) == STARTING
+    assert get_config()['signaling'] == STARTING
+    assert time.monotonic() - started < 1.0
+
+    release.set()
+    assert wait_for(component, (READY,)) == READY
+    assert get_config()['signaling'] == 'firebase'
+
+
+def test_failed_firestore_reports_local(monkeypatch):
+    def no_credentials():
+        raise FileNotFoundError('service account file')
+
+    component = use_signaling(monkeypatch, no_credentials)
+    get_config()
+    assert wait_for(component, (DEGRADED,)) == DEGRADED
+    assert get_config()['signaling'] == 'local'
+
+
+def test_local_backend(monkeypatch):
+    component = use_signaling(monkeypatch, lambda: dashboard.local_signaling)
+    component.warm()
+    assert get_config()['signaling'] == 'local'
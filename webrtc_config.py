@@ -2,6 +2,8 @@
 WebRTC Configuration for Raspberry Pi Car Dashboard
 """
 
+import os
+
 # WebRTC Configuration
 WEBRTC_CONFIG = {
     'iceServers': [
@@ -29,23 +31,99 @@ FIREBASE_CONFIG = {
     'client_x509_cert_url': 'your-cert-url'
 }
 
+# Service account file the dashboard uses for the 'firebase' backend
+FIREBASE_CREDENTIALS_PATH = os.getenv(
+    'FIREBASE_CREDENTIALS', 'rpi-dashboard-webrtc-firebase-adminsdk-fbsvc-a1d73bace1.json')
+
 # Firestore collection names
 FIREBASE_SIGNALING_COLLECTION = 'webrtc_signaling'
 FIREBASE_OFFERS_COLLECTION = 'offers'
 FIREBASE_ANSWERS_COLLECTION = 'answers'
 FIREBASE_ICE_CANDIDATES_COLLECTION = 'ice_candidates'
 
+# Signaling backend: 'firebase' (Firestore), 'socketio' (the dashboard's
+# in-memory rooms over Socket.IO, LAN only) or 'local' (in-process)
+SIGNALING_BACKEND = 'firebase'
+SIGNALING_SERVER_URL = 'http://localhost:5000'  # dashboard, for 'socketio'
+SIGNALING_NAMESPACE = '/signaling'
+SIGNALING_TIMEOUT = 5  # seconds per Socket.IO signaling request
+
+# Signaling rooms are only needed while negotiating; older ones are
+# left behind by crashed senders and garbage collected
+SIGNALING_ROOM_TTL = 6 * 3600  # seconds since the room was created
+SIGNALING_GC_INTERVAL = 600  # seconds between garbage collection runs
+FIRESTORE_BATCH_LIMIT = 500  # Firestore's maximum writes per batch
+
+# Signaling client
+SIGNALING_MAX_WORKERS = 4  # threads for blocking signaling SDK calls
+ICE_BATCH_WINDOW = 0.05  # seconds; trickled ICE candidates are committed together
+
+# Rooms
+ROOM_ID = 'rpi_car_stream'
+# Fan-out: every dashboard joins a session of the room and gets its own
+# peer connection, all fed from the one camera capture
+FANOUT_ENABLED = False
+FANOUT_MAX_VIEWERS = 4
+# Relay on the dashboard server host (RPi/relay_server.py): the only viewer
+# of ROOM_ID, fanning the stream out to dashboards in RELAY_ROOM_ID, so the
+# Pi uplink carries one stream (the Pi itself runs without FANOUT_ENABLED)
+RELAY_ENABLED = False
+RELAY_ROOM_ID = 'rpi_car_stream_relay'
+
 # Device IDs
 RPI_DEVICE_ID = 'rpi_car_camera'  # Raspberry Pi (sender)
 DASHBOARD_DEVICE_ID = 'dashboard_viewer'  # Dashboard (receiver)
+RELAY_DEVICE_ID = 'dashboard_relay'  # Relay on the dashboard host
 
 # Video Settings
 VIDEO_WIDTH = 640
 VIDEO_HEIGHT = 480
 VIDEO_FPS = 30
 VIDEO_BITRATE = 1000000  # 1 Mbps
+VIDEO_PIXEL_FORMAT = 'yuv420p'  # 'yuv420p' (encoder-native) or 'bgr24' (camera-native)
+# Video source: 'camera' (aiortc encodes raw frames) or 'h264_passthrough'
+# (external ffmpeg encoder, packets sent without re-encoding)
+VIDEO_SOURCE_MODE = 'camera'
+VIDEO_DEVICE = '/dev/video0'
+H264_ENCODER = 'h264_v4l2m2m'  # Pi hardware encoder; 'libx264' for software
+KEYFRAME_INTERVAL = 60  # frames between IDR frames
+ENCODED_QUEUE_SIZE = 5  # access units buffered before skipping to the next keyframe
+FRAME_POOL_SIZE = 4  # Reused VideoFrames; a frame is refilled only once no consumer holds it
+FRAME_POOL_MAX = 16  # The pool grows up to this while relay subscribers hold every frame
+
+# Adaptive bitrate: ladder from lowest to highest, the sender starts at the top
+# and steps along it based on RTCP receiver reports
+ABR_ENABLED = True
+VIDEO_LADDER = [
+    {'width': 320, 'height': 240, 'fps': 15, 'bitrate': 250000},
+    {'width': 480, 'height': 360, 'fps': 20, 'bitrate': 500000},
+    {'width': 640, 'height': 480, 'fps': 30, 'bitrate': 1000000},
+]
+ABR_INTERVAL = 2  # seconds between stats samples
+ABR_LOSS_DOWN = 0.10  # packet loss fraction that counts as congested
+ABR_LOSS_UP = 0.02  # packet loss fraction that counts as clean
+ABR_RTT_DOWN = 0.4  # seconds
+ABR_RTT_UP = 0.2  # seconds
+ABR_DOWN_SAMPLES = 2  # consecutive congested samples before stepping down
+ABR_UP_SAMPLES = 5  # consecutive clean samples before stepping up
+ABR_LOG_FILE = 'abr_decisions.jsonl'  # structured decision log (None to disable)
 
 # Connection Settings
 CONNECTION_TIMEOUT = 30  # seconds
-RECONNECT_DELAY = 5  # seconds
-MAX_RECONNECT_ATTEMPTS = 3
\ No newline at end of file
+RECONNECT_DELAY = 5  # seconds; cap of the reconnect backoff
+RECONNECT_BACKOFF_BASE = 0.25  # seconds before the first reconnect attempt (doubles)
+RECONNECT_ANSWER_TIMEOUT = 5  # seconds to wait for the dashboard's answer on reconnect
+MAX_RECONNECT_ATTEMPTS = 3
+
+# Monitoring
+STATS_INTERVAL = 10  # seconds between sender stats log lines
+# Glass-to-glass latency probe (camera mode only): stamp frames and post
+# per-frame stage times to the dashboard, which joins them with what it displays
+LATENCY_PROBE = False
+LATENCY_REPORT_URL = 'http://localhost:5000/metrics/latency'
+LATENCY_REPORT_INTERVAL = 1.0  # seconds
+
+# Record the video source into a ring file (recorder.py), camera mode only
+RECORD_ENABLED = False
+RECORD_PATH = 'recordings/webrtc.ring'
+RECORD_FPS = 15